@@ -16,6 +16,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.services.analytics_consumer import analytics_consumer
 from app.core.config import settings
+from app.core.memory import memory_tracker, start_memory_tracking
 
 # Configure logging
 logging.basicConfig(
@@ -37,6 +38,12 @@ def signal_handler(signum, frame):
     sys.exit(0)
 
 
+def memory_signal_handler(signum, frame):
+    """Start memory tracking on the first SIGUSR1, log growth since the baseline afterwards"""
+    # The snapshot thread does the work; the handler may interrupt the main thread anywhere
+    memory_tracker.request_report()
+
+
 def main():
     """Main function to start the analytics consumer"""
     logger.info("Starting Analytics Consumer...")
@@ -46,14 +53,16 @@ def main():
     # Set up signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, memory_signal_handler)
+    
+    start_memory_tracking()
+    if hasattr(signal, "SIGUSR1"):
+        # Without periodic snapshots the thread only wakes up for SIGUSR1
+        memory_tracker.start_periodic(0)
     
     try:
-        # Check if RabbitMQ is available
-        if not analytics_consumer.connection or analytics_consumer.connection.is_closed:
-            logger.error("Failed to connect to RabbitMQ. Please ensure RabbitMQ is running.")
-            sys.exit(1)
-        
-        # Start consuming messages
+        # Start consuming messages; connects (and reconnects) with backoff
         analytics_consumer.start_consuming()
         
     except KeyboardInterrupt:
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Analytics Maintenance Script
+
+Housekeeping jobs for the analytics_events storage.
+
+Usage:
+    python analytics_maintenance.py migrate      # apply pending schema migrations after an upgrade
+    python analytics_maintenance.py partitions   # create current and next partitions
+    python analytics_maintenance.py retention    # drop partitions past ANALYTICS_RETENTION_DAYS
+    python analytics_maintenance.py archive      # move events past ANALYTICS_ARCHIVE_AFTER_DAYS to files
+    python analytics_maintenance.py indexes      # apply ANALYTICS_INDEX_PROFILE to existing tables
+    python analytics_maintenance.py replay FILE  # bulk-load events from a JSON-lines file (.gz ok)
+    python analytics_maintenance.py geo-build CSV  # compile an IP range CSV into the geo table
+"""
+
+import sys
+import os
+import gzip
+import json
+import argparse
+import logging
+from datetime import datetime
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine, SessionLocal
+from app.core.config import settings
+from app.services.analytics_partitions import analytics_partitions
+from app.services.analytics_archive import AnalyticsArchiver
+from app.core.migrations import run_migrations, sync_analytics_indexes
+from app.services.analytics_bulk import analytics_bulk_writer
+from app.services.analytics_geo import build_geo_table
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def migrate():
+    """Apply the schema migrations to an existing database"""
+    run_migrations(engine)
+    logger.info("Migrations applied")
+    return 0
+
+
+def create_partitions():
+    """Create the partitions for the current and the next period"""
+    if not analytics_partitions.enabled:
+        logger.error("ANALYTICS_PARTITION_INTERVAL is not set, partitioning is disabled")
+        return 1
+
+    now = datetime.utcnow()
+    upcoming = analytics_partitions.next_period_start(now)
+    with engine.begin() as conn:
+        for value in (now, upcoming):
+            name = analytics_partitions.ensure_partition(conn, value)
+            logger.info(f"Partition ready: {name}")
+    return 0
+
+
+def apply_retention(days: int):
+    """Drop whole partitions that fall outside the retention window"""
+    with engine.begin() as conn:
+        dropped = analytics_partitions.apply_retention(conn, days)
+    logger.info(f"Dropped {len(dropped)} partitions: {', '.join(dropped) or 'none'}")
+    return 0
+
+
+def archive_events(days: int, chunk_rows: int):
+    """Move aged events into compressed columnar archive segments"""
+    archiver = AnalyticsArchiver(chunk_rows=chunk_rows)
+    with engine.connect() as conn:
+        archived = archiver.archive_aged(conn, days)
+    logger.info(f"Archived {archived} events to {settings.ANALYTICS_ARCHIVE_DIR}")
+    return 0
+
+
+def apply_index_profile(profile: str):
+    """Create and drop analytics_events indexes to match an index profile"""
+    with engine.begin() as conn:
+        sync_analytics_indexes(conn, profile)
+    logger.info(f"Index profile '{profile}' applied")
+    return 0
+
+
+def _read_events(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            event_data = json.loads(line)
+            event_data.pop("deferred_write", None)
+            if isinstance(event_data.get("timestamp"), str):
+                event_data["timestamp"] = datetime.fromisoformat(event_data["timestamp"])
+            yield event_data
+
+
+def replay_events(path: str):
+    """Bulk-load a JSON-lines event dump through the COPY bulk writer"""
+    db = SessionLocal()
+    try:
+        written = analytics_bulk_writer.write(db, _read_events(path), commit_each_chunk=True)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    logger.info(f"Replayed {written} events from {path}")
+    return 0
+
+
+def build_geo(csv_path: str, output_path: str):
+    """Compile a start,end,country,region CSV into the memory-mapped geo table"""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    count = build_geo_table(csv_path, output_path)
+    logger.info(f"Wrote {count} IP ranges to {output_path}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics storage maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    subparsers.add_parser("partitions", help="Create current and next partitions")
+
+    retention_parser = subparsers.add_parser("retention", help="Drop expired partitions")
+    retention_parser.add_argument("--days", type=int, default=settings.ANALYTICS_RETENTION_DAYS)
+
+    archive_parser = subparsers.add_parser("archive", help="Archive aged events to columnar files")
+    archive_parser.add_argument("--days", type=int, default=settings.ANALYTICS_ARCHIVE_AFTER_DAYS)
+    archive_parser.add_argument("--chunk-rows", type=int, default=settings.ANALYTICS_ARCHIVE_CHUNK_ROWS)
+
+    indexes_parser = subparsers.add_parser("indexes", help="Apply an analytics index profile")
+    indexes_parser.add_argument("--profile", default=settings.ANALYTICS_INDEX_PROFILE)
+
+    replay_parser = subparsers.add_parser("replay", help="Bulk-load events from a JSON-lines file")
+    replay_parser.add_argument("path")
+
+    geo_parser = subparsers.add_parser("geo-build", help="Compile an IP range CSV into the geo table")
+    geo_parser.add_argument("csv_path")
+    geo_parser.add_argument("--output", default=settings.ANALYTICS_GEO_TABLE_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        return migrate()
+    if args.command == "partitions":
+        return create_partitions()
+    if args.command == "retention":
+        return apply_retention(args.days)
+    if args.command == "archive":
+        return archive_events(args.days, args.chunk_rows)
+    if args.command == "indexes":
+        return apply_index_profile(args.profile)
+    if args.command == "replay":
+        return replay_events(args.path)
+    if args.command == "geo-build":
+        return build_geo(args.csv_path, args.output)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
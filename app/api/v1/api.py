@@ -1,5 +1,6 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import users, products, orders, auth, analytics, beacon
+from app.core.config import settings
+from app.api.v1.endpoints import users, products, orders, auth, analytics, beacon, debug
 
 api_router = APIRouter()
 
@@ -10,3 +11,7 @@ api_router.include_router(products.router, prefix="/products", tags=["products"]
 api_router.include_router(orders.router, prefix="/orders", tags=["orders"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 api_router.include_router(beacon.router, prefix="/beacon", tags=["beacon"])
+
+# Admin profiling and memory endpoints are only exposed when profiling is enabled
+if settings.PROFILING_ENABLED:
+    api_router.include_router(debug.router, prefix="/debug", tags=["debug"])
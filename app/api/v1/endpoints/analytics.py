@@ -1,15 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timedelta
 from app.core.database import get_db
+from app.core.admission import defers_writes
 from app.schemas.analytics import (
     AnalyticsEventCreate, 
     AnalyticsEventResponse, 
-    AnalyticsEventBatch,
     AnalyticsQuery,
-    AnalyticsSummary
+    AnalyticsSummary,
+    SessionSummary
 )
 from app.services.analytics_service import AnalyticsService
+from app.services.analytics_archive import analytics_archive
+from app.services.analytics_ingest import decode_batch, BATCH_REQUEST_BODY
 from app.services.auth_service import get_current_user
 from app.models.user import User
 
@@ -36,7 +42,7 @@ async def track_event(
     analytics_service = AnalyticsService(db)
     request_info = get_request_info(request)
     
-    success = analytics_service.track_event(event, request_info)
+    success = analytics_service.track_event(event, request_info, defer_write=defers_writes(request))
     
     if success:
         return {"status": "success", "message": "Event tracked successfully"}
@@ -47,23 +53,28 @@ async def track_event(
         )
 
 
-@router.post("/track/batch", response_model=dict)
+@router.post("/track/batch", response_model=dict, openapi_extra=BATCH_REQUEST_BODY)
 async def track_batch_events(
-    batch: AnalyticsEventBatch,
     request: Request,
     db: Session = Depends(get_db)
 ):
     """Track multiple analytics events"""
+    # Validated from the raw bytes into plain dicts, skipping FastAPI's generic body handling
+    try:
+        events = decode_batch(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([{**error, 'loc': ('body', *error['loc'])} for error in e.errors()])
+    
     analytics_service = AnalyticsService(db)
     request_info = get_request_info(request)
     
-    tracked_count = analytics_service.track_batch(batch.events, request_info)
+    tracked_count = analytics_service.track_batch(events, request_info, defer_write=defers_writes(request))
     
     return {
         "status": "success",
-        "message": f"Tracked {tracked_count}/{len(batch.events)} events",
+        "message": f"Tracked {tracked_count}/{len(events)} events",
         "tracked_count": tracked_count,
-        "total_count": len(batch.events)
+        "total_count": len(events)
     }
 
 
@@ -113,6 +124,23 @@ async def get_analytics_summary(
     return summary
 
 
+@router.get("/sessions/summary", response_model=SessionSummary)
+async def get_session_summary(
+    days: int = 7,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get session duration, depth and conversion summary (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    analytics_service = AnalyticsService(db)
+    return analytics_service.get_session_summary(days)
+
+
 @router.get("/user/{user_id}/events", response_model=List[AnalyticsEventResponse])
 async def get_user_events(
     user_id: int,
@@ -151,6 +179,45 @@ async def get_popular_products(
     return {"products": products}
 
 
+@router.get("/archive/summary")
+def get_archive_summary(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get summary of archived events (admin only)"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    end_date = end_date or datetime.utcnow()
+    start_date = start_date or end_date - timedelta(days=365)
+    summary = analytics_archive.summary(start_date, end_date)
+    return {
+        **summary,
+        "time_period": f"{start_date.isoformat()} - {end_date.isoformat()}"
+    }
+
+
+@router.get("/archive/user/{user_id}/events")
+def get_archived_user_events(
+    user_id: int,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user)
+):
+    """Get archived events for a specific user (admin or self)"""
+    if not current_user.is_admin and current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    events = analytics_archive.user_events(user_id, limit)
+    return {"events": events}
+
+
 # Convenience endpoints for common events
 @router.post("/page-view")
 async def track_page_view(
@@ -170,7 +237,7 @@ async def track_page_view(
     analytics_service = AnalyticsService(db)
     request_info = get_request_info(request)
     
-    success = analytics_service.track_event(event, request_info)
+    success = analytics_service.track_event(event, request_info, defer_write=defers_writes(request))
     
     if success:
         return {"status": "success", "message": "Page view tracked"}
@@ -203,7 +270,7 @@ async def track_product_view(
     analytics_service = AnalyticsService(db)
     request_info = get_request_info(request)
     
-    success = analytics_service.track_event(event, request_info)
+    success = analytics_service.track_event(event, request_info, defer_write=defers_writes(request))
     
     if success:
         return {"status": "success", "message": "Product view tracked"}
@@ -244,7 +311,7 @@ async def track_purchase(
     analytics_service = AnalyticsService(db)
     request_info = get_request_info(request)
     
-    success = analytics_service.track_event(event, request_info)
+    success = analytics_service.track_event(event, request_info, defer_write=defers_writes(request))
     
     if success:
         return {"status": "success", "message": "Purchase tracked"}
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Request, Depends
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.admission import defers_writes, admission_sample_rate
 from app.services.analytics_service import AnalyticsService
+from app.services.analytics_ingest import decode_beacon, decode_beacon_form
 from app.schemas.analytics import AnalyticsEventCreate
-import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,7 @@ def get_request_info(request: Request) -> dict:
         'user_agent': request.headers.get('user-agent'),
         'referrer': request.headers.get('referer'),
         'page_url': str(request.url),
+        'sample_rate': admission_sample_rate(request),
     }
 
 
@@ -40,48 +42,20 @@ async def beacon_track(
         # Get content type
         content_type = request.headers.get('content-type', '')
         
-        # Parse request data based on content type
-        if 'application/json' in content_type:
-            data = await request.json()
-        elif 'text/plain' in content_type:
-            body = await request.body()
-            data = json.loads(body.decode('utf-8'))
+        # Validate the body straight into an event dict
+        if 'application/json' in content_type or 'text/plain' in content_type:
+            event_data = decode_beacon(await request.body())
         else:
             form_data = await request.form()
-            data = dict(form_data)
-        
-        # Extract event data
-        event_type = data.get('event_type', 'beacon')
-        event_name = data.get('event_name', 'page_unload')
-        user_id = data.get('user_id')
-        session_id = data.get('session_id')
-        page_url = data.get('page_url')
-        properties = data.get('properties', {})
-        
-        # Add beacon-specific properties
-        beacon_properties = {
-            'beacon': True,
-            'page_unload': True,
-            **properties
-        }
-        
-        # Create analytics event
-        event_data = AnalyticsEventCreate(
-            event_type=event_type,
-            event_name=event_name,
-            user_id=user_id,
-            session_id=session_id,
-            page_url=page_url,
-            properties=beacon_properties
-        )
+            event_data = decode_beacon_form(dict(form_data))
         
         # Track event
         request_info = get_request_info(request)
         analytics_service = AnalyticsService(db)
-        success = analytics_service.track_event(event_data, request_info)
+        success = analytics_service.track_event(event_data, request_info, defer_write=defers_writes(request))
         
         if success:
-            logger.info(f"Beacon event tracked: {event_name}")
+            logger.info(f"Beacon event tracked: {event_data['event_name']}")
         
         # Return 204 No Content for sendBeacon
         return Response(status_code=204)
@@ -106,6 +80,7 @@ async def beacon_simple_track(
             event_name = request.query_params.get('name', 'page_unload')
             page_url = request.query_params.get('url', '')
             user_id = request.query_params.get('uid')
+            event_id = request.query_params.get('eid')
         else:
             try:
                 data = await request.json()
@@ -117,9 +92,11 @@ async def beacon_simple_track(
             event_name = data.get('name', 'page_unload')
             page_url = data.get('url', '')
             user_id = data.get('uid')
+            event_id = data.get('eid')
         
         # Create event
         event_data = AnalyticsEventCreate(
+            event_id=event_id,
             event_type=event_type,
             event_name=event_name,
             user_id=user_id,
@@ -130,7 +107,7 @@ async def beacon_simple_track(
         # Track event
         request_info = get_request_info(request)
         analytics_service = AnalyticsService(db)
-        success = analytics_service.track_event(event_data, request_info)
+        success = analytics_service.track_event(event_data, request_info, defer_write=defers_writes(request))
         
         if success:
             logger.info(f"Simple beacon event tracked: {event_name}")
@@ -0,0 +1,123 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core.memory import memory_tracker
+from app.core.profiling import (
+    acquire_process_sampler, release_process_sampler, list_profiles, read_profile
+)
+from app.services.auth_service import get_current_user
+from app.models.user import User
+
+router = APIRouter()
+
+
+def require_admin(current_user: User):
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+
+@router.post("/profile/sample", response_class=PlainTextResponse)
+async def sample_process(
+    seconds: float = Query(10, gt=0, le=300, description="How long to sample"),
+    interval_ms: float = Query(None, gt=0, description="Sampling interval"),
+    current_user: User = Depends(get_current_user)
+):
+    """Sample every thread for N seconds and return collapsed stacks (admin only)"""
+    require_admin(current_user)
+
+    interval = (interval_ms or settings.PROFILING_SAMPLE_INTERVAL_MS) / 1000
+    sampler = acquire_process_sampler(interval)
+    if sampler is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A process-wide sampling run is already in progress"
+        )
+
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile_name = release_process_sampler(sampler, f"process-{seconds:g}s")
+
+    return PlainTextResponse(sampler.collapsed(), headers={"X-Profile-Id": profile_name})
+
+
+@router.get("/profiles")
+async def get_profiles(current_user: User = Depends(get_current_user)):
+    """List stored request and process profiles (admin only)"""
+    require_admin(current_user)
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{profile_name}", response_class=PlainTextResponse)
+async def get_profile(
+    profile_name: str,
+    limit: int = Query(50, ge=1, le=1000, description="Functions to list for pstats profiles"),
+    current_user: User = Depends(get_current_user)
+):
+    """Show a stored profile as pstats text or collapsed stacks (admin only)"""
+    require_admin(current_user)
+
+    content = read_profile(profile_name, limit)
+    if content is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return PlainTextResponse(content)
+
+
+# tracemalloc snapshots and gc walks block for a while; these run in the threadpool
+@router.post("/memory/start")
+def start_memory_tracking(
+    interval: int = Query(0, ge=0, description="Seconds between automatic snapshots, 0 for none"),
+    current_user: User = Depends(get_current_user)
+):
+    """Start tracemalloc and take the baseline snapshot (admin only)"""
+    require_admin(current_user)
+    memory_tracker.start()
+    if interval:
+        memory_tracker.start_periodic(interval)
+    return {"status": "tracking", "periodic_interval": interval or None}
+
+
+@router.post("/memory/baseline")
+def reset_memory_baseline(current_user: User = Depends(get_current_user)):
+    """Replace the baseline with a fresh snapshot (admin only)"""
+    require_admin(current_user)
+    if not memory_tracker.tracing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Memory tracking is not running"
+        )
+    memory_tracker.set_baseline()
+    return {"status": "baseline reset"}
+
+
+@router.get("/memory")
+def get_memory_report(
+    top: int = Query(20, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Top allocation sites and object types grown since the baseline (admin only)"""
+    require_admin(current_user)
+    if not memory_tracker.tracing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Memory tracking is not running"
+        )
+    report = memory_tracker.report(top, group_by)
+    report["snapshots"] = memory_tracker.snapshot_times()
+    return report
+
+
+@router.post("/memory/stop")
+def stop_memory_tracking(current_user: User = Depends(get_current_user)):
+    """Stop tracemalloc and drop stored snapshots (admin only)"""
+    require_admin(current_user)
+    memory_tracker.stop()
+    return {"status": "stopped"}
@@ -10,6 +10,22 @@ from app.models.user import User
 router = APIRouter()
 
 
+def product_to_dict(product) -> dict:
+    """Serialize a product for the list endpoint"""
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "price": product.price,
+        "category": product.category,
+        "image_url": product.image_url,
+        "stock_quantity": product.stock_quantity,
+        "is_active": product.is_active,
+        "created_at": product.created_at.isoformat() if product.created_at else None,
+        "updated_at": product.updated_at.isoformat() if product.updated_at else None
+    }
+
+
 @router.get("/")
 async def get_products(
     skip: int = 0,
@@ -24,22 +40,7 @@ async def get_products(
         products = product_service.get_products(skip=skip, limit=limit, category=category, search=search)
         
         # Convert to simple dict format for now
-        result = []
-        for product in products:
-            result.append({
-                "id": product.id,
-                "name": product.name,
-                "description": product.description,
-                "price": product.price,
-                "category": product.category,
-                "image_url": product.image_url,
-                "stock_quantity": product.stock_quantity,
-                "is_active": product.is_active,
-                "created_at": product.created_at.isoformat() if product.created_at else None,
-                "updated_at": product.updated_at.isoformat() if product.updated_at else None
-            })
-        
-        return result
+        return [product_to_dict(product) for product in products]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
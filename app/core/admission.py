@@ -0,0 +1,185 @@
+import json
+import time
+import random
+import threading
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+admission_decisions = metrics.counter(
+    "ingestion_admission_total", "Ingestion requests by route kind and admission decision", ("kind", "decision")
+)
+
+# Ingestion routes by path prefix; the JSON API ones are POST only
+BEACON_PREFIX = f"{settings.API_V1_STR}/beacon/"
+INGESTION_API_PREFIXES = tuple(
+    f"{settings.API_V1_STR}/analytics{path}" for path in ("/track", "/page-view", "/product-view", "/purchase")
+)
+
+# Load (in-flight / limit) above which each degradation tier applies
+TIERS = (("drop", 2.0), ("spool", 1.5), ("sample", 1.0))
+
+
+class AIMDLimiter:
+    """Adaptive concurrency limit: additive increase, multiplicative decrease
+
+    Every admitted request that finishes within the target latency grows the
+    limit by 1/limit (about +1 per limit's worth of requests); a slow or
+    failed one shrinks it by backoff_ratio, at most once per target latency
+    so one burst of slow requests counts as a single congestion signal.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        target_latency: float,
+        backoff_ratio: float = 0.9
+    ):
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> float:
+        """Load a new request would bring, as a multiple of the limit"""
+        return (self.in_flight + 1) / self.limit
+
+    def acquire(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self, latency: float, failed: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if failed or latency > self.target_latency:
+                if now - self._last_decrease >= self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": round(self.limit, 3), "in_flight": self.in_flight}
+
+
+def ingestion_kind(scope) -> Optional[str]:
+    """'beacon' or 'api' for ingestion routes, None for everything else (including CORS preflights)"""
+    if scope["method"] == "OPTIONS":
+        return None
+    if scope["path"].startswith(BEACON_PREFIX):
+        return "beacon"
+    if scope["method"] == "POST" and scope["path"].startswith(INGESTION_API_PREFIXES):
+        return "api"
+    return None
+
+
+def admission_tier(load: float) -> str:
+    for tier, threshold in TIERS:
+        if load > threshold:
+            return tier
+    return "admit"
+
+
+def defers_writes(request) -> bool:
+    """Whether admission control moved this request to the spool tier (no synchronous DB write)"""
+    return getattr(request.state, "admission_tier", None) == "spool"
+
+
+def admission_sample_rate(request) -> float:
+    """Share of beacon requests admission control accepted alongside this one (1.0 on the JSON API)"""
+    return getattr(request.state, "admission_sample_rate", 1.0)
+
+
+class AdmissionMiddleware:
+    """Adaptive admission control for the event ingestion routes
+
+    Beacon and /analytics event-tracking requests share an AIMD concurrency limit
+    driven by their own latency, so ingestion backs off before it can
+    exhaust the DB pool or event loop that catalog and checkout need. Other
+    routes pass straight through. Past the limit requests degrade in tiers:
+
+    - sample: only ADMISSION_SAMPLE_RATE of requests are accepted
+    - spool: as sample, and accepted requests skip the DB write; they are
+      handed to the consumer through the broker (or the local spool while
+      it is down)
+    - drop: nothing is accepted
+
+    Requests that are not accepted get 204 on beacon routes (browsers do
+    not retry sendBeacon) and 429 with Retry-After on the JSON API. Since
+    shed beacons are lost, accepted ones are stored with ADMISSION_SAMPLE_RATE
+    as their sample_rate and re-weighted in summaries; API events are not,
+    as their shed siblings come back on retry.
+    """
+
+    def __init__(self, app, limiter: AIMDLimiter = None):
+        self.app = app
+        self.limiter = limiter or admission_limiter
+
+    async def _reject(self, kind: str, send):
+        if kind == "beacon":
+            await send({"type": "http.response.start", "status": 204, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = json.dumps({"detail": "Ingestion is overloaded, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        kind = ingestion_kind(scope) if scope["type"] == "http" else None
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        tier = admission_tier(self.limiter.load())
+        if tier == "drop" or (tier != "admit" and random.random() >= settings.ADMISSION_SAMPLE_RATE):
+            admission_decisions.inc(kind=kind, decision="dropped" if tier == "drop" else "sampled_out")
+            await self._reject(kind, send)
+            return
+
+        admission_decisions.inc(kind=kind, decision={"admit": "admitted", "sample": "sampled_in"}.get(tier, "spooled"))
+        state = scope.setdefault("state", {})
+        state["admission_tier"] = tier
+        # Only shed beacons are gone for good; a 429 on the JSON API is retried and lands later
+        if tier != "admit" and kind == "beacon":
+            state["admission_sample_rate"] = settings.ADMISSION_SAMPLE_RATE
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.limiter.acquire()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.limiter.release(time.perf_counter() - start, failed=status_code >= 500)
+
+
+# Global ingestion limiter instance
+admission_limiter = AIMDLimiter(
+    settings.ADMISSION_INITIAL_LIMIT,
+    settings.ADMISSION_MIN_LIMIT,
+    settings.ADMISSION_MAX_LIMIT,
+    settings.ADMISSION_TARGET_LATENCY_MS / 1000
+)
+metrics.register_callback("ingestion_admission", "Adaptive ingestion concurrency limit", admission_limiter.stats)
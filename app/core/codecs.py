@@ -0,0 +1,82 @@
+import json
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/x-msgpack"
+
+
+class JsonCodec:
+    """UTF-8 JSON; datetimes and other non-JSON values become strings"""
+
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, default=str).encode("utf-8")
+
+    def decode(self, body: bytes) -> Dict[str, Any]:
+        return json.loads(body)
+
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        import msgpack
+        # Naive datetimes in this codebase are UTC
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    return str(value)
+
+
+def _naive_utc(data: Dict[str, Any]) -> Dict[str, Any]:
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            data[key] = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+class MsgpackCodec:
+    """msgpack with native timestamps
+
+    Binary, so no escaping or base-10 number formatting, and timestamps
+    travel as 8-12 byte msgpack Timestamps that decode back to naive UTC
+    datetimes instead of ISO strings.
+    """
+
+    name = "msgpack"
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def __init__(self):
+        import msgpack
+        self._msgpack = msgpack
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        # packb rather than a shared Packer: publishes come from many threads
+        return self._msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+    def decode(self, body: bytes) -> Dict[str, Any]:
+        return self._msgpack.unpackb(body, raw=False, timestamp=3, object_hook=_naive_utc)
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+_instances: Dict[str, Any] = {}
+
+
+def get_codec(name: str):
+    """Codec instance by name ("json" or "msgpack"); msgpack is imported on first use"""
+    if name not in CODECS:
+        raise ValueError(f"Unknown message codec: {name}")
+    if name not in _instances:
+        _instances[name] = CODECS[name]()
+    return _instances[name]
+
+
+def codec_for_content_type(content_type: Optional[str]):
+    """Codec for a message's content_type; messages without one (older producers) are JSON"""
+    if content_type == MSGPACK_CONTENT_TYPE:
+        return get_codec(MsgpackCodec.name)
+    return get_codec(JsonCodec.name)
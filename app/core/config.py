@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict, Any
 import os
 
 
@@ -17,7 +17,28 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./shopping_api.db"
-    
+    DATABASE_REPLICA_URLS: List[str] = []  # read-only replicas, used round-robin
+    DB_REPLICA_EJECT_SECONDS: int = 30  # how long a failing replica is skipped
+
+    # Database engine profile (pool settings are ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # seconds to wait for a pooled connection
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+
+    # SQLite pragmas applied on every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes
+    SQLITE_CACHE_SIZE: int = -64000  # negative values are KiB
+    SQLITE_BUSY_TIMEOUT: int = 5000  # milliseconds
+
+    # Query instrumentation
+    DB_SLOW_QUERY_MS: float = 200  # log statements slower than this, 0 disables
+    DB_EXPLAIN_SLOW_QUERIES: bool = False  # attach the query plan to slow SELECT logs
+    DB_N_PLUS_ONE_THRESHOLD: int = 10  # same statement this many times in one request
+
     # Environment
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
@@ -28,6 +49,19 @@ class Settings(BaseSettings):
     RABBITMQ_USERNAME: str = "guest"
     RABBITMQ_PASSWORD: str = "guest"
     RABBITMQ_VIRTUAL_HOST: str = "/"
+    RABBITMQ_CONNECT_TIMEOUT: float = 2.0  # seconds per connection attempt
+    RABBITMQ_RECONNECT_MIN_SECONDS: float = 1.0  # backoff after the first failure, doubling per failure
+    RABBITMQ_RECONNECT_MAX_SECONDS: float = 60.0
+    RABBITMQ_HEARTBEAT_CHECK_SECONDS: float = 5.0  # how often an idle publisher services its connection
+    ANALYTICS_TRANSPORT: str = "rabbitmq"  # "memory" keeps published events in process (benchmarks, tests)
+    ANALYTICS_CODEC: str = "json"  # "msgpack" once every consumer decodes by content_type
+    
+    # Local spool for events published while RabbitMQ is unavailable
+    SPOOL_ENABLED: bool = True
+    SPOOL_DIR: str = "./spool/analytics"  # each worker process spools in its own worker-<pid> subdirectory
+    SPOOL_SEGMENT_BYTES: int = 8 * 1024 * 1024
+    SPOOL_MAX_BYTES: int = 512 * 1024 * 1024  # new events are dropped beyond this
+    SPOOL_FSYNC_INTERVAL_MS: float = 50  # appends arriving within this window share one fsync
     
     # Redis Configuration
     REDIS_HOST: str = "localhost"
@@ -40,6 +74,57 @@ class Settings(BaseSettings):
     ANALYTICS_QUEUE_NAME: str = "analytics_events"
     ANALYTICS_BATCH_SIZE: int = 100
     ANALYTICS_FLUSH_INTERVAL: int = 60  # seconds
+    ANALYTICS_WRITE_MODE: str = "sync"  # "sync" writes in the request, "deferred" lets the consumer bulk-write
+    ANALYTICS_INDEX_PROFILE: str = "full"  # "full", "ingest" or "minimal"
+    ANALYTICS_PARTITION_INTERVAL: str = ""  # "", "day" or "month"
+    ANALYTICS_RETENTION_DAYS: int = 0  # drop whole partitions older than this, 0 keeps all
+    ANALYTICS_ARCHIVE_DIR: str = "./archive/analytics"
+    ANALYTICS_ARCHIVE_AFTER_DAYS: int = 30
+    ANALYTICS_ARCHIVE_CHUNK_ROWS: int = 50000
+    ANALYTICS_DEDUP_ENABLED: bool = True  # drop events whose client event_id was already seen
+    ANALYTICS_DEDUP_WINDOW_SECONDS: int = 3600  # IDs are remembered for one to two windows
+    ANALYTICS_DEDUP_CAPACITY: int = 1000000  # IDs per window before the filter rotates early
+    ANALYTICS_DEDUP_FALSE_POSITIVE_RATE: float = 0.001
+    # Sampling before enrichment, e.g. [{"event_type": "page_view", "rate": 0.1}] (event_name is optional)
+    ANALYTICS_SAMPLING_RULES: List[Dict[str, Any]] = []
+    ANALYTICS_DROP_EVENTS: List[str] = []  # "event_type" or "event_type:event_name"
+    ANALYTICS_DEFAULT_SAMPLE_RATE: float = 1.0
+    ANALYTICS_UA_PARSING_ENABLED: bool = True  # store device class, OS, browser and bot flag per event
+    ANALYTICS_UA_CACHE_SIZE: int = 10000  # distinct user agents kept parsed per process
+    ANALYTICS_GEO_ENABLED: bool = True  # country and region from ip_address (needs the geo table)
+    ANALYTICS_GEO_TABLE_PATH: str = "./data/geo/ip_ranges.bin"  # built with analytics_maintenance.py geo-build
+    ANALYTICS_GEO_CACHE_SIZE: int = 4096  # addresses kept resolved per process
+    ANALYTICS_DIMENSION_CACHE_SIZE: int = 100000  # dimension ids cached per field (event_name, page_url, ...)
+    ANALYTICS_SESSIONIZATION_ENABLED: bool = True  # consumer stitches events into sessions and stores summaries
+    ANALYTICS_SESSION_TIMEOUT_SECONDS: int = 1800  # inactivity that ends a session
+    ANALYTICS_SESSION_MAX_ACTIVE: int = 100000  # open sessions kept; the least recently active closes first
+    ANALYTICS_SESSION_ALLOWED_LATENESS_SECONDS: int = 300  # event-time lag behind the wall clock before idle sessions expire anyway
+    
+    # Compressed request bodies (gzip/deflate; br needs brotli >= 1.2 installed)
+    MAX_DECOMPRESSED_BODY_BYTES: int = 10 * 1024 * 1024
+    
+    # Admission control for /beacon/* and /analytics/track* (AIMD concurrency limit)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_INITIAL_LIMIT: int = 4
+    ADMISSION_MIN_LIMIT: int = 1
+    ADMISSION_MAX_LIMIT: int = 8  # keep well below DB_POOL_SIZE + DB_MAX_OVERFLOW
+    ADMISSION_TARGET_LATENCY_MS: float = 100  # slower ingestion requests shrink the limit
+    ADMISSION_SAMPLE_RATE: float = 0.5  # share of requests accepted once over the limit
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    
+    # Metrics
+    METRICS_ENABLED: bool = True  # per-route request metrics and the /metrics endpoint
+    
+    # Profiling (admin only: X-Profile header or ?profile= flag, /api/v1/debug endpoints)
+    PROFILING_ENABLED: bool = False  # also mounts /api/v1/debug; enable where admins need it
+    PROFILING_DIR: str = "./profiles"
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5
+    
+    # Memory tracking (tracemalloc; also toggled at runtime via SIGUSR1, and /api/v1/debug/memory with PROFILING_ENABLED)
+    MEMORY_TRACKING_ENABLED: bool = False  # start tracing at process start
+    MEMORY_TRACE_FRAMES: int = 10
+    MEMORY_SNAPSHOT_INTERVAL: int = 0  # seconds between automatic snapshots, 0 disables
+    MEMORY_SNAPSHOTS_KEPT: int = 5
     
     class Config:
         env_file = ".env"
@@ -1,16 +1,279 @@
-from sqlalchemy import create_engine
+import functools
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+from sqlalchemy import create_engine, event, Select
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
+from app.core.query_stats import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time and in-use connections"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                if timed_out:
+                    self.checkout_timeouts += 1
+                else:
+                    self.checkouts += 1
+                self.checkout_wait_total += waited
+                if waited > self.checkout_wait_max:
+                    self.checkout_wait_max = waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool gauges and checkout counters"""
+        with self._stats_lock:
+            checkouts = self.checkouts
+            wait_total = self.checkout_wait_total
+            return {
+                "pool_size": self.size(),
+                "in_use": self.checkedout(),
+                "idle": self.checkedin(),
+                "overflow": self.overflow(),
+                "checkouts": checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_wait_avg_ms": round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "checkout_wait_max_ms": round(self.checkout_wait_max * 1000, 3),
+            }
+
+
+def _is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the write-optimized SQLite pragmas to a new DBAPI connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(database_url: str) -> Engine:
+    """Create an engine using the pool profile from settings"""
+    kwargs: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    if _is_sqlite(database_url):
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    # In-memory SQLite uses a singleton pool, which takes no sizing options
+    if not _is_memory_sqlite(database_url):
+        kwargs.update({
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+        })
+
+    db_engine = create_engine(database_url, **kwargs)
+
+    if _is_sqlite(database_url):
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(db_engine)
+
+    return db_engine
+
+
+def get_pool_stats(db_engine: Engine = None) -> Dict[str, Any]:
+    """Return pool gauges for an engine (defaults to the primary engine)"""
+    pool = (db_engine or engine).pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"pool": pool.status()}
+
+
+class ReplicaSet:
+    """Round-robin set of read replicas with health-based ejection"""
+
+    def __init__(self, engines: List[Engine], eject_seconds: float = 30):
+        self.engines = engines
+        self.eject_seconds = eject_seconds
+        self._ejected_until: Dict[int, float] = {}
+        self._counter = itertools.count()
+        for replica in engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def _on_error(self, context):
+        """Eject a replica when its connection fails"""
+        if context.is_disconnect or context.connection is None:
+            self.eject(context.engine)
+
+    def eject(self, replica: Engine):
+        logger.warning(f"Ejecting read replica {replica.url!r} for {self.eject_seconds}s")
+        self._ejected_until[id(replica)] = time.monotonic() + self.eject_seconds
+
+    def is_ejected(self, replica: Engine) -> bool:
+        return self._ejected_until.get(id(replica), 0) > time.monotonic()
+
+    def healthy(self) -> List[Engine]:
+        now = time.monotonic()
+        return [
+            replica for replica in self.engines
+            if self._ejected_until.get(id(replica), 0) <= now
+        ]
+
+    def choose(self) -> Optional[Engine]:
+        """Pick the next healthy replica, or None if all are ejected"""
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        return candidates[next(self._counter) % len(candidates)]
+
+
+# Set while running read-only service methods and GET requests
+_read_only_scope: ContextVar[bool] = ContextVar("db_read_only_scope", default=False)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to replicas and everything else to the primary
+
+    Reads are routed only inside a read-only scope. Once the session writes,
+    it is pinned to the primary so later reads see its own changes. A read
+    that fails because its replica went away (and got ejected) is retried
+    once on the primary instead of failing the request.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.pinned_to_primary = False
+        # Replica the statement being executed was routed to
+        self._replica: Optional[Engine] = None
+        self._retrying_on_primary = False
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        is_write = self._flushing or (clause is not None and not isinstance(clause, Select))
+        if is_write:
+            self.pinned_to_primary = True
+        elif (
+            isinstance(clause, Select) and self.replicas and _read_only_scope.get()
+            and not self.pinned_to_primary and not self._retrying_on_primary
+        ):
+            replica = self.replicas.choose()
+            if replica is not None:
+                self._replica = replica
+                return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def _execute_internal(self, *args, **kwargs):
+        # Backs execute(), scalar() and scalars(), and so every ORM query and lazy load
+        self._replica = None
+        try:
+            return super()._execute_internal(*args, **kwargs)
+        except DBAPIError as e:
+            replica = self._replica
+            if replica is None or self._retrying_on_primary or not self.replicas.is_ejected(replica):
+                raise
+            logger.warning(f"Read on replica {replica.url!r} failed, retrying on the primary: {e!r}")
+            # Drops the broken replica connection; the session has not written anything
+            self.rollback()
+            self._retrying_on_primary = True
+            try:
+                return super()._execute_internal(*args, **kwargs)
+            finally:
+                self._retrying_on_primary = False
+
+
+def read_only(func):
+    """Mark a service method as safe to run against a read replica"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _read_only_scope.set(True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_only_scope.reset(token)
+    return wrapper
+
+
+@contextmanager
+def on_primary():
+    """Send reads in this block to the primary, even inside a read-only scope"""
+    token = _read_only_scope.set(False)
+    try:
+        yield
+    finally:
+        _read_only_scope.reset(token)
+
+
+class ReplicaRoutingMiddleware:
+    """ASGI middleware that opens a read-only scope for GET/HEAD requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        token = _read_only_scope.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _read_only_scope.reset(token)
+
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+engine = create_db_engine(settings.DATABASE_URL)
+
+# Create read replica engines
+replica_set = ReplicaSet(
+    [create_db_engine(url) for url in settings.DATABASE_REPLICA_URLS],
+    eject_seconds=settings.DB_REPLICA_EJECT_SECONDS
 )
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    replicas=replica_set
+)
 
 # Create Base class
 Base = declarative_base()
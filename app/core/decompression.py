@@ -0,0 +1,183 @@
+import zlib
+import logging
+from typing import Callable, Dict, Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+decompressed_requests = metrics.counter(
+    "http_request_decompressed_total", "Compressed request bodies by encoding and result", ("encoding", "result")
+)
+
+# Output produced per decompress() call, so a bomb never inflates past the limit in one step
+CHUNK_BYTES = 64 * 1024
+
+
+class ZlibDecoder:
+    """Incremental gzip / deflate decoder; deflate accepts zlib-wrapped and raw streams"""
+
+    def __init__(self, encoding: str):
+        self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        self._raw_fallback = encoding == "deflate"
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        data = self._decoder.unconsumed_tail + data
+        try:
+            output = self._decoder.decompress(data, max_length)
+        except zlib.error:
+            # Some clients send raw deflate without the zlib header
+            if not self._raw_fallback:
+                raise
+            self._raw_fallback = False
+            self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            output = self._decoder.decompress(data, max_length)
+        self._raw_fallback = False
+        return output
+
+    @property
+    def pending(self) -> bool:
+        """Input is left over; call decompress(b"") for more output"""
+        return bool(self._decoder.unconsumed_tail)
+
+    def flush(self) -> bytes:
+        return self._decoder.flush()
+
+
+class BrotliDecoder:
+    """Incremental brotli decoder; needs brotli >= 1.2 for bounded output"""
+
+    def __init__(self, encoding: str):
+        import brotli
+        if not hasattr(brotli.Decompressor, "can_accept_more_data"):
+            raise ImportError("brotli >= 1.2 is required to bound decompressed output")
+        self._decoder = brotli.Decompressor()
+        self._filled = False
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        output = self._decoder.process(data, output_buffer_limit=max_length)
+        self._filled = len(output) >= max_length
+        return output
+
+    @property
+    def pending(self) -> bool:
+        # A full output buffer may leave decoded data behind even once all input is taken
+        return not self._decoder.can_accept_more_data() or (self._filled and not self._decoder.is_finished())
+
+    def flush(self) -> bytes:
+        return b""
+
+
+DECODERS: Dict[str, Callable] = {
+    "gzip": ZlibDecoder,
+    "deflate": ZlibDecoder,
+    "br": BrotliDecoder,
+}
+
+
+def create_decoder(encoding: str):
+    """Decoder for a Content-Encoding, or None if it is unsupported here"""
+    factory = DECODERS.get(encoding)
+    if factory is None:
+        return None
+    try:
+        return factory(encoding)
+    except ImportError:
+        # br needs the optional brotli package
+        return None
+
+
+class DecompressionMiddleware:
+    """Decode gzip / deflate (and br when installed) request bodies
+
+    The body is decompressed chunk by chunk as the endpoint reads it, so a
+    large batch is never held compressed and decompressed at once. Output
+    beyond MAX_DECOMPRESSED_BODY_BYTES fails the request with 413; every
+    decoder inflates in 64 KiB steps, so a zip bomb is stopped within one
+    step of the limit. zstd is not accepted: the zstandard package cannot
+    bound the output of one streaming call. Corrupt bodies get 400 and
+    unknown encodings 415.
+    Content-Encoding and Content-Length are removed from the request
+    headers the endpoint sees.
+    """
+
+    def __init__(self, app, max_bytes: int = None):
+        self.app = app
+        self.max_bytes = max_bytes or settings.MAX_DECOMPRESSED_BODY_BYTES
+
+    async def _reply(self, send, status_code: int, detail: str):
+        body = f'{{"detail": "{detail}"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding: Optional[str] = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                encoding = value.decode("latin-1").strip().lower()
+            elif name != b"content-length":
+                headers.append((name, value))
+        if encoding is None or encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        decoder = create_decoder(encoding)
+        if decoder is None:
+            decompressed_requests.inc(encoding="other", result="unsupported")
+            await self._reply(send, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"Unsupported Content-Encoding: {encoding}")
+            return
+
+        max_bytes = self.max_bytes
+        total = 0
+        finished = False
+
+        def check_size(output: bytes) -> bytes:
+            nonlocal total
+            total += len(output)
+            if total > max_bytes:
+                decompressed_requests.inc(encoding=encoding, result="too_large")
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Decompressed body exceeds {max_bytes} bytes"
+                )
+            return output
+
+        async def receive_decompressed():
+            nonlocal finished
+            if finished:
+                return await receive()
+
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+
+            more_body = message.get("more_body", False)
+            try:
+                output = check_size(decoder.decompress(message.get("body", b""), CHUNK_BYTES))
+                chunks = [output]
+                while decoder.pending:
+                    chunks.append(check_size(decoder.decompress(b"", CHUNK_BYTES)))
+                if not more_body:
+                    chunks.append(check_size(decoder.flush()))
+                    finished = True
+                    decompressed_requests.inc(encoding=encoding, result="ok")
+            except HTTPException:
+                raise
+            except Exception as e:
+                decompressed_requests.inc(encoding=encoding, result="invalid")
+                logger.warning(f"Invalid {encoding} request body: {e}")
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {encoding} body")
+
+            return {"type": "http.request", "body": b"".join(chunks), "more_body": more_body}
+
+        await self.app({**scope, "headers": headers}, receive_decompressed, send)
@@ -0,0 +1,108 @@
+import math
+import time
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def contains(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def false_positive_rate(self) -> float:
+        """Expected false-positive probability at the current fill"""
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class EventDeduplicator:
+    """Time-windowed set of recently seen client event IDs
+
+    IDs go into the current Bloom filter generation; lookups check the
+    current and previous generations, so an ID is remembered for between
+    one and two windows. A generation also rotates early once it holds
+    capacity IDs, which keeps the false-positive rate near its target and
+    memory fixed at two filters.
+
+    Callers check seen() before doing any I/O and add() only once the event
+    has been stored or handed off, so a failed write can still be retried.
+    """
+
+    def __init__(self, window_seconds: float, capacity: int, false_positive_rate: float):
+        self.window_seconds = window_seconds
+        self.capacity = capacity
+        self.target_false_positive_rate = false_positive_rate
+        self._lock = threading.Lock()
+        self._current = BloomFilter(capacity, false_positive_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._rotated_at = time.monotonic()
+        self.checked = 0
+        self.duplicates = 0
+
+    def _rotate_if_due(self):
+        if time.monotonic() - self._rotated_at >= self.window_seconds or self._current.count >= self.capacity:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.target_false_positive_rate)
+            self._rotated_at = time.monotonic()
+
+    def seen(self, event_id: str) -> bool:
+        """Whether event_id was added within the window (counts toward the duplicate rate)"""
+        with self._lock:
+            self._rotate_if_due()
+            self.checked += 1
+            duplicate = self._current.contains(event_id) or (
+                self._previous is not None and self._previous.contains(event_id)
+            )
+            if duplicate:
+                self.duplicates += 1
+            return duplicate
+
+    def add(self, event_id: str):
+        with self._lock:
+            self._rotate_if_due()
+            self._current.add(event_id)
+
+    def false_positive_rate(self) -> float:
+        """Chance that a new ID is wrongly reported as seen"""
+        current = self._current.false_positive_rate()
+        previous = self._previous.false_positive_rate() if self._previous is not None else 0.0
+        return 1 - (1 - current) * (1 - previous)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "checked_total": self.checked,
+            "duplicates_total": self.duplicates,
+            "duplicate_rate": round(self.duplicates / self.checked, 6) if self.checked else 0.0,
+            "false_positive_rate": round(self.false_positive_rate(), 8),
+            "window_ids": self._current.count + (self._previous.count if self._previous is not None else 0),
+            "memory_bytes": len(self._current.bits) * 2,
+        }
+
+
+# Global event deduplicator instance (one per process)
+event_deduplicator = EventDeduplicator(
+    settings.ANALYTICS_DEDUP_WINDOW_SECONDS,
+    settings.ANALYTICS_DEDUP_CAPACITY,
+    settings.ANALYTICS_DEDUP_FALSE_POSITIVE_RATE
+)
+metrics.register_callback("analytics_dedup", "Client event ID deduplication", event_deduplicator.stats)
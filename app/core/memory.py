@@ -0,0 +1,191 @@
+import gc
+import logging
+import threading
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size from /proc, where available"""
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _type_counts() -> Counter:
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+class MemoryTracker:
+    """tracemalloc snapshots diffed against a baseline, plus per-type object counts
+
+    Tracing costs CPU and memory of its own, so it only runs between start()
+    and stop(). Periodic snapshots keep the last few in a ring and log the
+    biggest growth since the baseline on each tick. request_report() asks
+    the same thread for an extra tick; it only sets an event, so a signal
+    handler can call it without running gc or tracemalloc work (or taking
+    _lock) on top of whatever the interrupted main thread was doing.
+    """
+
+    def __init__(self, frames: int = 10, keep: int = 5):
+        self.frames = frames
+        self.snapshots: deque = deque(maxlen=keep)
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.baseline_types: Optional[Counter] = None
+        self.baseline_taken_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._report_requested = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        """Start tracing and take the baseline"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.set_baseline()
+
+    def stop(self):
+        self.stop_periodic()
+        with self._lock:
+            self.snapshots.clear()
+            self.baseline = self.baseline_types = self.baseline_taken_at = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        # Hide the tracer's own bookkeeping from the results
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def set_baseline(self):
+        snapshot, types = self._snapshot(), _type_counts()
+        with self._lock:
+            self.baseline, self.baseline_types = snapshot, types
+            self.baseline_taken_at = datetime.utcnow()
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        snapshot = self._snapshot()
+        with self._lock:
+            self.snapshots.append((datetime.utcnow(), snapshot))
+        return snapshot
+
+    def report(self, top: int = 20, key_type: str = "lineno") -> Dict[str, Any]:
+        """Top allocation sites and object types that grew since the baseline"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracking is not running")
+        if self.baseline is None:
+            self.set_baseline()
+
+        snapshot = self.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        sites = []
+        for stat in snapshot.compare_to(self.baseline, key_type)[:top]:
+            frame = stat.traceback[0]
+            sites.append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            })
+
+        types = _type_counts()
+        growth = Counter(types)
+        growth.subtract(self.baseline_types or Counter())
+        return {
+            "rss_bytes": _rss_bytes(),
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "baseline_taken_at": self.baseline_taken_at.isoformat() if self.baseline_taken_at else None,
+            "top_sites": sites,
+            "top_types": [{"type": name, "count": count} for name, count in types.most_common(top)],
+            "type_growth": [
+                {"type": name, "count_diff": diff} for name, diff in growth.most_common(top) if diff > 0
+            ],
+        }
+
+    def log_report(self, top: int = 10):
+        """Start tracking on first use; afterwards log growth since the baseline"""
+        if not tracemalloc.is_tracing():
+            self.start()
+            logger.info("Memory tracking started, baseline taken")
+            return
+
+        report = self.report(top)
+        logger.info(
+            f"Memory: rss={report['rss_bytes']} traced={report['traced_bytes']} "
+            f"peak={report['traced_peak_bytes']} since {report['baseline_taken_at']}"
+        )
+        for site in report["top_sites"]:
+            logger.info(f"  {site['size_diff_kb']:+.1f} KiB ({site['count_diff']:+d} blocks) {site['location']}")
+        for entry in report["type_growth"]:
+            logger.info(f"  {entry['count_diff']:+d} {entry['type']} objects")
+
+    def request_report(self):
+        """Have the snapshot thread run log_report() now (safe to call from a signal handler)"""
+        self._report_requested.set()
+
+    def _run_periodic(self, interval: float):
+        while True:
+            self._report_requested.wait(interval or None)
+            if self._stop.is_set():
+                return
+            self._report_requested.clear()
+            try:
+                self.log_report()
+            except Exception as e:
+                logger.error(f"Periodic memory snapshot failed: {e}")
+
+    def start_periodic(self, interval: float):
+        """Take a snapshot and log growth every interval seconds, or only on request_report() if 0"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if interval and not tracemalloc.is_tracing():
+            self.start()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run_periodic, args=(interval,), name="memory-snapshots", daemon=True
+        )
+        self._thread.start()
+
+    def stop_periodic(self):
+        self._stop.set()
+        self._report_requested.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def snapshot_times(self) -> List[str]:
+        with self._lock:
+            return [taken_at.isoformat() for taken_at, _ in self.snapshots]
+
+
+def start_memory_tracking():
+    """Apply the MEMORY_* settings at process start"""
+    if not settings.MEMORY_TRACKING_ENABLED:
+        return
+    memory_tracker.start()
+    if settings.MEMORY_SNAPSHOT_INTERVAL > 0:
+        memory_tracker.start_periodic(settings.MEMORY_SNAPSHOT_INTERVAL)
+    logger.info("Memory tracking enabled")
+
+
+# Global memory tracker instance
+memory_tracker = MemoryTracker(frames=settings.MEMORY_TRACE_FRAMES, keep=settings.MEMORY_SNAPSHOTS_KEPT)
@@ -0,0 +1,328 @@
+import bisect
+import threading
+import time
+from typing import Dict, Any, List, Tuple, Callable, Sequence
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class for labelled metrics
+
+    Each label set gets a child holding its value; hot paths should bind a
+    child once with labels() and reuse it instead of passing keyword labels.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child metric for one label set, given in labelnames order"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _child(self, labels: Dict[str, Any]):
+        return self.labels(*(labels.get(name, "") for name in self.labelnames))
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(self.name, _format_labels(self.labelnames, key), child.value) for key, child in items]
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _ValueChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1, **labels):
+        self._child(labels).inc(amount)
+
+    def value(self, **labels) -> float:
+        return self._child(labels).value
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value: float, **labels):
+        self._child(labels).set(value)
+
+    def inc(self, amount: float = 1, **labels):
+        self._child(labels).inc(amount)
+
+    def dec(self, amount: float = 1, **labels):
+        self._child(labels).dec(amount)
+
+    def value(self, **labels) -> float:
+        return self._child(labels).value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow slot
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, **labels):
+        self._child(labels).observe(value)
+
+    def count(self, **labels) -> int:
+        return sum(self._child(labels).counts)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._children.items())
+
+        samples = []
+        for key, child in items:
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                samples.append((f"{self.name}_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """Holds metrics and gauge callbacks and renders the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._callbacks: List[Tuple[str, str, Callable[[], Dict[str, float]]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_callback(self, prefix: str, documentation: str, callback: Callable[[], Dict[str, float]]):
+        """Expose stats from another subsystem as gauges named prefix_<key>
+
+        The callback runs at scrape time and returns a flat dict of numbers;
+        non-numeric values are skipped. This is the hook for pool, buffer,
+        publisher and cache statistics.
+        """
+        with self._lock:
+            self._callbacks = [entry for entry in self._callbacks if entry[0] != prefix]
+            self._callbacks.append((prefix, documentation, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            callbacks = list(self._callbacks)
+
+        blocks = [metric.render() for metric in metrics]
+        for prefix, documentation, callback in callbacks:
+            try:
+                values = callback() or {}
+            except Exception as e:
+                blocks.append(f"# {prefix} collection failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                blocks.append(f"# HELP {name} {documentation}\n# TYPE {name} gauge\n{name} {_format_value(value)}")
+        return "\n".join(blocks) + "\n"
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+http_response_size = metrics.histogram(
+    "http_response_size_bytes", "HTTP response body size by route", ("method", "route"), DEFAULT_SIZE_BUCKETS
+)
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ("method",)
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, in-flight requests and response sizes
+
+    Routes are labelled by their path template (e.g. /api/v1/products/{product_id})
+    looked up from the endpoint the router matched, so label cardinality stays
+    bounded. Bound metric children are cached per (method, route, status) to
+    keep the per-request cost to a few dict lookups.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_templates: Dict[Any, str] = {}
+        self._children: Dict[Tuple, Tuple[Any, Any]] = {}
+        self._in_flight: Dict[str, Any] = {}
+
+    def _route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        template = self._route_templates.get(endpoint)
+        if template is None:
+            template = "unmatched"
+            for route in getattr(scope.get("app"), "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    template = route.path
+                    break
+            self._route_templates[endpoint] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = self._in_flight.get(method)
+        if in_flight is None:
+            in_flight = self._in_flight[method] = http_requests_in_flight.labels(method)
+        start = time.perf_counter()
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            else:
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            key = (method, self._route_template(scope), status_code)
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    http_request_duration.labels(*key),
+                    http_response_size.labels(key[0], key[1])
+                )
+            children[0].observe(elapsed)
+            children[1].observe(response_size)
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of every registered metric"""
+    return metrics.render()
@@ -0,0 +1,185 @@
+import logging
+from typing import Dict, List, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from app.core.database import engine
+from app.models.analytics import AnalyticsEvent, AnalyticsSession, ANALYTICS_INDEXES, DIMENSIONS, analytics_index_names
+from app.services.analytics_partitions import PartitionManager, partition_index_name
+from app.services.analytics_dimensions import analytics_dimensions, id_column
+
+logger = logging.getLogger(__name__)
+
+
+def _sync_table_indexes(
+    connection: Connection,
+    table_name: str,
+    wanted: Dict[str, tuple],
+    managed: List[str]
+) -> Dict[str, List[str]]:
+    """Create missing wanted indexes and drop managed ones that are not wanted"""
+    existing = {index["name"] for index in inspect(connection).get_indexes(table_name)}
+    created, dropped = [], []
+
+    for name in managed:
+        if name in existing and name not in wanted:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            dropped.append(name)
+
+    for name, columns in wanted.items():
+        if name not in existing:
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table_name} ({', '.join(columns)})"))
+            created.append(name)
+
+    return {"created": created, "dropped": dropped}
+
+
+def sync_analytics_indexes(connection: Connection, profile: str = None) -> Dict[str, Dict[str, List[str]]]:
+    """Bring analytics_events (and SQLite partitions) in line with an index profile"""
+    names = analytics_index_names(profile)
+    results = {}
+
+    base_name = AnalyticsEvent.__tablename__
+    results[base_name] = _sync_table_indexes(
+        connection,
+        base_name,
+        {name: ANALYTICS_INDEXES[name] for name in names},
+        list(ANALYTICS_INDEXES)
+    )
+
+    # Postgres partitions inherit the parent's indexes
+    if connection.dialect.name != "postgresql":
+        partitions = PartitionManager("day")
+        for partition in partitions.partitions(connection):
+            results[partition] = _sync_table_indexes(
+                connection,
+                partition,
+                {partition_index_name(name, partition): ANALYTICS_INDEXES[name] for name in names},
+                [partition_index_name(name, partition) for name in ANALYTICS_INDEXES]
+            )
+
+    for table_name, changes in results.items():
+        if changes["created"] or changes["dropped"]:
+            logger.info(f"Indexes on {table_name}: created {changes['created']}, dropped {changes['dropped']}")
+    return results
+
+
+def _add_missing_columns(connection: Connection, table_name: str, columns: Dict[str, str]) -> List[str]:
+    """ALTER TABLE ... ADD COLUMN for each column the table does not have yet"""
+    existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    added = []
+    for name, column_type in columns.items():
+        if name not in existing:
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"))
+            added.append(name)
+    if added:
+        logger.info(f"Columns added to {table_name}: {added}")
+    return added
+
+
+def _analytics_tables(connection: Connection) -> List[str]:
+    """analytics_events and, on SQLite, every partition table"""
+    tables = [AnalyticsEvent.__tablename__]
+    # Postgres partitions inherit the parent's columns
+    if connection.dialect.name != "postgresql":
+        tables.extend(PartitionManager("day").partitions(connection))
+    return tables
+
+
+def _add_analytics_columns(connection: Connection, columns: Dict[str, str]) -> Dict[str, List[str]]:
+    """Add columns to analytics_events and, on SQLite, to every partition table"""
+    return {table_name: _add_missing_columns(connection, table_name, columns) for table_name in _analytics_tables(connection)}
+
+
+def add_analytics_event_id(connection: Connection) -> Dict[str, List[str]]:
+    """Add the nullable client event_id column"""
+    return _add_analytics_columns(connection, {"event_id": "VARCHAR"})
+
+
+def add_analytics_sample_rate(connection: Connection) -> Dict[str, List[str]]:
+    """Add the nullable sample_rate column (NULL rows count as unsampled)"""
+    return _add_analytics_columns(connection, {"sample_rate": "FLOAT"})
+
+
+def add_analytics_user_agent_fields(connection: Connection) -> Dict[str, List[str]]:
+    """Add the nullable parsed user-agent columns (older rows stay NULL)"""
+    return _add_analytics_columns(connection, {
+        "device_class": "VARCHAR(16)",
+        "os_family": "VARCHAR(32)",
+        "browser_family": "VARCHAR(32)",
+        "is_bot": "BOOLEAN",
+    })
+
+
+def add_analytics_geo_fields(connection: Connection) -> Dict[str, List[str]]:
+    """Add the nullable country and region columns"""
+    return _add_analytics_columns(connection, {"country": "VARCHAR(2)", "region": "VARCHAR(64)"})
+
+
+def encode_analytics_dimensions(connection: Connection) -> Dict[str, List[str]]:
+    """Move event_name, page_url, referrer and user_agent text into dimension tables
+
+    Each distinct value is inserted once, rows get the matching <field>_id,
+    and the text column (with any index on it) is dropped.
+    """
+    for dimension in DIMENSIONS.values():
+        dimension.__table__.create(bind=connection, checkfirst=True)
+
+    results = {}
+    for table_name in _analytics_tables(connection):
+        existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+        legacy = [field for field in DIMENSIONS if field in existing]
+        if not legacy:
+            continue
+        _add_missing_columns(connection, table_name, {id_column(field): "INTEGER" for field in DIMENSIONS})
+
+        for field in legacy:
+            values = [row[0] for row in connection.execute(
+                text(f"SELECT DISTINCT {field} FROM {table_name} WHERE {field} IS NOT NULL")
+            )]
+            if values:
+                ids = analytics_dimensions.get_or_create(connection, field, values)
+                # Keeps the per-value UPDATEs off full table scans; dropped with the column below
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS tmp_{table_name}_{field} ON {table_name} ({field})"))
+                connection.execute(
+                    text(f"UPDATE {table_name} SET {id_column(field)} = :id WHERE {field} = :value"),
+                    [{"id": ids[value], "value": value} for value in values]
+                )
+            # SQLite cannot drop an indexed column
+            for index in inspect(connection).get_indexes(table_name):
+                if field in index["column_names"]:
+                    connection.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+            connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {field}"))
+
+        results[table_name] = legacy
+        logger.info(f"Dictionary-encoded {legacy} in {table_name}")
+    return results
+
+
+def create_analytics_sessions(connection: Connection) -> List[str]:
+    """Create the session summary table written by the consumer"""
+    if inspect(connection).has_table(AnalyticsSession.__tablename__):
+        return []
+    AnalyticsSession.__table__.create(bind=connection)
+    logger.info(f"Created {AnalyticsSession.__tablename__}")
+    return [AnalyticsSession.__tablename__]
+
+
+# Idempotent schema migrations, applied in order; indexes are synced last so
+# they can cover columns added by the steps before
+MIGRATIONS = [
+    ("analytics_event_id", add_analytics_event_id),
+    ("analytics_sample_rate", add_analytics_sample_rate),
+    ("analytics_user_agent_fields", add_analytics_user_agent_fields),
+    ("analytics_geo_fields", add_analytics_geo_fields),
+    ("analytics_dimensions", encode_analytics_dimensions),
+    ("analytics_sessions", create_analytics_sessions),
+    ("analytics_index_profile", sync_analytics_indexes),
+]
+
+
+def run_migrations(db_engine: Optional[Engine] = None):
+    """Apply every migration step to an existing database"""
+    with (db_engine or engine).begin() as conn:
+        for name, migration in MIGRATIONS:
+            logger.info(f"Applying migration: {name}")
+            migration(conn)
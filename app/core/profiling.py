@@ -0,0 +1,259 @@
+import io
+import os
+import re
+import sys
+import time
+import pstats
+import asyncio
+import logging
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional, List
+from urllib.parse import parse_qs
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME_PATTERN = re.compile(r"^[\w.-]+\.(pstats|collapsed)$")
+
+
+class StackSampler:
+    """Samples the Python stacks of every thread into collapsed-stack counts
+
+    The output ("frame;frame;frame count" per line) feeds flamegraph.pl,
+    speedscope and similar tools directly.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        own_thread = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _profile_path(name: str) -> str:
+    return os.path.join(settings.PROFILING_DIR, name)
+
+
+def _write_text(path: str, content: str):
+    with open(path, "w") as handle:
+        handle.write(content)
+
+
+def save_profile(label: str, extension: str, write) -> str:
+    """Store a profile under PROFILING_DIR and return its file name"""
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    slug = re.sub(r"[^\w-]+", "_", label).strip("_")[:80] or "profile"
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{slug}.{extension}"
+    write(_profile_path(name))
+    return name
+
+
+def list_profiles() -> List[str]:
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    return sorted(
+        (name for name in os.listdir(settings.PROFILING_DIR) if PROFILE_NAME_PATTERN.match(name)),
+        reverse=True
+    )
+
+
+def read_profile(name: str, limit: int = 50) -> Optional[str]:
+    """Text form of a stored profile: pstats by cumulative time, or the collapsed stacks"""
+    if not PROFILE_NAME_PATTERN.match(name) or not os.path.exists(_profile_path(name)):
+        return None
+    if name.endswith(".collapsed"):
+        with open(_profile_path(name)) as handle:
+            return handle.read()
+
+    output = io.StringIO()
+    stats = pstats.Stats(_profile_path(name), stream=output)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
+
+
+def _requested_mode(scope) -> Optional[str]:
+    """Profiling mode asked for by X-Profile or ?profile=, without touching other requests"""
+    for key, value in scope["headers"]:
+        if key == b"x-profile":
+            return value.decode("latin-1").strip().lower() or "cprofile"
+    query_string = scope.get("query_string", b"")
+    if b"profile=" in query_string:
+        values = parse_qs(query_string.decode("latin-1")).get("profile")
+        if values:
+            return values[0].strip().lower() or "cprofile"
+    return None
+
+
+def _is_admin_request(scope) -> bool:
+    """Resolve the bearer token with get_current_user and check is_admin (blocking; run in a thread)"""
+    from fastapi import HTTPException
+    from app.core.database import SessionLocal
+    from app.services.auth_service import get_current_user
+
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+
+    db = SessionLocal()
+    try:
+        return bool(get_current_user(token, db).is_admin)
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """Profile a single request on demand for admins
+
+    A request carrying an ``X-Profile`` header or ``?profile=`` query flag
+    from an admin user runs under cProfile ("cprofile", the default) or the
+    stack sampler ("sample"). The profile is stored under PROFILING_DIR and
+    its name returned in the ``X-Profile-Id`` response header. Requests
+    without the flag only pay for the header scan.
+
+    One request is profiled at a time; a second flagged request gets 409.
+    cProfile hooks the event loop thread, so it also records any request
+    running concurrently on the loop and misses plain ``def`` endpoints,
+    which run in the threadpool. Use "sample" for those: the sampler walks
+    every thread's stack.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = asyncio.Lock()
+
+    async def _reply_busy(self, send):
+        body = b'{"detail": "Another request is being profiled"}'
+        await send({
+            "type": "http.response.start",
+            "status": 409,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = _requested_mode(scope)
+        if mode is None or not await run_in_threadpool(_is_admin_request, scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self._lock.locked():
+            await self._reply_busy(send)
+            return
+        async with self._lock:
+            await self._profile(scope, receive, send, mode)
+
+    async def _profile(self, scope, receive, send, mode: str):
+        label = f"{scope['method']}-{scope['path']}"
+        profile_name = None
+
+        if mode == "sample":
+            sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+            sampler.start()
+
+            def finish():
+                nonlocal profile_name
+                if sampler.running:
+                    sampler.stop()
+                    profile_name = save_profile(label, "collapsed", lambda path: _write_text(path, sampler.collapsed()))
+        else:
+            profiler = cProfile.Profile()
+
+            def finish():
+                nonlocal profile_name
+                if profile_name is None:
+                    profiler.disable()
+                    profile_name = save_profile(label, "pstats", profiler.dump_stats)
+
+        async def send_wrapper(message):
+            # Responses are rendered before they start, so stop here and report the id
+            if message["type"] == "http.response.start":
+                finish()
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_name.encode())]}
+            await send(message)
+
+        if mode != "sample":
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process, e.g. an attached tool
+                await self._reply_busy(send)
+                return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            logger.info(f"Profiled {label} ({mode}) in {time.perf_counter() - start:.3f}s: {profile_name}")
+
+
+# Process-wide sampler used by the admin debug endpoint
+_process_sampler_lock = threading.Lock()
+
+
+def acquire_process_sampler(interval: float) -> Optional[StackSampler]:
+    """Start a process-wide sampler unless one is already running"""
+    if not _process_sampler_lock.acquire(blocking=False):
+        return None
+    sampler = StackSampler(interval)
+    sampler.start()
+    return sampler
+
+
+def release_process_sampler(sampler: StackSampler, label: str) -> str:
+    """Stop a process-wide sampler, store its output and return the profile name"""
+    try:
+        sampler.stop()
+        return save_profile(label, "collapsed", lambda path: _write_text(path, sampler.collapsed()))
+    finally:
+        _process_sampler_lock.release()
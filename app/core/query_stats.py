@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+db_queries = metrics.counter("db_queries_total", "SQL statements executed", ("kind",))
+db_query_duration = metrics.histogram("db_query_duration_seconds", "SQL statement latency")
+db_slow_queries = metrics.counter("db_slow_queries_total", "SQL statements over the slow-query threshold")
+db_n_plus_one = metrics.counter("db_n_plus_one_total", "Requests that repeated one statement past the N+1 threshold")
+db_queries_per_request = metrics.histogram(
+    "db_queries_per_request", "SQL statements issued per HTTP request", buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+
+
+class QueryStats:
+    """Query count and time attributed to one unit of work (usually a request)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: StatementCounter = StatementCounter()
+        self.slow: List[Dict[str, Any]] = []
+        self.n_plus_one: List[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float) -> bool:
+        """Add one statement; returns True the first time it crosses the N+1 threshold"""
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            self.statements[statement] += 1
+            repeated = self.statements[statement] == settings.DB_N_PLUS_ONE_THRESHOLD
+            if repeated:
+                self.n_plus_one.append(statement)
+            return repeated
+
+    @property
+    def total_ms(self) -> float:
+        return round(self.total_time * 1000, 3)
+
+
+# Stats for the request currently being served, if any
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _statement_kind(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "unknown"
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """Capture the plan of a slow SELECT on the same DBAPI connection"""
+    if _statement_kind(statement) != "select":
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    db_queries.inc(kind=_statement_kind(statement))
+    db_query_duration.observe(elapsed)
+
+    stats = _current_stats.get()
+    if stats is not None and stats.record(statement, elapsed):
+        db_n_plus_one.inc()
+        logger.warning(
+            f"Possible N+1: statement ran {settings.DB_N_PLUS_ONE_THRESHOLD} times in one request: "
+            f"{statement[:300]}"
+        )
+
+    elapsed_ms = elapsed * 1000
+    if settings.DB_SLOW_QUERY_MS and elapsed_ms >= settings.DB_SLOW_QUERY_MS:
+        db_slow_queries.inc()
+        plan = _explain(conn, statement, parameters) if settings.DB_EXPLAIN_SLOW_QUERIES and not executemany else None
+        if stats is not None:
+            stats.slow.append({"statement": statement, "ms": round(elapsed_ms, 3)})
+        logger.warning(
+            f"Slow query ({elapsed_ms:.1f} ms): {statement[:500]}" + (f"\nPlan:\n{plan}" if plan else "")
+        )
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = context.connection
+    if conn is not None and context.execution_context is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(db_engine: Engine):
+    """Attach the query timing hooks to an engine"""
+    event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(db_engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """Attribute SQL statements to the HTTP request that issued them
+
+    In debug mode the totals are returned as X-DB-Query-Count and
+    X-DB-Query-Time (milliseconds) response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-query-time", str(stats.total_ms).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            db_queries_per_request.observe(stats.count)
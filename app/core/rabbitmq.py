@@ -1,41 +1,129 @@
-import pika
-import json
+import time
+import random
 import logging
-from typing import Optional, Dict, Any
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.codecs import get_codec
+from app.core.spool import EventSpool, SpoolLockedError
+
+if TYPE_CHECKING:
+    import pika
 
 logger = logging.getLogger(__name__)
 
+published_events = metrics.counter(
+    "analytics_events_published_total", "Analytics events handed to RabbitMQ by result", ("result",)
+)
+
+
+class CircuitBreaker:
+    """Exponential-backoff gate for broker connection attempts
+
+    Each consecutive failure opens the circuit for twice as long (with
+    jitter), from min_delay up to max_delay. While it is open no connection
+    is attempted and publishes fail fast; a success closes it again.
+    """
+
+    def __init__(self, min_delay: float = 1.0, max_delay: float = 60.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def state(self) -> str:
+        if self.failures == 0:
+            return "closed"
+        return "open" if time.monotonic() < self.retry_at else "half_open"
+
+    def allow(self) -> bool:
+        return time.monotonic() >= self.retry_at
+
+    def seconds_until_retry(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self) -> float:
+        """Open the circuit and return the delay before the next attempt"""
+        self.failures += 1
+        delay = min(self.max_delay, self.min_delay * 2 ** (self.failures - 1))
+        delay *= random.uniform(0.8, 1.0)
+        self.retry_at = time.monotonic() + delay
+        return delay
+
+
+def connection_parameters() -> "pika.ConnectionParameters":
+    """Broker connection parameters with bounded connect and socket timeouts"""
+    # pika is only needed once a broker connection is made, so import it here
+    import pika
+    credentials = pika.PlainCredentials(
+        settings.RABBITMQ_USERNAME,
+        settings.RABBITMQ_PASSWORD
+    )
+    return pika.ConnectionParameters(
+        host=settings.RABBITMQ_HOST,
+        port=settings.RABBITMQ_PORT,
+        virtual_host=settings.RABBITMQ_VIRTUAL_HOST,
+        credentials=credentials,
+        heartbeat=600,
+        blocked_connection_timeout=300,
+        connection_attempts=1,
+        socket_timeout=settings.RABBITMQ_CONNECT_TIMEOUT,
+        stack_timeout=settings.RABBITMQ_CONNECT_TIMEOUT * 2
+    )
+
 
 class RabbitMQManager:
-    def __init__(self):
-        self.connection: Optional[pika.BlockingConnection] = None
-        self.channel: Optional[pika.channel.Channel] = None
-        self._connect()
+    """Publisher connection owned by a background thread
 
-    def _connect(self):
-        """Establish connection to RabbitMQ"""
+    Nothing connects at import. start() (or the first publish) launches a
+    daemon thread that connects, reconnects with backoff through a circuit
+    breaker and services heartbeats. Publishes never wait for a connection:
+    while the broker is down they go to the spool (if one is configured) or
+    return False immediately. Once the spool holds a backlog new events are
+    spooled behind it so the drainer keeps them in order.
+    """
+
+    def __init__(self, spool: Optional[EventSpool] = None, codec=None):
+        self.spool = spool
+        self.codec = codec or get_codec(settings.ANALYTICS_CODEC)
+        # Message properties per content type (spooled messages keep the codec they were written with)
+        self._properties: Dict[str, "pika.BasicProperties"] = {}
+        self.connection: Optional["pika.BlockingConnection"] = None
+        self.channel: Optional["pika.channel.Channel"] = None
+        self.breaker = CircuitBreaker(
+            settings.RABBITMQ_RECONNECT_MIN_SECONDS,
+            settings.RABBITMQ_RECONNECT_MAX_SECONDS
+        )
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._attempted = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _declare_queue(self, channel):
         try:
-            credentials = pika.PlainCredentials(
-                settings.RABBITMQ_USERNAME,
-                settings.RABBITMQ_PASSWORD
-            )
-            
-            parameters = pika.ConnectionParameters(
-                host=settings.RABBITMQ_HOST,
-                port=settings.RABBITMQ_PORT,
-                virtual_host=settings.RABBITMQ_VIRTUAL_HOST,
-                credentials=credentials,
-                heartbeat=600,
-                blocked_connection_timeout=300
+            channel.queue_declare(
+                queue=settings.ANALYTICS_QUEUE_NAME,
+                durable=True,
+                arguments={
+                    'x-message-ttl': 86400000,  # 24 hours in milliseconds
+                    'x-max-length': 10000  # Max 10k messages
+                }
             )
-            
-            self.connection = pika.BlockingConnection(parameters)
-            self.channel = self.connection.channel()
-            
-            # Declare the analytics queue
+        except Exception as queue_error:
+            # A failed declare closes the channel; reopen it and delete/recreate the queue
+            logger.warning(f"Queue declaration failed, attempting to delete and recreate: {queue_error}")
+            channel = channel.connection.channel()
             try:
-                self.channel.queue_declare(
+                channel.queue_delete(queue=settings.ANALYTICS_QUEUE_NAME)
+                channel.queue_declare(
                     queue=settings.ANALYTICS_QUEUE_NAME,
                     durable=True,
                     arguments={
@@ -43,77 +131,166 @@ class RabbitMQManager:
                         'x-max-length': 10000  # Max 10k messages
                     }
                 )
-            except Exception as queue_error:
-                # If queue exists with different parameters, delete and recreate
-                logger.warning(f"Queue declaration failed, attempting to delete and recreate: {queue_error}")
-                try:
-                    self.channel.queue_delete(queue=settings.ANALYTICS_QUEUE_NAME)
-                    self.channel.queue_declare(
-                        queue=settings.ANALYTICS_QUEUE_NAME,
-                        durable=True,
-                        arguments={
-                            'x-message-ttl': 86400000,  # 24 hours in milliseconds
-                            'x-max-length': 10000  # Max 10k messages
-                        }
-                    )
-                except Exception as recreate_error:
-                    logger.error(f"Failed to recreate queue: {recreate_error}")
-                    # Fallback: declare without arguments
-                    self.channel.queue_declare(queue=settings.ANALYTICS_QUEUE_NAME, durable=True)
-            
+            except Exception as recreate_error:
+                logger.error(f"Failed to recreate queue: {recreate_error}")
+                # Fallback: declare without arguments
+                channel = channel.connection.channel()
+                channel.queue_declare(queue=settings.ANALYTICS_QUEUE_NAME, durable=True)
+        return channel
+
+    def _connect(self):
+        """Establish connection to RabbitMQ (called from the connection thread)"""
+        try:
+            import pika
+            connection = pika.BlockingConnection(connection_parameters())
+            channel = self._declare_queue(connection.channel())
+            with self._lock:
+                self.connection, self.channel = connection, channel
+            self.breaker.record_success()
             logger.info("Successfully connected to RabbitMQ")
+            if self.spool is not None:
+                self.spool.wake()
             
         except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ: {e}")
+            delay = self.breaker.record_failure()
+            logger.error(f"Failed to connect to RabbitMQ: {e!r}; retrying in {delay:.1f}s")
             self.connection = None
             self.channel = None
+        finally:
+            self._attempted.set()
+
+    def _mark_broken(self, error: Exception):
+        """Drop a failed connection and let the connection thread reconnect"""
+        with self._lock:
+            connection, self.connection, self.channel = self.connection, None, None
+        try:
+            if connection and not connection.is_closed:
+                connection.close()
+        except Exception:
+            pass
+        delay = self.breaker.record_failure()
+        logger.warning(f"RabbitMQ connection lost ({error!r}); reconnecting in {delay:.1f}s")
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping:
+            if not self.is_connected():
+                if self.breaker.allow():
+                    self._connect()
+                timeout = self.breaker.seconds_until_retry() if not self.is_connected() else 0
+            else:
+                # Service heartbeats and detect dead connections while idle
+                try:
+                    with self._lock:
+                        self.connection.process_data_events(time_limit=0)
+                except Exception as e:
+                    self._mark_broken(e)
+                timeout = settings.RABBITMQ_HEARTBEAT_CHECK_SECONDS
+            self._wake.wait(max(timeout, 0.05))
+            self._wake.clear()
+
+    def start(self):
+        """Start the background connection thread; never blocks"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="rabbitmq-publisher", daemon=True)
+        self._thread.start()
+        if self.spool is not None:
+            try:
+                self.spool.start_draining(self._publish_raw, self.is_connected)
+            except SpoolLockedError as e:
+                logger.error(f"Spool unavailable, events fall back to synchronous writes: {e}")
+
+    def wait_until_connected(self, timeout: float = None) -> bool:
+        """Start connecting and wait for the first attempt to finish"""
+        self.start()
+        self._attempted.wait(settings.RABBITMQ_CONNECT_TIMEOUT * 2 if timeout is None else timeout)
+        return self.is_connected()
 
     def is_connected(self) -> bool:
         """Check if connected to RabbitMQ"""
         return self.connection is not None and not self.connection.is_closed
 
-    def publish_event(self, event_data: Dict[str, Any], routing_key: str = None) -> bool:
-        """Publish event to RabbitMQ queue"""
-        if not self.is_connected():
-            logger.warning("RabbitMQ not connected, attempting to reconnect...")
-            self._connect()
-            
-        if not self.is_connected():
-            logger.error("Failed to reconnect to RabbitMQ")
-            return False
-            
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": int(self.is_connected()),
+            "consecutive_failures": self.breaker.failures,
+            "retry_in_seconds": round(self.breaker.seconds_until_retry(), 3),
+        }
+
+    def _properties_for(self, content_type: str) -> "pika.BasicProperties":
+        properties = self._properties.get(content_type)
+        if properties is None:
+            import pika
+            properties = self._properties[content_type] = pika.BasicProperties(
+                delivery_mode=2,  # Make message persistent
+                content_type=content_type
+            )
+        return properties
+
+    def _publish_raw(self, routing_key: str, body: bytes, content_type: str) -> bool:
+        """Publish an encoded message; marks the connection broken on failure"""
         try:
-            # Use default queue if no routing key specified
-            if routing_key is None:
-                routing_key = settings.ANALYTICS_QUEUE_NAME
-                
-            message = json.dumps(event_data, default=str)
-            
-            self.channel.basic_publish(
-                exchange='',
-                routing_key=routing_key,
-                body=message,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make message persistent
-                    content_type='application/json'
+            with self._lock:
+                self.channel.basic_publish(
+                    exchange='',
+                    routing_key=routing_key,
+                    body=body,
+                    properties=self._properties_for(content_type)
                 )
-            )
-            
-            logger.debug(f"Published event to RabbitMQ: {event_data.get('event_name', 'unknown')}")
             return True
-            
         except Exception as e:
             logger.error(f"Failed to publish event to RabbitMQ: {e}")
+            self._mark_broken(e)
+            return False
+
+    def _spool(self, routing_key: str, message: bytes) -> bool:
+        self.start()
+        try:
+            spooled = self.spool.append(routing_key, message, self.codec.content_type)
+        except SpoolLockedError as e:
+            # The caller writes the event synchronously instead
+            logger.error(f"Failed to spool event: {e}")
+            published_events.inc(result="spool_locked")
+            return False
+        if spooled:
+            published_events.inc(result="spooled")
+            return True
+        published_events.inc(result="dropped")
+        return False
+
+    def publish_event(self, event_data: Dict[str, Any], routing_key: str = None) -> bool:
+        """Publish event to RabbitMQ queue, spooling it locally while the broker is unavailable"""
+        # Use default queue if no routing key specified
+        if routing_key is None:
+            routing_key = settings.ANALYTICS_QUEUE_NAME
+        message = self.codec.encode(event_data)
+
+        if self.spool is not None and (not self.is_connected() or self.spool.has_backlog()):
+            return self._spool(routing_key, message)
+
+        if not self.is_connected():
+            # Fail fast; the connection thread reconnects in the background
+            self.start()
+            published_events.inc(result="disconnected")
             return False
 
+        if self._publish_raw(routing_key, message, self.codec.content_type):
+            logger.debug(f"Published event to RabbitMQ: {event_data.get('event_name', 'unknown')}")
+            published_events.inc(result="ok")
+            return True
+
+        if self.spool is not None:
+            return self._spool(routing_key, message)
+        published_events.inc(result="failed")
+        return False
+
     def publish_batch(self, events: list[Dict[str, Any]], routing_key: str = None) -> int:
         """Publish multiple events to RabbitMQ queue"""
-        if not self.is_connected():
-            logger.warning("RabbitMQ not connected, attempting to reconnect...")
-            self._connect()
-            
-        if not self.is_connected():
-            logger.error("Failed to reconnect to RabbitMQ")
+        if not self.is_connected() and self.spool is None:
+            self.start()
+            published_events.inc(len(events), result="disconnected")
             return 0
             
         published_count = 0
@@ -131,14 +308,76 @@ class RabbitMQManager:
             return published_count
 
     def close(self):
-        """Close RabbitMQ connection"""
+        """Stop the connection thread and close the RabbitMQ connection"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=settings.RABBITMQ_CONNECT_TIMEOUT * 2)
         try:
-            if self.connection and not self.connection.is_closed:
-                self.connection.close()
-                logger.info("RabbitMQ connection closed")
+            with self._lock:
+                if self.connection and not self.connection.is_closed:
+                    self.connection.close()
+                    logger.info("RabbitMQ connection closed")
+                self.connection = self.channel = None
         except Exception as e:
             logger.error(f"Error closing RabbitMQ connection: {e}")
+        if self.spool is not None:
+            self.spool.close()
+
+
+class InMemoryTransport:
+    """Broker stand-in that keeps published messages in process
+
+    Messages are serialized exactly as for RabbitMQ so benchmarks pay the
+    same encoding cost, then kept in a bounded deque.
+    """
+
+    def __init__(self, max_messages: int = 100000, codec=None):
+        self.messages: deque = deque(maxlen=max_messages)
+        self.published = 0
+        self.codec = codec or get_codec(settings.ANALYTICS_CODEC)
+
+    def start(self):
+        pass
+
+    def wait_until_connected(self, timeout: float = None) -> bool:
+        return True
+
+    def is_connected(self) -> bool:
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"connected": 1, "queued": len(self.messages)}
+
+    def publish_event(self, event_data: Dict[str, Any], routing_key: str = None) -> bool:
+        self.messages.append((routing_key or settings.ANALYTICS_QUEUE_NAME, self.codec.encode(event_data)))
+        self.published += 1
+        published_events.inc(result="ok")
+        return True
+
+    def publish_batch(self, events: list[Dict[str, Any]], routing_key: str = None) -> int:
+        return sum(1 for event_data in events if self.publish_event(event_data, routing_key))
+
+    def close(self):
+        self.messages.clear()
+
+
+def create_spool() -> Optional[EventSpool]:
+    if not settings.SPOOL_ENABLED:
+        return None
+    # One directory per worker process, resolved after fork; each drainer adopts those of exited workers
+    spool = EventSpool(
+        settings.SPOOL_DIR,
+        per_process=True,
+        adopt_orphans=True,
+        segment_bytes=settings.SPOOL_SEGMENT_BYTES,
+        max_bytes=settings.SPOOL_MAX_BYTES,
+        fsync_interval=settings.SPOOL_FSYNC_INTERVAL_MS / 1000
+    )
+    metrics.register_callback("analytics_spool", "Local spool for events awaiting the broker", spool.stats)
+    return spool
 
 
 # Global RabbitMQ manager instance
-rabbitmq_manager = RabbitMQManager()
+rabbitmq_manager = InMemoryTransport() if settings.ANALYTICS_TRANSPORT == "memory" else RabbitMQManager(create_spool())
+metrics.register_callback("rabbitmq_publisher", "Analytics publisher connection state", rabbitmq_manager.stats)
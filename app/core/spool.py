@@ -0,0 +1,525 @@
+import os
+import json
+import queue
+import shutil
+import struct
+import logging
+import threading
+import time
+import weakref
+import zlib
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: directories are not locked between processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Each record is a big-endian (payload length, CRC32 of payload) header and the payload
+RECORD_HEADER = struct.Struct(">II")
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+CHECKPOINT_NAME = "checkpoint.json"
+LOCK_NAME = ".lock"
+WORKER_PREFIX = "worker-"
+# How often a drainer looks for spool directories left by exited processes
+ORPHAN_SCAN_SECONDS = 30.0
+LEGACY_CONTENT_TYPE = "application/json"
+
+
+def encode_record(routing_key: str, content_type: str, body: bytes) -> bytes:
+    payload = f"{routing_key}\n{content_type}\n".encode("utf-8") + body
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> Tuple[str, str, bytes]:
+    """(routing key, content type, body); raises ValueError for malformed payloads"""
+    fields = payload.split(b"\n", 2)
+    if len(fields) == 2:
+        # Records spooled before codecs carried no content type and were always JSON
+        routing_key, body = fields
+        return routing_key.decode("utf-8"), LEGACY_CONTENT_TYPE, body
+    if len(fields) != 3:
+        raise ValueError("spool record has no routing key")
+    routing_key, content_type, body = fields
+    return routing_key.decode("utf-8"), content_type.decode("utf-8"), body
+
+
+class SpoolLockedError(RuntimeError):
+    """The spool directory is owned by another live process"""
+
+
+def _owner_alive(directory: str) -> bool:
+    """Whether the process a worker-<pid> directory is named after still runs"""
+    name = os.path.basename(directory)
+    if not name.startswith(WORKER_PREFIX):
+        return False
+    try:
+        os.kill(int(name[len(WORKER_PREFIX):]), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def worker_directory(root: str) -> str:
+    """This process's spool directory under root; every worker needs its own"""
+    return os.path.join(root, f"{WORKER_PREFIX}{os.getpid()}")
+
+
+class EventSpool:
+    """Append-only, segmented on-disk spool for broker messages
+
+    Callers hand records to append(), which only enqueues them; a writer
+    thread appends batches to the active segment and fsyncs once per batch
+    (at most every fsync_interval seconds). Segments roll at segment_bytes
+    and the spool refuses new records beyond max_bytes rather than blocking.
+
+    A drainer thread replays records in order through a publish callback
+    whenever the broker is ready, persisting its read position in a
+    checkpoint file and deleting fully drained segments. Records failing
+    their CRC end the segment they are in and are counted as corrupt.
+    Delivery is at-least-once: a crash between publish and checkpoint
+    replays the tail of the last batch.
+
+    A directory belongs to one process, enforced with an flock on its lock
+    file. Web workers each spool under worker_directory(root) (per_process,
+    resolved when the spool opens and again after a fork); with
+    adopt_orphans the drainer also replays and removes sibling directories
+    whose owner has exited (and records left directly in root by older
+    versions). read_only spools only drain and never write.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 8 * 1024 * 1024,
+        max_bytes: int = 512 * 1024 * 1024,
+        fsync_interval: float = 0.05,
+        queue_size: int = 10000,
+        drain_batch: int = 500,
+        adopt_orphans: bool = False,
+        read_only: bool = False,
+        per_process: bool = False
+    ):
+        self.root = directory
+        self.per_process = per_process
+        self.directory = worker_directory(directory) if per_process else directory
+        self.adopt_orphans = adopt_orphans
+        self.read_only = read_only
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.drain_batch = drain_batch
+        self.queue_size = queue_size
+        self._inherited = []
+        self._reset()
+        if per_process and hasattr(os, "register_at_fork"):
+            spool = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: spool() is not None and spool()._after_fork())
+
+    def _reset(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._opened = False
+        self._stopping = threading.Event()
+        self._drain_wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._drainer: Optional[threading.Thread] = None
+        self._lock_handle = None
+        self._orphans_scanned = 0.0
+
+        # Writer state
+        self._active_seq = 0
+        self._active = None
+        # Bytes of each segment that are written and fsynced (readable by the drainer)
+        self._durable_size: Dict[int, int] = {}
+
+        # Drainer position
+        self._read_seq = 0
+        self._read_offset = 0
+
+        self.disk_bytes = 0
+        # Records accepted by append() but not yet on disk
+        self._unwritten = 0
+        self.counters = {
+            "appended": 0,
+            "drained": 0,
+            "dropped_queue_full": 0,
+            "dropped_disk_full": 0,
+            "corrupt": 0,
+            "fsyncs": 0,
+            "adopted": 0,
+        }
+
+    def _after_fork(self):
+        """Start a forked child unopened so it spools under its own pid"""
+        if self._opened:
+            # The segment and lock handles still belong to the parent; never flush or close them here
+            self._inherited.append((self._active, self._lock_handle))
+        self._reset()
+
+    # Files
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _load_checkpoint(self) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT_NAME)) as handle:
+                checkpoint = json.load(handle)
+            return int(checkpoint["segment"]), int(checkpoint["offset"])
+        except (OSError, ValueError, KeyError):
+            return 0, 0
+
+    def _save_checkpoint(self):
+        path = os.path.join(self.directory, CHECKPOINT_NAME)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as handle:
+            json.dump({"segment": self._read_seq, "offset": self._read_offset}, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+
+    def _acquire_directory(self):
+        """Take the directory's flock; raises SpoolLockedError if another process holds it"""
+        handle = open(os.path.join(self.directory, LOCK_NAME), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                raise SpoolLockedError(f"Spool directory {self.directory} is in use by another process")
+        self._lock_handle = handle
+
+    def _release_directory(self):
+        if self._lock_handle is not None:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+    def _open(self):
+        """Recover state from disk and start the writer thread (first use only)"""
+        with self._lock:
+            if self._opened:
+                return
+            if self.per_process:
+                # Resolved on first use, not at construction, so workers forked after import get their own
+                self.directory = worker_directory(self.root)
+            os.makedirs(self.directory, exist_ok=True)
+            self._acquire_directory()
+            segments = self._segments()
+            self._read_seq, self._read_offset = self._load_checkpoint()
+
+            for seq in segments:
+                if seq < self._read_seq:
+                    # Drained before a crash but not yet deleted
+                    os.remove(self._segment_path(seq))
+                    continue
+                size = os.path.getsize(self._segment_path(seq))
+                self._durable_size[seq] = size
+                self.disk_bytes += size
+            segments = [seq for seq in segments if seq >= self._read_seq]
+
+            if segments and segments[0] > self._read_seq:
+                self._read_seq, self._read_offset = segments[0], 0
+
+            if self.read_only:
+                # Everything on disk is sealed; nothing is written
+                self._active_seq = (segments[-1] + 1) if segments else self._read_seq
+                if not segments:
+                    self._read_seq, self._read_offset = self._active_seq, 0
+                self._opened = True
+                return
+
+            # Always write to a fresh segment so recovered ones are sealed
+            self._active_seq = (segments[-1] + 1) if segments else max(self._read_seq, 1)
+            if not segments:
+                self._read_seq, self._read_offset = self._active_seq, 0
+            self._roll_to(self._active_seq)
+
+            self._writer = threading.Thread(target=self._write_loop, name="spool-writer", daemon=True)
+            self._writer.start()
+            self._opened = True
+            if self.backlog_bytes():
+                logger.info(f"Recovered {self.backlog_bytes()} spooled bytes from {self.directory}")
+
+    def _roll_to(self, seq: int):
+        if self._active is not None:
+            self._active.close()
+        self._active_seq = seq
+        self._active = open(self._segment_path(seq), "ab")
+        self._durable_size.setdefault(seq, self._active.tell())
+
+    # Writing
+
+    def append(self, routing_key: str, body, content_type: str = "application/json") -> bool:
+        """Queue a message for the spool; never blocks, returns False if it was dropped"""
+        if not self._opened:
+            self._open()
+        if self.read_only:
+            raise RuntimeError("read-only spool")
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if self.disk_bytes >= self.max_bytes:
+            self.counters["dropped_disk_full"] += 1
+            return False
+        try:
+            self._queue.put_nowait(encode_record(routing_key, content_type, body))
+        except queue.Full:
+            self.counters["dropped_queue_full"] += 1
+            return False
+        with self._lock:
+            self._unwritten += 1
+            self.counters["appended"] += 1
+        return True
+
+    def _write_batch(self, records: List[bytes]):
+        for record in records:
+            self._active.write(record)
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        size = self._active.tell()
+
+        with self._lock:
+            self._unwritten -= len(records)
+            self.disk_bytes += size - self._durable_size[self._active_seq]
+            self._durable_size[self._active_seq] = size
+            self.counters["fsyncs"] += 1
+            if size >= self.segment_bytes:
+                self._roll_to(self._active_seq + 1)
+        self._drain_wake.set()
+
+    def _write_loop(self):
+        while not self._stopping.is_set() or not self._queue.empty():
+            try:
+                records = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+
+            # Group everything arriving within the fsync interval into one write
+            deadline = time.monotonic() + self.fsync_interval
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    records.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(records)
+            except OSError as e:
+                with self._lock:
+                    self._unwritten -= len(records)
+                    self.counters["dropped_disk_full"] += len(records)
+                logger.error(f"Failed to write {len(records)} events to the spool: {e}")
+
+    # Draining
+
+    def backlog_bytes(self) -> int:
+        """Spooled bytes not yet replayed (segments before the read position are deleted)"""
+        return self.disk_bytes - self._read_offset
+
+    def has_backlog(self) -> bool:
+        if not self._opened:
+            self._open()
+        return self._unwritten > 0 or self.backlog_bytes() > 0
+
+    def _advance_segment(self):
+        """Delete the fully read segment and move to the next one"""
+        path = self._segment_path(self._read_seq)
+        with self._lock:
+            size = self._durable_size.pop(self._read_seq, 0)
+            self.disk_bytes -= size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self._read_seq += 1
+        self._read_offset = 0
+
+    def drain_once(self, publish: Callable[[str, bytes, str], bool]) -> Tuple[int, bool]:
+        """Replay up to drain_batch records in order; returns (published, stopped on failure)"""
+        if not self._opened:
+            self._open()
+        published, failed = 0, False
+        while published < self.drain_batch:
+            with self._lock:
+                active_seq = self._active_seq
+                durable = self._durable_size.get(self._read_seq)
+
+            if self._read_seq > active_seq:
+                break
+            if durable is None:
+                # Segment vanished or was never written; skip past it
+                if self._read_seq >= active_seq:
+                    break
+                self._read_seq, self._read_offset = self._read_seq + 1, 0
+                continue
+
+            if self._read_offset + RECORD_HEADER.size > durable:
+                if self._read_seq < active_seq:
+                    self._advance_segment()
+                    continue
+                break
+
+            with open(self._segment_path(self._read_seq), "rb") as handle:
+                handle.seek(self._read_offset)
+                while published < self.drain_batch and self._read_offset + RECORD_HEADER.size <= durable:
+                    length, crc = RECORD_HEADER.unpack(handle.read(RECORD_HEADER.size))
+                    payload = handle.read(length)
+                    if len(payload) != length or zlib.crc32(payload) != crc:
+                        # The length can no longer be trusted, so the rest of the segment is lost
+                        logger.error(f"Corrupt record in spool segment {self._read_seq} at {self._read_offset}")
+                        with self._lock:
+                            self.counters["corrupt"] += 1
+                        self._read_offset = durable
+                        break
+
+                    try:
+                        routing_key, content_type, body = decode_payload(payload)
+                    except ValueError as e:
+                        # The CRC matched, so only this record is skipped
+                        logger.error(f"Undecodable record in spool segment {self._read_seq} at {self._read_offset}: {e}")
+                        with self._lock:
+                            self.counters["corrupt"] += 1
+                        self._read_offset += RECORD_HEADER.size + length
+                        continue
+                    if not publish(routing_key, body, content_type):
+                        failed = True
+                        break
+                    self._read_offset += RECORD_HEADER.size + length
+                    published += 1
+                    with self._lock:
+                        self.counters["drained"] += 1
+            if failed:
+                break
+
+        if published or failed:
+            self._save_checkpoint()
+        return published, failed
+
+    def _orphan_directories(self) -> List[str]:
+        """Sibling worker directories, and the parent itself if it holds pre-worker segments"""
+        root = os.path.dirname(os.path.abspath(self.directory))
+        own = os.path.abspath(self.directory)
+        candidates = [
+            os.path.join(root, name) for name in sorted(os.listdir(root))
+            if name.startswith(WORKER_PREFIX) and os.path.join(root, name) != own
+        ]
+        if any(name.startswith(SEGMENT_PREFIX) for name in os.listdir(root)):
+            candidates.append(root)
+        return [path for path in candidates if os.path.isdir(path)]
+
+    def _spool_files(self) -> List[str]:
+        return [
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) or name.startswith(CHECKPOINT_NAME)
+        ]
+
+    def drain_orphans(self, publish: Callable[[str, bytes, str], bool]) -> int:
+        """Replay and remove spool directories whose owning process has exited"""
+        replayed = 0
+        if fcntl is None:
+            # Without directory locks a live owner cannot be told apart from an orphan
+            return replayed
+        for directory in self._orphan_directories():
+            if _owner_alive(directory):
+                continue
+            orphan = EventSpool(directory, drain_batch=self.drain_batch, read_only=True)
+            try:
+                orphan._open()
+            except (SpoolLockedError, OSError):
+                # Its owner is alive (or it is being adopted elsewhere)
+                continue
+            try:
+                failed = False
+                while orphan.has_backlog() and not failed:
+                    published, failed = orphan.drain_once(publish)
+                    replayed += published
+                    if not published:
+                        break
+                if orphan.has_backlog():
+                    continue
+                for path in orphan._spool_files():
+                    os.remove(path)
+                if os.path.basename(directory).startswith(WORKER_PREFIX):
+                    shutil.rmtree(directory, ignore_errors=True)
+                logger.info(f"Adopted spool directory {directory}")
+            finally:
+                orphan.close()
+        if replayed:
+            with self._lock:
+                self.counters["adopted"] += replayed
+        return replayed
+
+    def _drain_loop(self, publish: Callable[[str, bytes, str], bool], ready: Callable[[], bool]):
+        while not self._stopping.is_set():
+            if self.adopt_orphans and ready() and time.monotonic() - self._orphans_scanned >= ORPHAN_SCAN_SECONDS:
+                self._orphans_scanned = time.monotonic()
+                try:
+                    self.drain_orphans(publish)
+                except Exception as e:
+                    logger.error(f"Adopting orphaned spool directories failed: {e!r}")
+            if self.has_backlog() and ready():
+                try:
+                    published, failed = self.drain_once(publish)
+                except Exception as e:
+                    # Keep the drainer alive; publish_event routes to the spool while it has a backlog
+                    logger.error(f"Spool drain failed: {e!r}")
+                    published, failed = 0, True
+                if published and not failed:
+                    logger.info(f"Replayed {published} spooled events")
+                    continue
+                self._stopping.wait(1.0 if failed else 0.1)
+            else:
+                self._drain_wake.wait(1.0)
+                self._drain_wake.clear()
+
+    def start_draining(self, publish: Callable[[str, bytes, str], bool], ready: Callable[[], bool]):
+        """Replay spooled records through publish whenever ready() is true"""
+        if not self._opened:
+            self._open()
+        if self._drainer is not None and self._drainer.is_alive():
+            return
+        self._drainer = threading.Thread(
+            target=self._drain_loop, args=(publish, ready), name="spool-drainer", daemon=True
+        )
+        self._drainer.start()
+
+    def wake(self):
+        self._drain_wake.set()
+
+    def close(self):
+        """Flush queued records to disk, stop both threads and release the directory"""
+        if not self._opened:
+            return
+        self._stopping.set()
+        self._drain_wake.set()
+        for thread in (self._writer, self._drainer):
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout=5)
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+            self._release_directory()
+            self._opened = False
+        self._stopping.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backlog_bytes": self.backlog_bytes(),
+            "disk_bytes": self.disk_bytes,
+            "unwritten_records": self._unwritten,
+            **{f"{name}_total": value for name, value in self.counters.items()},
+        }
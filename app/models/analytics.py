@@ -1,26 +1,151 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index
+from sqlalchemy import (
+    Column, Integer, String, Text, DateTime, JSON, Float, Boolean, LargeBinary, Index, ForeignKey, select
+)
+from sqlalchemy.orm import column_property
 from sqlalchemy.sql import func
+from app.core.config import settings
 from app.core.database import Base
 
+# Native range partitioning on Postgres needs the partition key in the primary key
+PARTITIONED_POSTGRES = (
+    bool(settings.ANALYTICS_PARTITION_INTERVAL)
+    and settings.DATABASE_URL.startswith("postgresql")
+)
+
+# Every secondary index analytics_events can carry, by name
+ANALYTICS_INDEXES = {
+    'ix_analytics_events_id': ('id',),
+    'ix_analytics_events_event_type': ('event_type',),
+    'ix_analytics_events_event_name_id': ('event_name_id',),
+    'ix_analytics_events_user_id': ('user_id',),
+    'ix_analytics_events_session_id': ('session_id',),
+    'ix_analytics_events_timestamp': ('timestamp',),
+    'idx_event_type_timestamp': ('event_type', 'timestamp'),
+    'idx_user_id_timestamp': ('user_id', 'timestamp'),
+    'idx_device_class_timestamp': ('device_class', 'timestamp'),
+    'idx_country_timestamp': ('country', 'timestamp'),
+}
+
+# Index profiles trade query flexibility against per-insert B-tree updates.
+# "ingest" keeps only what AnalyticsService queries use: the timestamp range
+# scans plus the event_type and user_id composites (which also serve lookups
+# on their leading column).
+INDEX_PROFILES = {
+    'full': list(ANALYTICS_INDEXES),
+    'ingest': ['ix_analytics_events_timestamp', 'idx_event_type_timestamp', 'idx_user_id_timestamp'],
+    'minimal': ['ix_analytics_events_timestamp'],
+}
+
+
+def analytics_index_names(profile: str = None) -> list:
+    """Index names for an index profile (defaults to the configured one)"""
+    profile = profile or settings.ANALYTICS_INDEX_PROFILE
+    if profile not in INDEX_PROFILES:
+        raise ValueError(f"Unknown analytics index profile: {profile}")
+    return INDEX_PROFILES[profile]
+
+
+class DimensionMixin:
+    """Distinct values of one repetitive event string, referenced by integer id"""
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # Unique on a digest rather than the value, so long URLs and user agents stay indexable
+    digest = Column(LargeBinary(16), nullable=False, unique=True)
+    value = Column(Text, nullable=False)
+
+
+class EventNameDimension(DimensionMixin, Base):
+    __tablename__ = "analytics_event_names"
+
+
+class PageUrlDimension(DimensionMixin, Base):
+    __tablename__ = "analytics_page_urls"
+
+
+class ReferrerDimension(DimensionMixin, Base):
+    __tablename__ = "analytics_referrers"
+
+
+class UserAgentDimension(DimensionMixin, Base):
+    __tablename__ = "analytics_user_agents"
+
+
+# Event fields stored as dimension ids, with their tables; the id column is "<field>_id"
+DIMENSIONS = {
+    'event_name': EventNameDimension,
+    'page_url': PageUrlDimension,
+    'referrer': ReferrerDimension,
+    'user_agent': UserAgentDimension,
+}
+
+
+def _dimension_value(dimension, id_column):
+    # Correlated to the outer analytics_events row; a query selecting only these
+    # attributes needs select_from(AnalyticsEvent) to put that row in scope
+    return column_property(
+        select(dimension.value).where(dimension.id == id_column).correlate_except(dimension).scalar_subquery()
+    )
+
 
 class AnalyticsEvent(Base):
     __tablename__ = "analytics_events"
 
-    id = Column(Integer, primary_key=True, index=True)
-    event_type = Column(String, nullable=False, index=True)
-    event_name = Column(String, nullable=False, index=True)
-    user_id = Column(String, nullable=True, index=True)
-    session_id = Column(String, nullable=True, index=True)
-    page_url = Column(String, nullable=True)
-    referrer = Column(String, nullable=True)
-    user_agent = Column(Text, nullable=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_id = Column(String, nullable=True)  # Client-supplied idempotency key
+    event_type = Column(String, nullable=False)
+    event_name_id = Column(Integer, ForeignKey("analytics_event_names.id"), nullable=False)
+    user_id = Column(String, nullable=True)
+    session_id = Column(String, nullable=True)
+    page_url_id = Column(Integer, ForeignKey("analytics_page_urls.id"), nullable=True)
+    referrer_id = Column(Integer, ForeignKey("analytics_referrers.id"), nullable=True)
+    user_agent_id = Column(Integer, ForeignKey("analytics_user_agents.id"), nullable=True)
+    # Parsed from user_agent at ingestion
+    device_class = Column(String(16), nullable=True)  # desktop, mobile, tablet or bot
+    os_family = Column(String(32), nullable=True)
+    browser_family = Column(String(32), nullable=True)
+    is_bot = Column(Boolean, nullable=True)
     ip_address = Column(String, nullable=True)
+    # Resolved from ip_address at ingestion
+    country = Column(String(2), nullable=True)  # ISO 3166-1 alpha-2
+    region = Column(String(64), nullable=True)
     properties = Column(JSON, nullable=True)  # Additional event properties
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    sample_rate = Column(Float, nullable=True)  # Share of such events kept at ingestion; NULL means all
+    timestamp = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        primary_key=PARTITIONED_POSTGRES
+    )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    # Composite index for efficient querying
+    # Decoded dimension values; filter and GROUP BY on the *_id columns instead
+    event_name = _dimension_value(EventNameDimension, event_name_id)
+    page_url = _dimension_value(PageUrlDimension, page_url_id)
+    referrer = _dimension_value(ReferrerDimension, referrer_id)
+    user_agent = _dimension_value(UserAgentDimension, user_agent_id)
+
+    # Indexes from the configured profile
     __table_args__ = (
-        Index('idx_event_type_timestamp', 'event_type', 'timestamp'),
-        Index('idx_user_id_timestamp', 'user_id', 'timestamp'),
+        *[Index(name, *ANALYTICS_INDEXES[name]) for name in analytics_index_names()],
+        {'postgresql_partition_by': 'RANGE (timestamp)'} if PARTITIONED_POSTGRES else {},
     )
+
+
+class AnalyticsSession(Base):
+    """One closed session, written by the consumer's sessionizer"""
+    __tablename__ = "analytics_sessions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=True, index=True)
+    started_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    ended_at = Column(DateTime(timezone=True), nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    event_count = Column(Integer, nullable=False)
+    page_count = Column(Integer, nullable=False)
+    converted = Column(Boolean, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Everything an analytics database needs, dimension tables first
+ANALYTICS_TABLES = [dimension.__table__ for dimension in DIMENSIONS.values()] + [
+    AnalyticsEvent.__table__, AnalyticsSession.__table__
+]
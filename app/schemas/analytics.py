@@ -1,9 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from typing_extensions import TypedDict, NotRequired, Annotated
 from datetime import datetime
 
 
 class AnalyticsEventBase(BaseModel):
+    event_id: Optional[str] = Field(None, max_length=128, description="Client-generated ID; retries with the same ID are dropped")
     event_type: str = Field(..., description="Event type (page_view, click, purchase, etc.)")
     event_name: str = Field(..., description="Specific event name")
     user_id: Optional[str] = Field(None, description="User ID if authenticated")
@@ -21,6 +23,12 @@ class AnalyticsEventCreate(AnalyticsEventBase):
 
 class AnalyticsEventResponse(AnalyticsEventBase):
     id: int
+    device_class: Optional[str] = None
+    os_family: Optional[str] = None
+    browser_family: Optional[str] = None
+    is_bot: Optional[bool] = None
+    country: Optional[str] = None
+    region: Optional[str] = None
     timestamp: datetime
     created_at: datetime
 
@@ -32,6 +40,34 @@ class AnalyticsEventBatch(BaseModel):
     events: list[AnalyticsEventCreate] = Field(..., description="Batch of events to track")
 
 
+# Plain-dict mirrors of AnalyticsEventCreate for the ingestion decoder; keep the fields in sync
+class AnalyticsEventDict(TypedDict):
+    event_id: NotRequired[Optional[Annotated[str, Field(max_length=128)]]]
+    event_type: str
+    event_name: str
+    user_id: NotRequired[Optional[str]]
+    session_id: NotRequired[Optional[str]]
+    page_url: NotRequired[Optional[str]]
+    referrer: NotRequired[Optional[str]]
+    user_agent: NotRequired[Optional[str]]
+    ip_address: NotRequired[Optional[str]]
+    properties: NotRequired[Optional[Dict[str, Any]]]
+
+
+class AnalyticsEventBatchDict(TypedDict):
+    events: List[AnalyticsEventDict]
+
+
+class BeaconEventDict(TypedDict, total=False):
+    event_id: Optional[Annotated[str, Field(max_length=128)]]
+    event_type: str
+    event_name: str
+    user_id: Optional[str]
+    session_id: Optional[str]
+    page_url: Optional[str]
+    properties: Optional[Dict[str, Any]]
+
+
 class AnalyticsQuery(BaseModel):
     event_type: Optional[str] = Field(None, description="Filter by event type")
     user_id: Optional[str] = Field(None, description="Filter by user ID")
@@ -47,3 +83,12 @@ class AnalyticsSummary(BaseModel):
     event_types: Dict[str, int]
     top_pages: Dict[str, int]
     time_period: str
+
+
+class SessionSummary(BaseModel):
+    total_sessions: int
+    avg_duration_seconds: float
+    avg_pages_per_session: float
+    bounce_rate: float  # share of sessions with at most one page view
+    conversion_rate: float
+    time_period: str
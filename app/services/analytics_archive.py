@@ -0,0 +1,273 @@
+import os
+import json
+import heapq
+import logging
+import zipfile
+import functools
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Iterator, Iterable
+from sqlalchemy import Table, select, delete
+from sqlalchemy.engine import Connection
+from app.models.analytics import AnalyticsEvent, DIMENSIONS
+from app.services.analytics_partitions import analytics_partitions, PartitionManager
+from app.services.analytics_dimensions import analytics_dimensions, id_column
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Segments hold dimension values rather than ids, so they stay readable without the database
+_DIMENSION_FIELDS = {id_column(field): field for field in DIMENSIONS}
+ARCHIVE_COLUMNS = [_DIMENSION_FIELDS.get(column.name, column.name) for column in AnalyticsEvent.__table__.columns]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _stamp_from_name(name: str) -> Optional[datetime]:
+    """Minimum timestamp encoded in a segment file name (truncated to the second)"""
+    parts = name.split("_")
+    if len(parts) < 3:
+        return None
+    try:
+        return datetime.strptime(parts[1], "%Y%m%dT%H%M%S")
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _segment_meta(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """meta.json of a segment; segments are immutable, so (path, mtime) is a safe cache key"""
+    with zipfile.ZipFile(path) as archive:
+        return json.loads(archive.read("meta.json"))
+
+
+class ArchiveWriter:
+    """Writes analytics rows to compressed columnar segment files
+
+    A segment is a zip archive with one deflated JSON array per column plus a
+    meta.json holding the row count and timestamp range. Readers open only the
+    columns they need and skip segments outside the query window using meta.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write_segment(self, rows: List[Dict[str, Any]]) -> str:
+        """Write one segment atomically and return its path"""
+        timestamps = [row["timestamp"] for row in rows if row.get("timestamp")]
+        min_ts = min(timestamps) if timestamps else None
+        max_ts = max(timestamps) if timestamps else None
+        first_id = rows[0]["id"]
+        stamp = min_ts.strftime("%Y%m%dT%H%M%S") if min_ts else "unknown"
+        path = os.path.join(self.directory, f"events_{stamp}_{first_id}.zip")
+        tmp_path = f"{path}.tmp"
+
+        meta = {
+            "rows": len(rows),
+            "columns": ARCHIVE_COLUMNS,
+            "min_timestamp": min_ts.isoformat() if min_ts else None,
+            "max_timestamp": max_ts.isoformat() if max_ts else None,
+        }
+
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("meta.json", json.dumps(meta))
+            for column in ARCHIVE_COLUMNS:
+                values = [_encode_value(row.get(column)) for row in rows]
+                archive.writestr(f"{column}.json", json.dumps(values, default=str))
+
+        with open(tmp_path, "rb") as handle:
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+
+class ArchiveReader:
+    """Scans archived segments with column and time-range pruning"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def segments(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[str]:
+        """Segment paths whose timestamp range overlaps the window
+
+        Segments starting after end_date are skipped by file name alone; the
+        others need meta.json for their max timestamp, which is cached.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+
+        selected = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".zip"):
+                continue
+            stamp = _stamp_from_name(name)
+            if end_date and stamp and stamp > end_date:
+                continue
+            path = os.path.join(self.directory, name)
+            meta = _segment_meta(path, os.stat(path).st_mtime_ns)
+            min_ts = _parse_timestamp(meta.get("min_timestamp"))
+            max_ts = _parse_timestamp(meta.get("max_timestamp"))
+            if start_date and max_ts and max_ts < start_date:
+                continue
+            if end_date and min_ts and min_ts > end_date:
+                continue
+            selected.append(path)
+        return selected
+
+    def scan(
+        self,
+        columns: Iterable[str],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield rows holding only the requested columns, one segment at a time
+
+        Equality filters in where are evaluated on their own columns first, so
+        segments without matches never load the remaining columns.
+        """
+        where = where or {}
+        columns = list(dict.fromkeys(list(columns) + ["timestamp"]))
+        filter_columns = list(dict.fromkeys(["timestamp"] + list(where)))
+
+        for path in self.segments(start_date, end_date):
+            with zipfile.ZipFile(path) as archive:
+                data = {column: json.loads(archive.read(f"{column}.json")) for column in filter_columns}
+                data["timestamp"] = [_parse_timestamp(value) for value in data["timestamp"]]
+
+                matches = []
+                for index, timestamp in enumerate(data["timestamp"]):
+                    if start_date and timestamp and timestamp < start_date:
+                        continue
+                    if end_date and timestamp and timestamp > end_date:
+                        continue
+                    if any(str(data[column][index]) != str(value) for column, value in where.items()):
+                        continue
+                    matches.append(index)
+                if not matches:
+                    continue
+
+                stored = set(archive.namelist())
+                for column in columns:
+                    if column not in data:
+                        # Segments written before a column was added read it as NULL
+                        data[column] = (
+                            json.loads(archive.read(f"{column}.json"))
+                            if f"{column}.json" in stored else [None] * len(data["timestamp"])
+                        )
+
+            for index in matches:
+                yield {column: data[column][index] for column in columns}
+
+    def summary(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """get_analytics_summary-style aggregation over archived events"""
+        total_events = 0
+        users = set()
+        event_types: Counter = Counter()
+        pages: Counter = Counter()
+
+        for row in self.scan(["user_id", "event_type", "page_url", "sample_rate"], start_date, end_date):
+            # Sampled events are re-weighted by 1 / sample_rate
+            weight = 1.0 / (row["sample_rate"] or 1.0)
+            total_events += weight
+            if row["user_id"] is not None:
+                users.add(row["user_id"])
+            event_types[row["event_type"]] += weight
+            if row["page_url"] is not None:
+                pages[row["page_url"]] += weight
+
+        return {
+            "total_events": round(total_events),
+            "unique_users": len(users),
+            "event_types": {event_type: round(count) for event_type, count in event_types.items()},
+            "top_pages": {page_url: round(count) for page_url, count in pages.most_common(10)},
+        }
+
+    def user_events(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent archived events for a user"""
+        rows = self.scan(ARCHIVE_COLUMNS, where={"user_id": user_id})
+        return heapq.nlargest(limit, rows, key=lambda row: row["timestamp"] or datetime.min)
+
+
+class AnalyticsArchiver:
+    """Moves aged rows out of analytics_events into archive segments"""
+
+    def __init__(
+        self,
+        directory: str = None,
+        chunk_rows: int = None,
+        partitions: PartitionManager = None
+    ):
+        self.writer = ArchiveWriter(directory or settings.ANALYTICS_ARCHIVE_DIR)
+        self.chunk_rows = chunk_rows or settings.ANALYTICS_ARCHIVE_CHUNK_ROWS
+        self.partitions = partitions or analytics_partitions
+
+    def _archive_table(self, connection: Connection, table: Table, cutoff: Optional[datetime]) -> int:
+        """Archive rows older than cutoff chunk by chunk, deleting each chunk after it is written"""
+        archived = 0
+        last_id = None
+        while True:
+            query = select(table).order_by(table.c.id).limit(self.chunk_rows)
+            if cutoff is not None:
+                query = query.where(table.c.timestamp < cutoff)
+            if last_id is not None:
+                query = query.where(table.c.id > last_id)
+
+            rows = [dict(row._mapping) for row in connection.execute(query)]
+            if not rows:
+                return archived
+
+            self.writer.write_segment(analytics_dimensions.decode_rows(connection, rows))
+            first_id, last_id = rows[0]["id"], rows[-1]["id"]
+            cleanup = delete(table).where(table.c.id >= first_id, table.c.id <= last_id)
+            if cutoff is not None:
+                cleanup = cleanup.where(table.c.timestamp < cutoff)
+            connection.execute(cleanup)
+            connection.commit()
+            archived += len(rows)
+
+    def archive_before(self, connection: Connection, cutoff: datetime) -> int:
+        """Archive every event older than cutoff and return the row count"""
+        archived = self._archive_table(connection, AnalyticsEvent.__table__, cutoff)
+
+        if self.partitions.enabled:
+            if connection.dialect.name == "postgresql":
+                # Rows were archived through the parent, so expired partitions are empty
+                self.partitions.drop_before(connection, cutoff)
+            else:
+                cutoff_start = self.partitions.period_start(cutoff)
+                for name, (start, end) in sorted(self.partitions.partitions(connection).items()):
+                    if end <= cutoff_start:
+                        archived += self._archive_table(connection, self.partitions.partition_table(name), None)
+                self.partitions.drop_before(connection, cutoff_start)
+            connection.commit()
+
+        logger.info(f"Archived {archived} analytics events older than {cutoff.isoformat()}")
+        return archived
+
+    def archive_aged(self, connection: Connection, days: int = None) -> int:
+        """Archive events older than ANALYTICS_ARCHIVE_AFTER_DAYS"""
+        days = settings.ANALYTICS_ARCHIVE_AFTER_DAYS if days is None else days
+        return self.archive_before(connection, datetime.utcnow() - timedelta(days=days))
+
+
+# Global archive reader instance
+analytics_archive = ArchiveReader(settings.ANALYTICS_ARCHIVE_DIR)
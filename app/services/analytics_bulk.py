@@ -0,0 +1,117 @@
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Iterator
+from sqlalchemy.orm import Session
+from app.models.analytics import AnalyticsEvent, DIMENSIONS
+from app.services.analytics_partitions import analytics_partitions
+from app.services.analytics_dimensions import analytics_dimensions
+
+logger = logging.getLogger(__name__)
+
+# Columns written by the bulk loader; id and created_at come from the database
+BULK_COLUMNS = [
+    column.name for column in AnalyticsEvent.__table__.columns
+    if column.name not in ("id", "created_at")
+]
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class AnalyticsBulkWriter:
+    """Bulk persistence for enriched analytics events
+
+    On Postgres rows are streamed with COPY ... FROM STDIN in CSV format from
+    an in-memory buffer, one chunk at a time. Other databases (SQLite) fall
+    back to a single executemany INSERT per chunk.
+    """
+
+    def __init__(self, chunk_size: int = 10000, copy_threshold: int = 50):
+        self.chunk_size = chunk_size
+        # Below this many rows a plain INSERT beats the COPY round trip
+        self.copy_threshold = copy_threshold
+
+    def _normalize(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        normalized = {column: row.get(column) for column in BULK_COLUMNS}
+        # Dimension values are swapped for their ids by write()
+        for field in DIMENSIONS:
+            normalized[field] = row.get(field)
+        if normalized["timestamp"] is None:
+            normalized["timestamp"] = datetime.utcnow()
+        return normalized
+
+    def _csv_buffer(self, rows: List[Dict[str, Any]]) -> io.StringIO:
+        """Encode rows as Postgres CSV with every value quoted and NULL as unquoted \\N"""
+        buffer = io.StringIO()
+        for row in rows:
+            fields = []
+            for column in BULK_COLUMNS:
+                value = row[column]
+                if value is None:
+                    fields.append("\\N")
+                    continue
+                if column == "properties":
+                    value = json.dumps(value, default=str)
+                elif isinstance(value, datetime):
+                    value = value.isoformat()
+                else:
+                    value = str(value)
+                fields.append('"' + value.replace('"', '""') + '"')
+            buffer.write(",".join(fields))
+            buffer.write("\n")
+        buffer.seek(0)
+        return buffer
+
+    def _copy(self, db: Session, rows: List[Dict[str, Any]]):
+        table = AnalyticsEvent.__table__
+        # Passing the insert as the clause pins a routing session to the primary
+        connection = db.connection(bind_arguments={"clause": table.insert()})
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(BULK_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                self._csv_buffer(rows)
+            )
+        finally:
+            cursor.close()
+
+    def write(self, db: Session, rows: Iterable[Dict[str, Any]], commit_each_chunk: bool = False) -> int:
+        """Persist rows in chunks and return the row count
+
+        Rows join the session's transaction unless commit_each_chunk is set,
+        which keeps transactions small for long backfills and replays.
+        """
+        written = 0
+        for chunk in _chunks(rows, self.chunk_size):
+            chunk = analytics_dimensions.encode(db, [self._normalize(row) for row in chunk])
+            dialect = db.get_bind().dialect.name
+
+            if dialect == "postgresql" and len(chunk) >= self.copy_threshold:
+                if analytics_partitions.enabled:
+                    connection = db.connection()
+                    for timestamp in {row["timestamp"] for row in chunk}:
+                        analytics_partitions.ensure_partition(connection, timestamp)
+                self._copy(db, chunk)
+            elif analytics_partitions.enabled:
+                analytics_partitions.insert_events(db, chunk)
+            else:
+                db.execute(AnalyticsEvent.__table__.insert(), chunk)
+
+            written += len(chunk)
+            if commit_each_chunk:
+                db.commit()
+        return written
+
+
+# Global bulk writer instance
+analytics_bulk_writer = AnalyticsBulkWriter()
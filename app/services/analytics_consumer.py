@@ -1,36 +1,41 @@
-import json
+import time
 import logging
 import pika
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List
 from app.core.config import settings
+from app.core.rabbitmq import CircuitBreaker, connection_parameters
+from app.core.codecs import codec_for_content_type
+from app.core.database import SessionLocal
+from app.core.dedup import event_deduplicator
+from app.services.analytics_bulk import analytics_bulk_writer
+from app.services.analytics_useragent import user_agent_parser
+from app.services.analytics_geo import geo_resolver
+from app.services.analytics_sessions import analytics_sessionizer
 
 logger = logging.getLogger(__name__)
 
 
 class AnalyticsConsumer:
+    """Queue consumer; connects when consuming starts and reconnects with backoff"""
+
     def __init__(self):
         self.connection = None
         self.channel = None
-        self._connect()
+        # Deferred-write events waiting for the next bulk flush
+        self.pending_writes: List[Dict[str, Any]] = []
+        self.pending_event_ids = set()
+        self.pending_delivery_tag = None
+        self.breaker = CircuitBreaker(
+            settings.RABBITMQ_RECONNECT_MIN_SECONDS,
+            settings.RABBITMQ_RECONNECT_MAX_SECONDS
+        )
+        self._stopping = False
 
-    def _connect(self):
+    def _connect(self) -> bool:
         """Establish connection to RabbitMQ"""
         try:
-            credentials = pika.PlainCredentials(
-                settings.RABBITMQ_USERNAME,
-                settings.RABBITMQ_PASSWORD
-            )
-            
-            parameters = pika.ConnectionParameters(
-                host=settings.RABBITMQ_HOST,
-                port=settings.RABBITMQ_PORT,
-                virtual_host=settings.RABBITMQ_VIRTUAL_HOST,
-                credentials=credentials,
-                heartbeat=600,
-                blocked_connection_timeout=300
-            )
-            
-            self.connection = pika.BlockingConnection(parameters)
+            self.connection = pika.BlockingConnection(connection_parameters())
             self.channel = self.connection.channel()
             
             # Declare the analytics queue
@@ -39,21 +44,42 @@ class AnalyticsConsumer:
                 durable=True
             )
             
-            # Set QoS for fair dispatch
-            self.channel.basic_qos(prefetch_count=1)
+            # Set QoS so a full write batch can be held unacknowledged
+            self.channel.basic_qos(prefetch_count=max(1, settings.ANALYTICS_BATCH_SIZE))
             
+            self.breaker.record_success()
             logger.info("Analytics consumer connected to RabbitMQ")
+            return True
             
         except Exception as e:
-            logger.error(f"Failed to connect analytics consumer to RabbitMQ: {e}")
+            delay = self.breaker.record_failure()
+            logger.error(f"Failed to connect analytics consumer to RabbitMQ: {e!r}; retrying in {delay:.1f}s")
             self.connection = None
             self.channel = None
+            return False
 
     def process_analytics_event(self, ch, method, properties, body):
         """Process analytics event from RabbitMQ"""
         try:
-            # Parse the message
-            event_data = json.loads(body.decode('utf-8'))
+            # Decode with the producer's codec (messages without a content_type are JSON)
+            event_data = codec_for_content_type(properties.content_type).decode(body)
+            deferred_write = event_data.pop('deferred_write', False)
+            
+            # Drop redelivered or re-published duplicates before any processing or DB I/O
+            if self._is_duplicate(event_data.get('event_id')):
+                logger.debug(f"Dropped duplicate analytics event: {event_data['event_id']}")
+                ch.basic_ack(delivery_tag=method.delivery_tag)
+                return
+            
+            # Producers without user-agent or geo enrichment leave it to the consumer
+            user_agent_parser.enrich(event_data)
+            geo_resolver.enrich(event_data)
+            
+            # Stitch into a session (assigns session_id) before the event is persisted;
+            # rows the API already wrote get theirs on the next session flush
+            analytics_sessionizer.observe(event_data, stored=not deferred_write)
+            if len(analytics_sessionizer.closed) >= settings.ANALYTICS_BATCH_SIZE:
+                self.flush_sessions()
             
             # Log the event
             logger.info(f"Processing analytics event: {event_data.get('event_name', 'unknown')}")
@@ -75,14 +101,92 @@ class AnalyticsConsumer:
             else:
                 self._process_generic_event(event_data)
             
+            # Deferred writes are acknowledged once their batch is persisted
+            if deferred_write:
+                self.pending_writes.append(event_data)
+                if event_data.get('event_id'):
+                    self.pending_event_ids.add(event_data['event_id'])
+                self.pending_delivery_tag = method.delivery_tag
+                if len(self.pending_writes) >= settings.ANALYTICS_BATCH_SIZE:
+                    self.flush_pending_writes()
+                return
+            
             # Acknowledge the message
             ch.basic_ack(delivery_tag=method.delivery_tag)
+            self._remember([event_data])
             
         except Exception as e:
             logger.error(f"Error processing analytics event: {e}")
             # Reject the message and requeue it
             ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
 
+    def _is_duplicate(self, event_id: str) -> bool:
+        if not event_id or not settings.ANALYTICS_DEDUP_ENABLED:
+            return False
+        return event_id in self.pending_event_ids or event_deduplicator.seen(event_id)
+
+    def _remember(self, events: List[Dict[str, Any]]):
+        """Record IDs only once events are handled, so failed batches are reprocessed on redelivery"""
+        if settings.ANALYTICS_DEDUP_ENABLED:
+            for event_data in events:
+                if event_data.get('event_id'):
+                    event_deduplicator.add(event_data['event_id'])
+
+    def flush_pending_writes(self):
+        """Bulk-persist deferred events and acknowledge them in one go"""
+        if not self.pending_writes:
+            return
+        
+        events, delivery_tag = self.pending_writes, self.pending_delivery_tag
+        self.pending_writes, self.pending_delivery_tag = [], None
+        self.pending_event_ids = set()
+        
+        for event_data in events:
+            if isinstance(event_data.get('timestamp'), str):
+                event_data['timestamp'] = datetime.fromisoformat(event_data['timestamp'])
+        
+        db = SessionLocal()
+        try:
+            analytics_bulk_writer.write(db, events)
+            db.commit()
+            self.channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+            self._remember(events)
+            logger.info(f"Persisted {len(events)} deferred analytics events")
+        except Exception as e:
+            logger.error(f"Failed to persist deferred analytics events: {e}")
+            db.rollback()
+            self.channel.basic_nack(delivery_tag=delivery_tag, multiple=True, requeue=True)
+        finally:
+            db.close()
+
+    def flush_sessions(self):
+        """Persist the summaries of closed sessions in one insert, and session_ids of API-written rows"""
+        summaries = analytics_sessionizer.drain()
+        backfill = analytics_sessionizer.drain_backfill()
+        if not summaries and not backfill:
+            return
+        
+        db = SessionLocal()
+        try:
+            analytics_sessionizer.write(db, summaries)
+            analytics_sessionizer.write_backfill(db, backfill)
+            db.commit()
+            logger.info(f"Persisted {len(summaries)} session summaries and {len(backfill)} session_ids")
+        except Exception as e:
+            logger.error(f"Failed to persist session summaries: {e}")
+            db.rollback()
+            analytics_sessionizer.requeue(summaries, backfill)
+        finally:
+            db.close()
+
+    def _on_flush_timer(self):
+        """Flush deferred writes and idle sessions on ANALYTICS_FLUSH_INTERVAL and re-arm the timer"""
+        self.flush_pending_writes()
+        analytics_sessionizer.expire_idle()
+        self.flush_sessions()
+        if self.connection and not self.connection.is_closed:
+            self.connection.call_later(settings.ANALYTICS_FLUSH_INTERVAL, self._on_flush_timer)
+
     def _process_purchase_event(self, event_data: Dict[str, Any]):
         """Process purchase events"""
         logger.info(f"Purchase event: Order {event_data.get('properties', {}).get('order_id')} "
@@ -117,37 +221,61 @@ class AnalyticsConsumer:
         """Process generic events"""
         logger.info(f"Generic event: {event_data.get('event_name')} of type {event_data.get('event_type')}")
 
-    def start_consuming(self):
-        """Start consuming messages from RabbitMQ"""
-        if not self.connection or self.connection.is_closed:
-            logger.error("RabbitMQ connection not available")
-            return
+    def _consume(self):
+        """Consume on the current connection until it closes or consuming is stopped"""
+        # Set up the consumer
+        self.channel.basic_consume(
+            queue=settings.ANALYTICS_QUEUE_NAME,
+            on_message_callback=self.process_analytics_event
+        )
         
-        try:
-            # Set up the consumer
-            self.channel.basic_consume(
-                queue=settings.ANALYTICS_QUEUE_NAME,
-                on_message_callback=self.process_analytics_event
-            )
-            
-            logger.info("Starting analytics consumer...")
-            logger.info(f"Waiting for messages on queue: {settings.ANALYTICS_QUEUE_NAME}")
-            
-            # Start consuming
-            self.channel.start_consuming()
+        # Periodically flush partially filled write batches
+        self.connection.call_later(settings.ANALYTICS_FLUSH_INTERVAL, self._on_flush_timer)
+        
+        logger.info("Starting analytics consumer...")
+        logger.info(f"Waiting for messages on queue: {settings.ANALYTICS_QUEUE_NAME}")
+        
+        # Start consuming
+        self.channel.start_consuming()
+
+    def start_consuming(self):
+        """Consume messages, reconnecting with backoff whenever the broker goes away"""
+        self._stopping = False
+        while not self._stopping:
+            if not self.connection or self.connection.is_closed:
+                if not self._connect():
+                    time.sleep(self.breaker.seconds_until_retry())
+                    continue
             
-        except KeyboardInterrupt:
-            logger.info("Stopping analytics consumer...")
-            self.stop_consuming()
-        except Exception as e:
-            logger.error(f"Error in analytics consumer: {e}")
-            self.stop_consuming()
+            try:
+                self._consume()
+            except KeyboardInterrupt:
+                logger.info("Stopping analytics consumer...")
+                self.stop_consuming()
+            except pika.exceptions.AMQPError as e:
+                if self._stopping:
+                    break
+                # Unacked deliveries are redelivered to the next connection
+                self.pending_writes, self.pending_delivery_tag = [], None
+                self.pending_event_ids = set()
+                self.connection = self.channel = None
+                delay = self.breaker.record_failure()
+                logger.error(f"Lost RabbitMQ connection: {e!r}; reconnecting in {delay:.1f}s")
+                time.sleep(delay)
+            except Exception as e:
+                logger.error(f"Error in analytics consumer: {e}")
+                self.stop_consuming()
 
     def stop_consuming(self):
         """Stop consuming messages"""
+        self._stopping = True
         try:
             if self.channel and not self.channel.is_closed:
+                self.flush_pending_writes()
                 self.channel.stop_consuming()
+            # Sessions still open are closed where they stand
+            analytics_sessionizer.close_all()
+            self.flush_sessions()
             if self.connection and not self.connection.is_closed:
                 self.connection.close()
             logger.info("Analytics consumer stopped")
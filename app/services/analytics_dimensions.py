@@ -0,0 +1,204 @@
+import sys
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+from sqlalchemy import event, select, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, object_session
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.analytics import AnalyticsEvent, DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Session.info key for ids created in the session's open transaction
+PENDING_KEY = "analytics_dimension_ids"
+
+# Rough per-entry overhead of an OrderedDict slot plus the int id
+ENTRY_OVERHEAD_BYTES = 100
+
+
+def id_column(field: str) -> str:
+    return f"{field}_id"
+
+
+def value_digest(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+def _database(db: Session) -> str:
+    return str(db.get_bind().engine.url)
+
+
+def _chunked(values: List[Any], size: int = 500):
+    for index in range(0, len(values), size):
+        yield values[index:index + size]
+
+
+class DimensionEncoder:
+    """String-to-id encoding for the event dimension tables
+
+    Each field has an LRU of value -> id in front of its table. Values the
+    cache does not know are resolved for a whole batch at once: one SELECT by
+    digest, then an INSERT ... ON CONFLICT DO NOTHING for the new ones and a
+    second SELECT. Ids resolved inside a session only enter the shared cache
+    once that session commits, so a rolled-back transaction cannot leave the
+    cache pointing at rows that do not exist. Caches are kept per database.
+    """
+
+    def __init__(self, cache_size: int = 100000):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._ids: Dict[Tuple[str, str], OrderedDict] = {}
+        self._key_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, connection: Connection, field: str, values: Iterable[str]) -> Dict[str, int]:
+        """Ids for values in the field's dimension table, inserting the missing ones"""
+        table = DIMENSIONS[field].__table__
+        by_digest = {value_digest(value): value for value in set(values)}
+        ids: Dict[str, int] = {}
+
+        def fetch(digests: List[bytes]):
+            for chunk in _chunked(digests):
+                for dimension_id, digest in connection.execute(
+                    select(table.c.id, table.c.digest).where(table.c.digest.in_(chunk))
+                ):
+                    ids[by_digest[bytes(digest)]] = dimension_id
+
+        fetch(list(by_digest))
+        missing = [digest for digest, value in by_digest.items() if value not in ids]
+        if missing:
+            dialect = connection.dialect.name
+            if dialect == "postgresql":
+                statement = postgresql.insert(table).on_conflict_do_nothing(index_elements=["digest"])
+            elif dialect == "sqlite":
+                statement = sqlite.insert(table).on_conflict_do_nothing(index_elements=["digest"])
+            else:
+                statement = insert(table)
+            connection.execute(statement, [{"digest": digest, "value": by_digest[digest]} for digest in missing])
+            fetch(missing)
+        return ids
+
+    def _cache(self, database: str, field: str) -> OrderedDict:
+        cache = self._ids.get((database, field))
+        if cache is None:
+            cache = self._ids[(database, field)] = OrderedDict()
+        return cache
+
+    def _cached(self, cache: OrderedDict, value: str) -> Optional[int]:
+        dimension_id = cache.get(value)
+        if dimension_id is not None:
+            cache.move_to_end(value)
+        return dimension_id
+
+    def encode(self, db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace each dimension field of the rows with its <field>_id, in place"""
+        database = _database(db)
+        pending = db.info.setdefault(PENDING_KEY, {})
+        for field in DIMENSIONS:
+            column = id_column(field)
+            field_pending = pending.setdefault((database, field), {})
+            ids: Dict[str, int] = {}
+            missing = set()
+            with self._lock:
+                cache = self._cache(database, field)
+                for row in rows:
+                    value = row.get(field)
+                    if value is None or value in ids or value in missing:
+                        continue
+                    dimension_id = field_pending.get(value) or self._cached(cache, value)
+                    if dimension_id is None:
+                        missing.add(value)
+                        self.misses += 1
+                    else:
+                        ids[value] = dimension_id
+                        self.hits += 1
+            if missing:
+                created = self.get_or_create(db.connection(), field, missing)
+                field_pending.update(created)
+                ids.update(created)
+
+            for row in rows:
+                value = row.pop(field, None)
+                if value is not None:
+                    row[column] = ids[value]
+        return rows
+
+    def commit(self, db: Session):
+        """Move ids resolved in the committed transaction into the shared cache"""
+        pending = db.info.pop(PENDING_KEY, None)
+        if not pending:
+            return
+        with self._lock:
+            for key, values in pending.items():
+                cache = self._cache(*key)
+                for value, dimension_id in values.items():
+                    if value not in cache:
+                        self._key_bytes += sys.getsizeof(value)
+                    cache[value] = dimension_id
+                    cache.move_to_end(value)
+                while len(cache) > self.cache_size:
+                    value, _ = cache.popitem(last=False)
+                    self._key_bytes -= sys.getsizeof(value)
+
+    def discard(self, db: Session):
+        db.info.pop(PENDING_KEY, None)
+
+    def decode_rows(self, connection: Connection, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace each <field>_id of the rows with its value, in place"""
+        for field, dimension in DIMENSIONS.items():
+            column = id_column(field)
+            wanted = list({row[column] for row in rows if row.get(column) is not None})
+            values = {}
+            table = dimension.__table__
+            for chunk in _chunked(wanted):
+                values.update(connection.execute(select(table.c.id, table.c.value).where(table.c.id.in_(chunk))).all())
+            for row in rows:
+                row[field] = values.get(row.pop(column, None))
+        return rows
+
+    def clear(self):
+        with self._lock:
+            for cache in self._ids.values():
+                cache.clear()
+            self._key_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        entries = sum(len(cache) for cache in self._ids.values())
+        return {
+            "hits_total": self.hits,
+            "misses_total": self.misses,
+            "hit_rate": round(self.hits / lookups, 6) if lookups else 0.0,
+            "entries": entries,
+            "memory_bytes": self._key_bytes + entries * ENTRY_OVERHEAD_BYTES,
+        }
+
+
+# Global dimension encoder instance (one cache per process)
+analytics_dimensions = DimensionEncoder(settings.ANALYTICS_DIMENSION_CACHE_SIZE)
+metrics.register_callback("analytics_dimensions", "Event dimension id cache", analytics_dimensions.stats)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed_ids(session):
+    analytics_dimensions.commit(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_ids(session):
+    analytics_dimensions.discard(session)
+
+
+@event.listens_for(AnalyticsEvent, "before_insert")
+def _encode_orm_event(mapper, connection, target):
+    """Events added through the ORM carry their dimension values as plain attributes"""
+    row = {field: target.__dict__[field] for field in DIMENSIONS if target.__dict__.get(field) is not None}
+    if row:
+        for column, dimension_id in analytics_dimensions.encode(object_session(target), [row])[0].items():
+            setattr(target, column, dimension_id)
@@ -0,0 +1,194 @@
+import os
+import csv
+import sys
+import mmap
+import array
+import bisect
+import socket
+import struct
+import logging
+import functools
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# File layout (little-endian):
+#   header     magic, range count N, location count, location block bytes (16 bytes)
+#   starts     N uint32, sorted first addresses of each range
+#   ends       N uint32, last address of each range
+#   locations  N uint32, index into the location block
+#   block      "country\tregion" lines, UTF-8
+GEO_MAGIC = b"GEO1"
+HEADER = struct.Struct("<4sIII")
+
+UNKNOWN_GEO = {"country": None, "region": None}
+
+
+def ip_to_int(ip_address: Optional[str]) -> Optional[int]:
+    """IPv4 address as an integer, None for IPv6 or unparseable values"""
+    if not ip_address:
+        return None
+    if ip_address.startswith("::ffff:"):
+        ip_address = ip_address[7:]
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address), "big")
+    except OSError:
+        return None
+
+
+def _address(value: str) -> int:
+    value = value.strip()
+    return int(value) if value.isdigit() else ip_to_int(value)
+
+
+def build_geo_table(csv_path: str, output_path: str) -> int:
+    """Compile a start,end,country,region CSV (dotted or integer addresses) into a range table"""
+    ranges: List[Tuple[int, int, int]] = []
+    locations: Dict[Tuple[str, str], int] = {}
+    with open(csv_path, newline="", encoding="utf-8") as handle:
+        for row in csv.reader(handle):
+            if not row or row[0].startswith("#"):
+                continue
+            start, end = _address(row[0]), _address(row[1])
+            if start is None or end is None:
+                continue
+            location = (row[2].strip().upper(), row[3].strip() if len(row) > 3 else "")
+            ranges.append((start, end, locations.setdefault(location, len(locations))))
+    ranges.sort()
+
+    starts, ends, indexes = array.array("I"), array.array("I"), array.array("I")
+    for start, end, index in ranges:
+        starts.append(start)
+        ends.append(end)
+        indexes.append(index)
+    if sys.byteorder != "little":
+        for values in (starts, ends, indexes):
+            values.byteswap()
+    block = "\n".join(f"{country}\t{region}" for country, region in locations).encode("utf-8")
+
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "wb") as handle:
+        handle.write(HEADER.pack(GEO_MAGIC, len(ranges), len(locations), len(block)))
+        for values in (starts, ends, indexes):
+            values.tofile(handle)
+        handle.write(block)
+    os.replace(temp_path, output_path)
+    return len(ranges)
+
+
+class GeoResolver:
+    """IPv4 country/region lookup over a memory-mapped range table
+
+    The sorted range arrays are read straight from the mapped file and
+    searched with bisect, so every worker process shares one copy through
+    the page cache; a small per-process LRU sits in front for repeat
+    visitors. A missing table disables geo enrichment.
+    """
+
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._opened = False
+        self._mmap = None
+        self._view = None
+        self._starts = self._ends = self._indexes = None
+        self._locations: List[Dict[str, Any]] = []
+        self._lookup_cached = functools.lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _open(self) -> bool:
+        if self._opened:
+            return self._starts is not None
+        with self._lock:
+            if not self._opened:
+                try:
+                    self._load()
+                except FileNotFoundError:
+                    logger.info(f"No geo table at {self.path}; geo enrichment disabled")
+                except Exception as e:
+                    logger.error(f"Failed to load geo table {self.path}: {e}")
+                self._opened = True
+        return self._starts is not None
+
+    def _load(self):
+        with open(self.path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, _, block_bytes = HEADER.unpack_from(mapped)
+        if magic != GEO_MAGIC:
+            mapped.close()
+            raise ValueError("not a geo range table")
+
+        view = memoryview(mapped)
+        offset = HEADER.size
+        arrays = []
+        for _ in range(3):
+            values = view[offset:offset + 4 * count].cast("I")
+            if sys.byteorder != "little":
+                # The table is little-endian; big-endian hosts get a private copy
+                values = array.array("I", values)
+                values.byteswap()
+            arrays.append(values)
+            offset += 4 * count
+        block = bytes(view[offset:offset + block_bytes]).decode("utf-8")
+
+        self._locations = []
+        for line in block.split("\n") if block else []:
+            country, _, region = line.partition("\t")
+            self._locations.append({"country": country or None, "region": region or None})
+        self._starts, self._ends, self._indexes = arrays
+        self._mmap, self._view = mapped, view
+        logger.info(f"Loaded geo table {self.path}: {count} ranges")
+
+    def _lookup(self, address: int) -> Dict[str, Any]:
+        position = bisect.bisect_right(self._starts, address) - 1
+        if position < 0 or address > self._ends[position]:
+            return UNKNOWN_GEO
+        return self._locations[self._indexes[position]]
+
+    def lookup(self, ip_address: Optional[str]) -> Dict[str, Any]:
+        """Country and region of an address; the returned dict is shared and must not be modified"""
+        if not self._open():
+            return UNKNOWN_GEO
+        address = ip_to_int(ip_address)
+        if address is None:
+            return UNKNOWN_GEO
+        return self._lookup_cached(address)
+
+    def enrich(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add country and region to an event that does not have them yet"""
+        if settings.ANALYTICS_GEO_ENABLED and 'country' not in event_data:
+            event_data.update(self.lookup(event_data.get('ip_address')))
+        return event_data
+
+    def close(self):
+        with self._lock:
+            self._lookup_cached.cache_clear()
+            if self._mmap is not None:
+                # Views into the mapping must be released before it can close
+                for values in (self._starts, self._ends, self._indexes):
+                    if isinstance(values, memoryview):
+                        values.release()
+                self._view.release()
+                self._mmap.close()
+                self._mmap = self._view = None
+            self._starts = self._ends = self._indexes = None
+            self._opened = False
+
+    def stats(self) -> Dict[str, Any]:
+        info = self._lookup_cached.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "ranges": len(self._starts) if self._starts is not None else 0,
+            "hits_total": info.hits,
+            "misses_total": info.misses,
+            "hit_rate": round(info.hits / lookups, 6) if lookups else 0.0,
+            "entries": info.currsize,
+        }
+
+
+# Global geo resolver instance (the table is mapped on first lookup)
+geo_resolver = GeoResolver(settings.ANALYTICS_GEO_TABLE_PATH, settings.ANALYTICS_GEO_CACHE_SIZE)
+metrics.register_callback("analytics_geo", "IP-to-geo lookups", geo_resolver.stats)
@@ -0,0 +1,61 @@
+from typing import Dict, Any, List
+from pydantic import TypeAdapter
+from app.schemas.analytics import (
+    AnalyticsEventCreate,
+    AnalyticsEventDict,
+    AnalyticsEventBatchDict,
+    BeaconEventDict,
+)
+
+# Built once: constructing a TypeAdapter compiles its validator
+_batch_adapter = TypeAdapter(AnalyticsEventBatchDict)
+_beacon_adapter = TypeAdapter(BeaconEventDict)
+
+# Every event field, so decoded dicts have the same keys as model_dump()
+EVENT_DEFAULTS: Dict[str, Any] = {name: None for name in AnalyticsEventCreate.model_fields}
+
+# The batch endpoint reads the raw body, so its schema is declared for the docs
+BATCH_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "required": ["events"],
+                    "properties": {
+                        "events": {
+                            "type": "array",
+                            "description": "Batch of events to track",
+                            "items": AnalyticsEventCreate.model_json_schema(),
+                        }
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+def decode_batch(body: bytes) -> List[AnalyticsEventDict]:
+    """Validate a raw batch body straight into event dicts; raises pydantic.ValidationError"""
+    return _batch_adapter.validate_json(body)["events"]
+
+
+def _beacon_event(data: BeaconEventDict) -> Dict[str, Any]:
+    return {
+        **data,
+        'event_type': data.get('event_type', 'beacon'),
+        'event_name': data.get('event_name', 'page_unload'),
+        'properties': {'beacon': True, 'page_unload': True, **(data.get('properties') or {})},
+    }
+
+
+def decode_beacon(body: bytes) -> Dict[str, Any]:
+    """Validate a JSON (or text/plain) sendBeacon body into an event dict"""
+    return _beacon_event(_beacon_adapter.validate_json(body))
+
+
+def decode_beacon_form(form: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate form-encoded sendBeacon fields into an event dict"""
+    return _beacon_event(_beacon_adapter.validate_python(form))
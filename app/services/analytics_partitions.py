@@ -0,0 +1,314 @@
+import logging
+import threading
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Tuple, Union
+from sqlalchemy import MetaData, Table, Index, event, inspect, select, text, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.schema import CreateIndex, CreateTable
+from app.models.analytics import AnalyticsEvent
+from app.services.analytics_dimensions import analytics_dimensions
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = f"{AnalyticsEvent.__tablename__}_p"
+
+# Errors of a write into a partition that is missing after all (dropped elsewhere, or
+# its creation was rolled back); Postgres reports the latter as "no partition found"
+MISSING_PARTITION_ERRORS = (OperationalError, ProgrammingError, IntegrityError)
+
+
+def _to_utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def partition_index_name(index_name: str, partition: str) -> str:
+    """Name of a base-table index on a SQLite partition table"""
+    base_name = AnalyticsEvent.__tablename__
+    if base_name in index_name:
+        return index_name.replace(base_name, partition)
+    return f"{index_name}_{partition[len(PARTITION_PREFIX):]}"
+
+
+class PartitionManager:
+    """Time-range partitions for analytics_events
+
+    Postgres uses native range partitions of the analytics_events table, so
+    the planner prunes them and inserts are routed by the server. SQLite gets
+    one table per period with the same columns and indexes; writes go to the
+    matching table and reads union only the periods that overlap the query
+    window. In both cases retention is a DROP TABLE per expired period.
+
+    A partition created inside a transaction is only cached once that
+    transaction commits; until then it is remembered on the connection, so a
+    rollback leaves nothing stale behind.
+    """
+
+    def __init__(self, interval: str = ""):
+        if interval not in ("", "day", "month"):
+            raise ValueError(f"Unsupported partition interval: {interval}")
+        self.interval = interval
+        self._metadata = MetaData()
+        self._known: Dict[str, Tuple[datetime, datetime]] = {}
+        self._discovered = False
+        self._lock = threading.Lock()
+        # Serializes check-then-create of partitions between writer threads
+        self._create_lock = threading.Lock()
+        # Partitions created by the open transaction live in connection.info under this key
+        self._pending_key = f"analytics_partitions_created_{id(self)}"
+        self._watched: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.interval)
+
+    def period_start(self, value: datetime) -> datetime:
+        value = _to_utc_naive(value)
+        if self.interval == "day":
+            return datetime(value.year, value.month, value.day)
+        return datetime(value.year, value.month, 1)
+
+    def _next_period(self, start: datetime) -> datetime:
+        if self.interval == "day":
+            return start + timedelta(days=1)
+        if start.month == 12:
+            return datetime(start.year + 1, 1, 1)
+        return datetime(start.year, start.month + 1, 1)
+
+    def next_period_start(self, value: datetime) -> datetime:
+        """Start of the period after the one containing value"""
+        return self._next_period(self.period_start(value))
+
+    def partition_name(self, value: datetime) -> str:
+        start = self.period_start(value)
+        suffix = start.strftime("%Y%m%d" if self.interval == "day" else "%Y%m")
+        return f"{PARTITION_PREFIX}{suffix}"
+
+    @staticmethod
+    def parse_partition_name(name: str) -> Optional[Tuple[datetime, datetime]]:
+        """Return the [start, end) range covered by a partition table name"""
+        if not name.startswith(PARTITION_PREFIX):
+            return None
+        suffix = name[len(PARTITION_PREFIX):]
+        try:
+            if len(suffix) == 8:
+                start = datetime.strptime(suffix, "%Y%m%d")
+                return start, start + timedelta(days=1)
+            if len(suffix) == 6:
+                start = datetime.strptime(suffix, "%Y%m")
+                end = datetime(start.year + 1, 1, 1) if start.month == 12 else datetime(start.year, start.month + 1, 1)
+                return start, end
+        except ValueError:
+            return None
+        return None
+
+    def _discover(self, connection: Union[Connection, Engine], refresh: bool = False):
+        """Load partition tables from the catalog (once, or again when refresh is set)"""
+        if self._discovered and not refresh:
+            return
+        known = {}
+        for name in inspect(connection).get_table_names():
+            bounds = self.parse_partition_name(name)
+            if bounds:
+                known[name] = bounds
+        with self._lock:
+            self._known = known
+            self._discovered = True
+
+    def partitions(self, connection: Union[Connection, Engine]) -> Dict[str, Tuple[datetime, datetime]]:
+        """All partitions and their [start, end) ranges
+
+        Re-read from the catalog on every call: other workers, the consumer and
+        analytics_maintenance.py create and drop partitions behind this process.
+        """
+        self._discover(connection, refresh=True)
+        return dict(self._known)
+
+    def partition_table(self, name: str) -> Table:
+        """Clone analytics_events into a per-period table with renamed indexes"""
+        if name in self._metadata.tables:
+            return self._metadata.tables[name]
+
+        base = AnalyticsEvent.__table__
+        columns = []
+        for column in base.columns:
+            copy = column._copy()
+            copy.index = None
+            columns.append(copy)
+        table = Table(name, self._metadata, *columns, sqlite_autoincrement=True)
+
+        for index in base.indexes:
+            Index(partition_index_name(index.name, name), *[table.c[column.name] for column in index.columns])
+        return table
+
+    def _id_base(self, start: datetime) -> int:
+        """First id of a SQLite partition, so ids stay unique across tables"""
+        if self.interval == "day":
+            ordinal = start.toordinal()
+        else:
+            ordinal = start.year * 12 + start.month - 1
+        return ordinal << 32
+
+    def _watch(self, db_engine: Engine):
+        """Listen for the end of transactions that created partitions"""
+        with self._lock:
+            if db_engine in self._watched:
+                return
+            self._watched.add(db_engine)
+        event.listen(db_engine, "commit", self._on_commit)
+        event.listen(db_engine, "rollback", self._on_rollback)
+
+    def _on_commit(self, connection: Connection):
+        created = connection.info.pop(self._pending_key, None)
+        if created:
+            with self._lock:
+                self._known.update(created)
+
+    def _on_rollback(self, connection: Connection):
+        connection.info.pop(self._pending_key, None)
+
+    def ensure_partition(self, connection: Connection, value: datetime) -> str:
+        """Create the partition covering value if it does not exist yet"""
+        self._discover(connection)
+        name = self.partition_name(value)
+        if name in self._known or name in connection.info.get(self._pending_key, ()):
+            return name
+
+        start = self.period_start(value)
+        end = self._next_period(start)
+        with self._create_lock:
+            if name in self._known or name in connection.info.get(self._pending_key, ()):
+                return name
+            self._watch(connection.engine)
+            # IF NOT EXISTS, since other processes may create the same partition concurrently
+            if connection.dialect.name == "postgresql":
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {AnalyticsEvent.__tablename__} "
+                    f"FOR VALUES FROM ('{start.isoformat()}+00') TO ('{end.isoformat()}+00')"
+                ))
+            else:
+                table = self.partition_table(name)
+                connection.execute(CreateTable(table, if_not_exists=True))
+                for index in table.indexes:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+                connection.execute(
+                    text("INSERT INTO sqlite_sequence (name, seq) SELECT :name, :seq "
+                         "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"),
+                    {"name": name, "seq": self._id_base(start)}
+                )
+            connection.info.setdefault(self._pending_key, {})[name] = (start, end)
+        logger.info(f"Created analytics partition {name}")
+        return name
+
+    def routes_writes(self, db: Session) -> bool:
+        """Whether inserts must target partition tables directly (SQLite)"""
+        return self.enabled and db.get_bind().dialect.name != "postgresql"
+
+    def _route(self, connection: Connection, rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        by_partition: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            name = self.ensure_partition(connection, row["timestamp"])
+            by_partition.setdefault(name, []).append(row)
+        return by_partition
+
+    def insert_events(self, db: Session, rows: List[Dict[str, Any]]):
+        """Insert enriched events, creating partitions as needed
+
+        A write that fails on a partition this process believed to exist
+        re-reads the catalog once and retries.
+        """
+        connection = db.connection()
+        rows = analytics_dimensions.encode(db, [
+            {**row, "timestamp": row.get("timestamp") or datetime.utcnow()} for row in rows
+        ])
+
+        if connection.dialect.name == "postgresql":
+            # A failed statement aborts the Postgres transaction, so retry from a savepoint
+            try:
+                with db.begin_nested():
+                    self._route(connection, rows)
+                    db.execute(AnalyticsEvent.__table__.insert(), rows)
+            except MISSING_PARTITION_ERRORS as e:
+                logger.warning(f"Partition write failed, re-reading partitions: {e}")
+                self._discover(connection, refresh=True)
+                self._route(connection, rows)
+                db.execute(AnalyticsEvent.__table__.insert(), rows)
+            return
+
+        for name, partition_rows in self._route(connection, rows).items():
+            try:
+                db.execute(self.partition_table(name).insert(), partition_rows)
+            except MISSING_PARTITION_ERRORS as e:
+                logger.warning(f"Write to {name} failed, re-reading partitions: {e}")
+                self._discover(connection, refresh=True)
+                name = self.ensure_partition(connection, partition_rows[0]["timestamp"])
+                db.execute(self.partition_table(name).insert(), partition_rows)
+
+    def prune(
+        self,
+        connection: Union[Connection, Engine],
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[str]:
+        """Names of partitions overlapping [start_date, end_date]"""
+        start_date = _to_utc_naive(start_date) if start_date else None
+        end_date = _to_utc_naive(end_date) if end_date else None
+        return sorted(
+            name for name, (start, end) in self.partitions(connection).items()
+            if (start_date is None or end > start_date) and (end_date is None or start <= end_date)
+        )
+
+    def events_source(
+        self,
+        db: Session,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ):
+        """Entity to query for events in a date window
+
+        On SQLite this is AnalyticsEvent aliased over a UNION ALL of the
+        pruned partitions plus the unpartitioned legacy table.
+        """
+        if not self.routes_writes(db):
+            return AnalyticsEvent
+
+        base = AnalyticsEvent.__table__
+        selects = [select(*base.columns)]
+        for name in self.prune(db.get_bind(), start_date, end_date):
+            table = self.partition_table(name)
+            selects.append(select(*[table.c[column.name] for column in base.columns]))
+        return aliased(AnalyticsEvent, union_all(*selects).subquery(base.name))
+
+    def drop_before(self, connection: Connection, cutoff: datetime) -> List[str]:
+        """Drop every partition that ends on or before cutoff"""
+        cutoff = _to_utc_naive(cutoff)
+        dropped = []
+        for name, (start, end) in sorted(self.partitions(connection).items()):
+            if end <= cutoff:
+                connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                with self._lock:
+                    self._known.pop(name, None)
+                    if name in self._metadata.tables:
+                        self._metadata.remove(self._metadata.tables[name])
+                dropped.append(name)
+
+        if dropped:
+            logger.info(f"Dropped {len(dropped)} analytics partitions before {cutoff.isoformat()}")
+        return dropped
+
+    def apply_retention(self, connection: Connection, retention_days: int = None) -> List[str]:
+        """Drop partitions outside the configured retention window"""
+        retention_days = settings.ANALYTICS_RETENTION_DAYS if retention_days is None else retention_days
+        if not self.enabled or retention_days <= 0:
+            return []
+        cutoff = self.period_start(datetime.utcnow() - timedelta(days=retention_days))
+        return self.drop_before(connection, cutoff)
+
+
+# Global partition manager instance
+analytics_partitions = PartitionManager(settings.ANALYTICS_PARTITION_INTERVAL)
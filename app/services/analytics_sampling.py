@@ -0,0 +1,73 @@
+import random
+import hashlib
+from typing import Optional, Dict, Any, List, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+
+sampling_decisions = metrics.counter(
+    "analytics_sampling_total", "Events by sampling decision before enrichment", ("decision",)
+)
+
+HASH_SCALE = float(1 << 64)
+
+
+def hash_fraction(key: str) -> float:
+    """Deterministic position of a key in [0, 1)"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") / HASH_SCALE
+
+
+class SamplingRules:
+    """Per event_type / event_name sample rates and drop lists
+
+    Rules are dicts with event_type, an optional event_name and a rate in
+    [0, 1]; the most specific match wins and unmatched events are kept at
+    default_rate. Drop list entries are "event_type" or
+    "event_type:event_name". Keep decisions hash the session ID (else the
+    user ID, else the event ID), so a sampled-in session keeps all of its
+    events across every rule with the same or a higher rate; events with no
+    key are sampled at random.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]] = None, drop: List[str] = None, default_rate: float = 1.0):
+        self.default_rate = default_rate
+        self.rates: Dict[Tuple[str, Optional[str]], float] = {}
+        for rule in rules or []:
+            rate = float(rule["rate"])
+            if not 0 <= rate <= 1:
+                raise ValueError(f"Sample rate must be between 0 and 1: {rule}")
+            self.rates[(rule["event_type"], rule.get("event_name"))] = rate
+        for entry in drop or []:
+            event_type, _, event_name = entry.partition(":")
+            self.rates[(event_type, event_name or None)] = 0.0
+
+    def rate_for(self, event_type: str, event_name: str) -> float:
+        rate = self.rates.get((event_type, event_name))
+        if rate is None:
+            rate = self.rates.get((event_type, None), self.default_rate)
+        return rate
+
+    def sample_rate(self, event: Dict[str, Any]) -> Optional[float]:
+        """The rate the event was kept at, or None if it is dropped"""
+        rate = self.rate_for(event['event_type'], event['event_name'])
+        if rate >= 1:
+            sampling_decisions.inc(decision="kept")
+            return 1.0
+        if rate <= 0:
+            sampling_decisions.inc(decision="dropped")
+            return None
+
+        key = event.get('session_id') or event.get('user_id') or event.get('event_id')
+        position = hash_fraction(str(key)) if key else random.random()
+        if position < rate:
+            sampling_decisions.inc(decision="sampled_in")
+            return rate
+        sampling_decisions.inc(decision="sampled_out")
+        return None
+
+
+# Global sampling rules instance
+analytics_sampling = SamplingRules(
+    settings.ANALYTICS_SAMPLING_RULES,
+    settings.ANALYTICS_DROP_EVENTS,
+    settings.ANALYTICS_DEFAULT_SAMPLE_RATE
+)
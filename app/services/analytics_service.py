@@ -1,13 +1,22 @@
-import uuid
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models.analytics import AnalyticsEvent
-from app.schemas.analytics import AnalyticsEventCreate, AnalyticsQuery, AnalyticsSummary
+from typing import Optional, Dict, Any, List, Union
+from sqlalchemy.orm import Session, aliased, defer
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import func, case
+from app.models.analytics import AnalyticsEvent, AnalyticsSession, PageUrlDimension, DIMENSIONS
+from app.schemas.analytics import AnalyticsEventCreate, AnalyticsQuery, AnalyticsSummary, SessionSummary
 from app.core.rabbitmq import rabbitmq_manager
 from app.core.config import settings
+from app.core.database import read_only
+from app.core.dedup import event_deduplicator
+from app.services.analytics_partitions import analytics_partitions
+from app.services.analytics_bulk import analytics_bulk_writer
+from app.services.analytics_sampling import analytics_sampling
+from app.services.analytics_ingest import EVENT_DEFAULTS
+from app.services.analytics_useragent import user_agent_parser
+from app.services.analytics_geo import geo_resolver
+from app.services.analytics_dimensions import id_column
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +25,15 @@ class AnalyticsService:
     def __init__(self, db: Session):
         self.db = db
 
-    def _generate_session_id(self) -> str:
-        """Generate a unique session ID"""
-        return str(uuid.uuid4())
+    def _event_dict(self, event_data: Union[AnalyticsEventCreate, Dict[str, Any]]) -> Dict[str, Any]:
+        """Events arrive as decoded dicts (ingestion decoder) or as request models"""
+        if isinstance(event_data, dict):
+            return event_data
+        return event_data.model_dump()
 
-    def _enrich_event_data(self, event_data: AnalyticsEventCreate, request_info: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _enrich_event_data(self, event_data: Dict[str, Any], request_info: Dict[str, Any] = None) -> Dict[str, Any]:
         """Enrich event data with additional context"""
-        enriched_data = event_data.dict()
+        enriched_data = {**EVENT_DEFAULTS, **event_data}
         
         # Add timestamp
         enriched_data['timestamp'] = datetime.utcnow()
@@ -36,28 +47,115 @@ class AnalyticsService:
                 'page_url': request_info.get('page_url'),
             })
         
-        # Add session ID if not provided
-        if not enriched_data.get('session_id'):
-            enriched_data['session_id'] = self._generate_session_id()
-            
+        # Device, OS and browser from the user agent (cached per distinct string)
+        user_agent_parser.enrich(enriched_data)
+        
+        # Country and region from the local IP range table
+        geo_resolver.enrich(enriched_data)
+        
+        # Events without a session_id are stitched into sessions by the consumer
         return enriched_data
 
-    def track_event(self, event_data: AnalyticsEventCreate, request_info: Dict[str, Any] = None) -> bool:
+    def _save_events(self, events: List[Dict[str, Any]]):
+        """Write enriched events through the bulk writer (COPY on Postgres)"""
+        analytics_bulk_writer.write(self.db, events)
+
+    def _defers_writes(self, defer_write: bool = False) -> bool:
+        """Whether the consumer persists events (configured, or requested by admission control)"""
+        return settings.ANALYTICS_ENABLED and (defer_write or settings.ANALYTICS_WRITE_MODE == "deferred")
+
+    def _defer_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Hand events to the consumer for batched persistence; returns those that could not be published"""
+        return [
+            enriched_data for enriched_data in events
+            if not rabbitmq_manager.publish_event({**enriched_data, 'deferred_write': True})
+        ]
+
+    def _sample_rate(self, event_data: Dict[str, Any], request_info: Dict[str, Any] = None) -> Optional[float]:
+        """Rate the event is kept at under the sampling rules and admission control, None to drop it"""
+        rate = analytics_sampling.sample_rate(event_data)
+        if rate is None:
+            return None
+        return rate * (request_info or {}).get('sample_rate', 1.0)
+
+    def _event_weight(self, events):
+        """Number of ingested events each stored row stands for"""
+        return 1.0 / func.coalesce(events.sample_rate, 1.0)
+
+    def _is_duplicate(self, event_data: Dict[str, Any]) -> bool:
+        """Whether the client event_id was already accepted within the dedup window"""
+        return bool(
+            settings.ANALYTICS_DEDUP_ENABLED
+            and event_data.get('event_id')
+            and event_deduplicator.seen(event_data['event_id'])
+        )
+
+    def _remember(self, events: List[Dict[str, Any]]):
+        """Record the event IDs of stored or handed-off events"""
+        if settings.ANALYTICS_DEDUP_ENABLED:
+            for enriched_data in events:
+                if enriched_data.get('event_id'):
+                    event_deduplicator.add(enriched_data['event_id'])
+
+    def _events(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
+        """Entity to query, limited to the partitions overlapping the window"""
+        return analytics_partitions.events_source(self.db, start_date, end_date)
+
+    def _query_with_dimensions(self, events):
+        """Events query that joins the dimension tables once instead of a correlated subquery per row"""
+        dimensions = [aliased(dimension) for dimension in DIMENSIONS.values()]
+        query_builder = self.db.query(events, *[dimension.value for dimension in dimensions])
+        for field, dimension in zip(DIMENSIONS, dimensions):
+            query_builder = query_builder.outerjoin(dimension, dimension.id == getattr(events, id_column(field)))
+        return query_builder.options(*[defer(getattr(events, field)) for field in DIMENSIONS])
+
+    def _decode_dimensions(self, rows) -> List[AnalyticsEvent]:
+        """Attach the joined dimension values to their events"""
+        for event, *values in rows:
+            for field, value in zip(DIMENSIONS, values):
+                set_committed_value(event, field, value)
+        return [row[0] for row in rows]
+
+    def track_event(
+        self,
+        event_data: Union[AnalyticsEventCreate, Dict[str, Any]],
+        request_info: Dict[str, Any] = None,
+        defer_write: bool = False
+    ) -> bool:
         """Track a single analytics event"""
         try:
+            event_data = self._event_dict(event_data)
+            
+            # Sampling and drop rules run before enrichment and any I/O
+            sample_rate = self._sample_rate(event_data, request_info)
+            if sample_rate is None:
+                return True
+            
+            # Retried deliveries were already accepted; acknowledge without any I/O
+            if self._is_duplicate(event_data):
+                logger.debug(f"Dropped duplicate event: {event_data['event_id']}")
+                return True
+            
             # Enrich event data
             enriched_data = self._enrich_event_data(event_data, request_info)
+            enriched_data['sample_rate'] = sample_rate
+            
+            # In deferred mode the consumer persists the event
+            if self._defers_writes(defer_write) and not self._defer_events([enriched_data]):
+                self._remember([enriched_data])
+                logger.debug(f"Deferred event: {event_data['event_name']}")
+                return True
             
             # Save to database
-            db_event = AnalyticsEvent(**enriched_data)
-            self.db.add(db_event)
+            self._save_events([enriched_data])
             self.db.commit()
+            self._remember([enriched_data])
             
-            # Publish to RabbitMQ if enabled
+            # Publish to RabbitMQ if enabled (also when a deferred hand-off failed and the event was saved here)
             if settings.ANALYTICS_ENABLED:
                 rabbitmq_manager.publish_event(enriched_data)
             
-            logger.debug(f"Tracked event: {event_data.event_name}")
+            logger.debug(f"Tracked event: {event_data['event_name']}")
             return True
             
         except Exception as e:
@@ -65,27 +163,55 @@ class AnalyticsService:
             self.db.rollback()
             return False
 
-    def track_batch(self, events: List[AnalyticsEventCreate], request_info: Dict[str, Any] = None) -> int:
+    def track_batch(
+        self,
+        events: List[Union[AnalyticsEventCreate, Dict[str, Any]]],
+        request_info: Dict[str, Any] = None,
+        defer_write: bool = False
+    ) -> int:
         """Track multiple analytics events"""
         tracked_count = 0
         enriched_events = []
         
         try:
+            batch_ids = set()
             for event_data in events:
+                event_data = self._event_dict(event_data)
+                
+                # Sampled-out and dropped events count as tracked but are not stored
+                sample_rate = self._sample_rate(event_data, request_info)
+                if sample_rate is None:
+                    tracked_count += 1
+                    continue
+                
+                # Duplicates (retries, or repeats within the batch) count as tracked but are not stored
+                event_id = event_data.get('event_id')
+                if event_id:
+                    if event_id in batch_ids or self._is_duplicate(event_data):
+                        tracked_count += 1
+                        continue
+                    batch_ids.add(event_id)
+                
                 # Enrich event data
                 enriched_data = self._enrich_event_data(event_data, request_info)
+                enriched_data['sample_rate'] = sample_rate
                 enriched_events.append(enriched_data)
-                
-                # Save to database
-                db_event = AnalyticsEvent(**enriched_data)
-                self.db.add(db_event)
                 tracked_count += 1
             
-            self.db.commit()
+            # In deferred mode the consumer persists whatever was published
+            pending_events = enriched_events
+            if self._defers_writes(defer_write):
+                pending_events = self._defer_events(enriched_events)
             
-            # Publish batch to RabbitMQ if enabled
-            if settings.ANALYTICS_ENABLED:
-                rabbitmq_manager.publish_batch(enriched_events)
+            # Save to database
+            if pending_events:
+                self._save_events(pending_events)
+                self.db.commit()
+            self._remember(enriched_events)
+            
+            # Publish the events saved here to RabbitMQ if enabled (all of them unless deferred)
+            if settings.ANALYTICS_ENABLED and pending_events:
+                rabbitmq_manager.publish_batch(pending_events)
             
             logger.info(f"Tracked {tracked_count} events")
             return tracked_count
@@ -95,107 +221,145 @@ class AnalyticsService:
             self.db.rollback()
             return 0
 
+    @read_only
     def get_events(self, query: AnalyticsQuery) -> List[AnalyticsEvent]:
         """Get analytics events with filtering"""
-        query_builder = self.db.query(AnalyticsEvent)
+        events = self._events(query.start_date, query.end_date)
+        query_builder = self._query_with_dimensions(events)
         
         if query.event_type:
-            query_builder = query_builder.filter(AnalyticsEvent.event_type == query.event_type)
+            query_builder = query_builder.filter(events.event_type == query.event_type)
             
         if query.user_id:
-            query_builder = query_builder.filter(AnalyticsEvent.user_id == query.user_id)
+            query_builder = query_builder.filter(events.user_id == query.user_id)
             
         if query.start_date:
-            query_builder = query_builder.filter(AnalyticsEvent.timestamp >= query.start_date)
+            query_builder = query_builder.filter(events.timestamp >= query.start_date)
             
         if query.end_date:
-            query_builder = query_builder.filter(AnalyticsEvent.timestamp <= query.end_date)
+            query_builder = query_builder.filter(events.timestamp <= query.end_date)
         
-        return query_builder.order_by(AnalyticsEvent.timestamp.desc()).offset(query.offset).limit(query.limit).all()
+        return self._decode_dimensions(
+            query_builder.order_by(events.timestamp.desc()).offset(query.offset).limit(query.limit).all()
+        )
 
+    @read_only
     def get_analytics_summary(self, days: int = 7) -> AnalyticsSummary:
         """Get analytics summary for the specified time period"""
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
+        events = self._events(start_date, end_date)
+        # Sampled events are re-weighted by 1 / sample_rate
+        weight = self._event_weight(events)
         
         # Get total events
-        total_events = self.db.query(AnalyticsEvent).filter(
-            AnalyticsEvent.timestamp >= start_date,
-            AnalyticsEvent.timestamp <= end_date
-        ).count()
+        total_events = self.db.query(func.sum(weight)).filter(
+            events.timestamp >= start_date,
+            events.timestamp <= end_date
+        ).scalar() or 0
         
         # Get unique users
-        unique_users = self.db.query(AnalyticsEvent.user_id).filter(
-            AnalyticsEvent.timestamp >= start_date,
-            AnalyticsEvent.timestamp <= end_date,
-            AnalyticsEvent.user_id.isnot(None)
+        unique_users = self.db.query(events.user_id).filter(
+            events.timestamp >= start_date,
+            events.timestamp <= end_date,
+            events.user_id.isnot(None)
         ).distinct().count()
         
         # Get event types count
         event_types_result = self.db.query(
-            AnalyticsEvent.event_type,
-            func.count(AnalyticsEvent.id)
+            events.event_type,
+            func.sum(weight)
         ).filter(
-            AnalyticsEvent.timestamp >= start_date,
-            AnalyticsEvent.timestamp <= end_date
-        ).group_by(AnalyticsEvent.event_type).all()
+            events.timestamp >= start_date,
+            events.timestamp <= end_date
+        ).group_by(events.event_type).all()
         
-        event_types = {event_type: count for event_type, count in event_types_result}
+        event_types = {event_type: round(count) for event_type, count in event_types_result}
         
-        # Get top pages
-        top_pages_result = self.db.query(
-            AnalyticsEvent.page_url,
-            func.count(AnalyticsEvent.id)
+        # Get top pages, grouped on the integer page_url_id and decoded afterwards
+        top_pages_query = self.db.query(
+            events.page_url_id.label('page_url_id'),
+            func.sum(weight).label('count')
         ).filter(
-            AnalyticsEvent.timestamp >= start_date,
-            AnalyticsEvent.timestamp <= end_date,
-            AnalyticsEvent.page_url.isnot(None)
-        ).group_by(AnalyticsEvent.page_url).order_by(
-            func.count(AnalyticsEvent.id).desc()
-        ).limit(10).all()
+            events.timestamp >= start_date,
+            events.timestamp <= end_date,
+            events.page_url_id.isnot(None)
+        ).group_by(events.page_url_id).order_by(
+            func.sum(weight).desc()
+        ).limit(10).subquery()
+        top_pages_result = self.db.query(PageUrlDimension.value, top_pages_query.c.count).join(
+            top_pages_query, PageUrlDimension.id == top_pages_query.c.page_url_id
+        ).order_by(top_pages_query.c.count.desc()).all()
         
-        top_pages = {page_url: count for page_url, count in top_pages_result}
+        top_pages = {page_url: round(count) for page_url, count in top_pages_result}
         
         return AnalyticsSummary(
-            total_events=total_events,
+            total_events=round(total_events),
             unique_users=unique_users,
             event_types=event_types,
             top_pages=top_pages,
             time_period=f"Last {days} days"
         )
 
+    @read_only
+    def get_session_summary(self, days: int = 7) -> SessionSummary:
+        """Session totals from the consumer's session summaries"""
+        start_date = datetime.utcnow() - timedelta(days=days)
+        sessions = self.db.query(
+            func.count(AnalyticsSession.id),
+            func.avg(AnalyticsSession.duration_seconds),
+            func.avg(AnalyticsSession.page_count),
+            func.sum(case((AnalyticsSession.page_count <= 1, 1), else_=0)),
+            func.sum(case((AnalyticsSession.converted, 1), else_=0))
+        ).filter(AnalyticsSession.started_at >= start_date).one()
+        total, avg_duration, avg_pages, bounces, conversions = sessions
+        
+        return SessionSummary(
+            total_sessions=total,
+            avg_duration_seconds=round(avg_duration or 0.0, 2),
+            avg_pages_per_session=round(avg_pages or 0.0, 2),
+            bounce_rate=round((bounces or 0) / total, 4) if total else 0.0,
+            conversion_rate=round((conversions or 0) / total, 4) if total else 0.0,
+            time_period=f"Last {days} days"
+        )
+
+    @read_only
     def get_user_events(self, user_id: int, limit: int = 100) -> List[AnalyticsEvent]:
         """Get events for a specific user"""
-        return self.db.query(AnalyticsEvent).filter(
-            AnalyticsEvent.user_id == user_id
-        ).order_by(AnalyticsEvent.timestamp.desc()).limit(limit).all()
+        events = self._events()
+        return self._decode_dimensions(self._query_with_dimensions(events).filter(
+            events.user_id == user_id
+        ).order_by(events.timestamp.desc()).limit(limit).all())
 
+    @read_only
     def get_popular_products(self, days: int = 7, limit: int = 10) -> List[Dict[str, Any]]:
         """Get most viewed products"""
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
+        events = self._events(start_date, end_date)
+        weight = self._event_weight(events)
         
         result = self.db.query(
-            AnalyticsEvent.properties['product_id'].label('product_id'),
-            AnalyticsEvent.properties['product_name'].label('product_name'),
-            func.count(AnalyticsEvent.id).label('view_count')
+            events.properties['product_id'].label('product_id'),
+            events.properties['product_name'].label('product_name'),
+            func.sum(weight).label('view_count')
         ).filter(
-            AnalyticsEvent.event_type == 'product_view',
-            AnalyticsEvent.timestamp >= start_date,
-            AnalyticsEvent.timestamp <= end_date,
-            AnalyticsEvent.properties.isnot(None)
+            events.event_type == 'product_view',
+            events.timestamp >= start_date,
+            events.timestamp <= end_date,
+            events.properties.isnot(None)
         ).group_by(
-            AnalyticsEvent.properties['product_id'],
-            AnalyticsEvent.properties['product_name']
+            events.properties['product_id'],
+            events.properties['product_name']
         ).order_by(
-            func.count(AnalyticsEvent.id).desc()
+            func.sum(weight).desc()
         ).limit(limit).all()
         
         return [
             {
                 'product_id': row.product_id,
                 'product_name': row.product_name,
-                'view_count': row.view_count
+                'view_count': round(row.view_count)
             }
             for row in result
         ]
@@ -0,0 +1,293 @@
+import uuid
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.analytics import AnalyticsEvent, AnalyticsSession
+from app.services.analytics_partitions import analytics_partitions
+
+# Event types counted as page views in session summaries
+PAGE_EVENT_TYPES = {"page_view", "product_view"}
+CONVERSION_EVENT_TYPES = {"purchase"}
+
+
+def _timestamp(value: Any) -> datetime:
+    """Naive UTC datetime from a datetime, an ISO string (JSON codec) or nothing"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        return datetime.utcnow()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def session_key(event_data: Dict[str, Any]) -> Optional[str]:
+    """The session an event names: the client's session_id, else its user, else its IP and user agent"""
+    if event_data.get('session_id'):
+        return f"session:{event_data['session_id']}"
+    identities = identity_keys(event_data)
+    return identities[0] if identities else None
+
+
+def identity_keys(event_data: Dict[str, Any]) -> List[str]:
+    """Who sent an event, most specific first: the user, then the IP and user agent"""
+    identities = []
+    if event_data.get('user_id'):
+        identities.append(f"user:{event_data['user_id']}")
+    if event_data.get('ip_address'):
+        client = f"{event_data['ip_address']}|{event_data.get('user_agent') or ''}"
+        identities.append(f"client:{hashlib.blake2b(client.encode('utf-8', 'surrogatepass'), digest_size=12).hexdigest()}")
+    return identities
+
+
+class SessionState:
+    """Running totals of one open session"""
+    __slots__ = (
+        "session_id", "user_id", "started_at", "last_seen", "event_count", "page_count", "converted", "identities"
+    )
+
+    def __init__(self, session_id: str, user_id: Optional[str], started_at: datetime):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.started_at = started_at
+        self.last_seen = started_at
+        self.event_count = 0
+        self.page_count = 0
+        self.converted = False
+        self.identities = set()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "started_at": self.started_at,
+            "ended_at": self.last_seen,
+            "duration_seconds": (self.last_seen - self.started_at).total_seconds(),
+            "event_count": self.event_count,
+            "page_count": self.page_count,
+            "converted": self.converted,
+        }
+
+
+class Sessionizer:
+    """Stitches events into sessions with an inactivity timeout
+
+    Open sessions live in an OrderedDict kept in last-activity order, so
+    expiring idle sessions only looks at the front and the oldest session is
+    closed early once max_active is reached. A client session_id always names
+    its own session, so a login mid-session or two tabs of one user never
+    split or merge sessions. The user and IP/user agent of every event point
+    at the session they were last seen in; events without a session_id join
+    that session (preferring the user) and get its session_id, and a session
+    that gains a user keeps its state. Idle time is measured against the
+    newest event timestamp seen, not the wall clock, so replayed or lagging
+    events expire by their own timeline; the flush timer lets that clock
+    trail the wall clock by at most allowed_lateness, so sessions still
+    close once traffic stops. Closed sessions become summary rows that are
+    handed out in batches by drain(). Events the API already stored without
+    a session_id are queued so their rows get the stitched one.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: int = 1800,
+        max_active: int = 100000,
+        max_pending: int = 100000,
+        allowed_lateness_seconds: int = 300
+    ):
+        self.timeout = timedelta(seconds=timeout_seconds)
+        self.allowed_lateness = timedelta(seconds=allowed_lateness_seconds)
+        self.max_active = max_active
+        self.max_pending = max_pending
+        self.active: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.identities: Dict[str, str] = {}
+        self.watermark: Optional[datetime] = None
+        self.closed: List[Dict[str, Any]] = []
+        # Stored events awaiting their session_id
+        self.backfill: List[Dict[str, Any]] = []
+        self.opened_total = 0
+        self.closed_total = 0
+        self.evicted_total = 0
+        self.dropped_total = 0
+
+    def _close(self, key: str):
+        state = self.active.pop(key)
+        for identity in state.identities:
+            if self.identities.get(identity) == key:
+                del self.identities[identity]
+        self.closed.append(state.summary())
+        self.closed_total += 1
+        # Summaries pile up while writes fail; keep the newest
+        if len(self.closed) > self.max_pending:
+            overflow = len(self.closed) - self.max_pending
+            del self.closed[:overflow]
+            self.dropped_total += overflow
+
+    def observe(self, event_data: Dict[str, Any], stored: bool = False) -> Optional[str]:
+        """Add an event to its session, setting event_data['session_id'] if missing
+
+        stored marks an event whose row is already written; if it had no
+        session_id, the row is queued for a backfill.
+        """
+        if not settings.ANALYTICS_SESSIONIZATION_ENABLED:
+            return event_data.get('session_id')
+        key = session_key(event_data)
+        if key is None:
+            return event_data.get('session_id')
+
+        timestamp = _timestamp(event_data.get('timestamp'))
+        if self.watermark is None or timestamp > self.watermark:
+            self.watermark = timestamp
+        client_session_id = event_data.get('session_id')
+        identities = identity_keys(event_data)
+        if not client_session_id:
+            key = next((self.identities[identity] for identity in identities if identity in self.identities), key)
+
+        state = self.active.get(key)
+        if state is not None and timestamp - state.last_seen > self.timeout:
+            self._close(key)
+            state = None
+
+        if state is None:
+            state = self.active[key] = SessionState(
+                client_session_id or str(uuid.uuid4()), event_data.get('user_id'), timestamp
+            )
+            self.opened_total += 1
+            if len(self.active) > self.max_active:
+                self._close(next(iter(self.active)))
+                self.evicted_total += 1
+        else:
+            self.active.move_to_end(key)
+            if not state.user_id:
+                state.user_id = event_data.get('user_id')
+
+        for identity in identities:
+            previous = self.identities.get(identity)
+            if previous != key:
+                if previous in self.active:
+                    self.active[previous].identities.discard(identity)
+                self.identities[identity] = key
+                state.identities.add(identity)
+
+        state.last_seen = max(state.last_seen, timestamp)
+        state.event_count += 1
+        event_type = event_data.get('event_type')
+        if event_type in PAGE_EVENT_TYPES:
+            state.page_count += 1
+        if event_type in CONVERSION_EVENT_TYPES:
+            state.converted = True
+
+        event_data['session_id'] = state.session_id
+        if stored and not client_session_id:
+            self.backfill.append({
+                "stitched_session_id": state.session_id,
+                "match_timestamp": timestamp,
+                "match_event_type": event_data.get('event_type'),
+                "match_user_id": str(event_data['user_id']) if event_data.get('user_id') is not None else None,
+                "match_ip_address": event_data.get('ip_address'),
+            })
+            if len(self.backfill) > self.max_pending:
+                del self.backfill[:len(self.backfill) - self.max_pending]
+        return state.session_id
+
+    def expire(self, now: datetime = None) -> int:
+        """Close sessions idle for longer than the timeout as of now or the watermark; returns how many"""
+        now = now or self.watermark
+        if now is None:
+            return 0
+        cutoff = now - self.timeout
+        expired = 0
+        while self.active:
+            key, state = next(iter(self.active.items()))
+            if state.last_seen > cutoff:
+                break
+            self._close(key)
+            expired += 1
+        return expired
+
+    def expire_idle(self) -> int:
+        """Expire on the flush timer, against the watermark or the wall clock less allowed_lateness, whichever is later"""
+        now = datetime.utcnow() - self.allowed_lateness
+        if self.watermark is not None and self.watermark > now:
+            now = self.watermark
+        return self.expire(now)
+
+    def close_all(self) -> int:
+        """Close every open session (on shutdown)"""
+        count = len(self.active)
+        while self.active:
+            self._close(next(iter(self.active)))
+        return count
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Take the summaries of closed sessions"""
+        summaries, self.closed = self.closed, []
+        return summaries
+
+    def drain_backfill(self) -> List[Dict[str, Any]]:
+        """Take the stored events awaiting their session_id"""
+        backfill, self.backfill = self.backfill, []
+        return backfill
+
+    def requeue(self, summaries: List[Dict[str, Any]], backfill: List[Dict[str, Any]] = ()):
+        """Put back summaries and backfills whose write failed, ahead of newer ones"""
+        self.closed[:0] = summaries
+        self.backfill[:0] = backfill
+
+    def write(self, db: Session, summaries: List[Dict[str, Any]]):
+        """Insert session summary rows (the caller commits)"""
+        if summaries:
+            db.execute(insert(AnalyticsSession), summaries)
+
+    def write_backfill(self, db: Session, backfill: List[Dict[str, Any]]):
+        """Set the stitched session_id on stored rows that have none (the caller commits)
+
+        Rows are matched on timestamp, event type, user and IP address, and
+        looked up in their partition table when writes are routed (SQLite).
+        """
+        if not backfill:
+            return
+        connection = db.connection()
+        partitions = analytics_partitions.partitions(connection) if analytics_partitions.routes_writes(db) else {}
+        by_table = {}
+        for entry in backfill:
+            name = analytics_partitions.partition_name(entry["match_timestamp"]) if partitions else None
+            table = analytics_partitions.partition_table(name) if name in partitions else AnalyticsEvent.__table__
+            by_table.setdefault(table, []).append(entry)
+
+        for table, entries in by_table.items():
+            connection.execute(
+                update(table).where(
+                    table.c.session_id.is_(None),
+                    table.c.timestamp == bindparam("match_timestamp"),
+                    table.c.event_type == bindparam("match_event_type"),
+                    table.c.user_id.is_not_distinct_from(bindparam("match_user_id")),
+                    table.c.ip_address.is_not_distinct_from(bindparam("match_ip_address")),
+                ).values(session_id=bindparam("stitched_session_id")),
+                entries
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self.active),
+            "pending_summaries": len(self.closed),
+            "pending_backfill": len(self.backfill),
+            "opened_total": self.opened_total,
+            "closed_total": self.closed_total,
+            "evicted_total": self.evicted_total,
+            "dropped_total": self.dropped_total,
+        }
+
+
+# Global sessionizer instance (state lives in the consumer process)
+analytics_sessionizer = Sessionizer(
+    settings.ANALYTICS_SESSION_TIMEOUT_SECONDS,
+    settings.ANALYTICS_SESSION_MAX_ACTIVE,
+    allowed_lateness_seconds=settings.ANALYTICS_SESSION_ALLOWED_LATENESS_SECONDS
+)
+metrics.register_callback("analytics_sessions", "Consumer sessionization", analytics_sessionizer.stats)
@@ -0,0 +1,109 @@
+import re
+import functools
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Longer strings are cut before parsing so one client cannot fill the cache with huge keys
+MAX_USER_AGENT_LENGTH = 512
+
+BOT_PATTERN = re.compile(
+    r"bot\b|bot/|crawl|spider|slurp|bingpreview|mediapartners|facebookexternalhit|embedly|"
+    r"headless|phantomjs|lighthouse|pingdom|uptime|monitor|curl/|wget/|python-requests|"
+    r"python-urllib|aiohttp|httpx|go-http-client|okhttp|java/|libwww|scrapy|axios/|node-fetch",
+    re.IGNORECASE
+)
+TABLET_PATTERN = re.compile(r"iPad|Tablet|PlayBook|Silk/|Kindle|Android(?!.*Mobile)")
+MOBILE_PATTERN = re.compile(r"Mobi|iPhone|iPod|Windows Phone|BlackBerry|Opera Mini")
+
+# First match wins, so more specific tokens come first
+OS_PATTERNS = [
+    ("Windows Phone", re.compile(r"Windows Phone")),
+    ("iOS", re.compile(r"iPhone|iPad|iPod")),
+    ("Android", re.compile(r"Android")),
+    ("Chrome OS", re.compile(r"CrOS")),
+    ("Windows", re.compile(r"Windows")),
+    ("macOS", re.compile(r"Mac OS X|Macintosh")),
+    ("Linux", re.compile(r"Linux|X11")),
+]
+BROWSER_PATTERNS = [
+    ("Edge", re.compile(r"Edg(?:e|A|iOS)?/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Samsung Internet", re.compile(r"SamsungBrowser/")),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/")),
+    ("Chrome", re.compile(r"Chrome/|CriOS/")),
+    ("Safari", re.compile(r"Safari/")),
+    ("Internet Explorer", re.compile(r"MSIE |Trident/")),
+]
+
+# Events without a user agent
+UNKNOWN_USER_AGENT = {"device_class": None, "os_family": None, "browser_family": None, "is_bot": None}
+
+
+def _first_match(patterns, user_agent: str) -> str:
+    for name, pattern in patterns:
+        if pattern.search(user_agent):
+            return name
+    return "Other"
+
+
+def parse_user_agent(user_agent: str) -> Dict[str, Any]:
+    """Device class (desktop, mobile, tablet or bot), OS, browser and bot flag of a UA string"""
+    is_bot = bool(BOT_PATTERN.search(user_agent))
+    if is_bot:
+        device_class = "bot"
+    elif TABLET_PATTERN.search(user_agent):
+        device_class = "tablet"
+    elif MOBILE_PATTERN.search(user_agent):
+        device_class = "mobile"
+    else:
+        device_class = "desktop"
+    return {
+        "device_class": device_class,
+        "os_family": _first_match(OS_PATTERNS, user_agent),
+        "browser_family": _first_match(BROWSER_PATTERNS, user_agent),
+        "is_bot": is_bot,
+    }
+
+
+class UserAgentParser:
+    """UA parsing behind an LRU cache keyed by the UA string
+
+    A few thousand distinct user agents cover most traffic, so nearly every
+    event is a cache hit and the regexes only run for new strings.
+    """
+
+    def __init__(self, cache_size: int = 10000):
+        self.cache_size = cache_size
+        self._parse = functools.lru_cache(maxsize=cache_size)(parse_user_agent)
+
+    def parse(self, user_agent: Optional[str]) -> Dict[str, Any]:
+        """Parsed fields for a UA string; the returned dict is shared and must not be modified"""
+        if not user_agent:
+            return UNKNOWN_USER_AGENT
+        return self._parse(user_agent[:MAX_USER_AGENT_LENGTH])
+
+    def enrich(self, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the parsed fields to an event that does not have them yet"""
+        if settings.ANALYTICS_UA_PARSING_ENABLED and 'device_class' not in event_data:
+            event_data.update(self.parse(event_data.get('user_agent')))
+        return event_data
+
+    def clear(self):
+        self._parse.cache_clear()
+
+    def stats(self) -> Dict[str, Any]:
+        info = self._parse.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits_total": info.hits,
+            "misses_total": info.misses,
+            "hit_rate": round(info.hits / lookups, 6) if lookups else 0.0,
+            "entries": info.currsize,
+            "capacity": self.cache_size,
+        }
+
+
+# Global user-agent parser instance (one cache per process)
+user_agent_parser = UserAgentParser(settings.ANALYTICS_UA_CACHE_SIZE)
+metrics.register_callback("analytics_ua_cache", "User-agent parse cache", user_agent_parser.stats)
@@ -1,30 +1,36 @@
+import functools
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, on_primary
 from app.models.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
 
+@functools.lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context, built on first use (passlib and bcrypt are slow to import)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 class AuthService:
     def __init__(self, db: Session):
         self.db = db
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
 
     def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
 
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
-        user = self.db.query(User).filter(User.email == email).first()
+        with on_primary():
+            user = self.db.query(User).filter(User.email == email).first()
         if not user:
             return None
         if not self.verify_password(password, user.hashed_password):
@@ -38,10 +44,13 @@ class AuthService:
         else:
             expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         to_encode.update({"exp": expire})
+        from jose import jwt
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
         return encoded_jwt
 
     def verify_token(self, token: str) -> Optional[str]:
+        # jose pulls in the cryptography backends, so load it on first use
+        from jose import JWTError, jwt
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
             email: str = payload.get("sub")
@@ -67,7 +76,9 @@ def get_current_user(
     if email is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    # Authorization must not trust a lagging replica (revoked or demoted users)
+    with on_primary():
+        user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise credentials_exception
     
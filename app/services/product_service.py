@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import List, Optional
+from app.core.database import read_only
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate
 
@@ -12,6 +13,7 @@ class ProductService:
     def get_product(self, product_id: int) -> Optional[Product]:
         return self.db.query(Product).filter(Product.id == product_id).first()
 
+    @read_only
     def get_products(
         self, 
         skip: int = 0, 
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Dimension Table Storage Benchmark
+
+Loads the same synthetic events into two SQLite databases, one with the old
+text columns for event_name, page_url, referrer and user_agent and one with
+the dictionary-encoded layout, then compares:
+
+    database_bytes     file size after VACUUM
+    table_bytes        events rows, plus the dimension tables when encoded
+    index_bytes        indexes on analytics_events
+    group_by_seconds   best-of-repeats top-10 pages query
+    list_seconds       best-of-repeats newest LIST_LIMIT events with their strings,
+                       joining the dimension tables as /analytics/events does
+    cache_bytes        estimated footprint of the ingestion id cache
+
+Usage:
+    python benchmarks/dimension_storage.py --events 200000
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import MetaData, Table, Column, Text, Index, text
+from sqlalchemy.orm import Session
+from app.core.database import Base, create_db_engine
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES, DIMENSIONS
+from app.services.analytics_bulk import AnalyticsBulkWriter
+from app.services.analytics_dimensions import analytics_dimensions, id_column
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14.1; rv:120.0) Gecko/20100101 Firefox/120.0",
+]
+
+# Rows per list query, ten default /analytics/events pages
+LIST_LIMIT = 1000
+
+
+def legacy_events_table(metadata: MetaData) -> Table:
+    """analytics_events with the same columns and indexes but plain text dimensions"""
+    source = AnalyticsEvent.__table__
+    renamed = {id_column(field): field for field in DIMENSIONS}
+    columns = []
+    for column in source.columns:
+        if column.name in renamed:
+            columns.append(Column(renamed[column.name], Text, nullable=column.nullable))
+        else:
+            columns.append(Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable))
+    table = Table(source.name, metadata, *columns)
+    for index in source.indexes:
+        Index(
+            index.name.removesuffix("_id") if index.name.endswith("event_name_id") else index.name,
+            *[table.c[renamed.get(column.name, column.name)] for column in index.columns],
+        )
+    return table
+
+
+def make_events(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    events = []
+    for index in range(count):
+        product = rng.randint(1, 2000)
+        events.append({
+            "event_type": rng.choice(["page_view", "product_view", "click"]),
+            "event_name": rng.choice(["view_product", "page_viewed", "add_to_cart", "search_results"]),
+            "user_id": str(rng.randint(1, 20000)),
+            "session_id": f"session_{rng.randint(1, 50000)}",
+            "page_url": f"https://shop.example.com/products/{product}?utm_source=newsletter&utm_campaign=spring_sale",
+            "referrer": rng.choice(["https://www.google.com/", "https://shop.example.com/", None]),
+            "user_agent": rng.choice(USER_AGENTS),
+            "ip_address": f"10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}",
+            "properties": {"product_id": product},
+            "timestamp": start + timedelta(seconds=index),
+        })
+    return events
+
+
+def _table_bytes(db_engine, names) -> int:
+    with db_engine.connect() as conn:
+        try:
+            return sum(
+                conn.execute(text("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = :name"), {"name": name}).scalar()
+                for name in names
+            )
+        except Exception:
+            return 0
+
+
+def _index_names(db_engine) -> list:
+    with db_engine.connect() as conn:
+        return list(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'analytics_events'"
+        )).scalars())
+
+
+def _best(db_engine, query: str, repeats: int) -> float:
+    best = float("inf")
+    with db_engine.connect() as conn:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            conn.execute(text(query)).all()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _list_query() -> str:
+    """The list endpoints' read: one LEFT JOIN per dimension, no per-row subqueries"""
+    joins = " ".join(
+        f"LEFT OUTER JOIN {dimension.__tablename__} AS {field}_d ON {field}_d.id = e.{id_column(field)}"
+        for field, dimension in DIMENSIONS.items()
+    )
+    values = ", ".join(f"{field}_d.value AS {field}" for field in DIMENSIONS)
+    return f"SELECT e.*, {values} FROM analytics_events AS e {joins} ORDER BY e.timestamp DESC LIMIT {LIST_LIMIT}"
+
+
+def run_legacy(events: list, path: str, repeats: int) -> dict:
+    db_engine = create_db_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    legacy_events = legacy_events_table(metadata)
+    metadata.create_all(bind=db_engine)
+    with db_engine.begin() as conn:
+        conn.execute(legacy_events.insert(), events)
+    with db_engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    result = {
+        "database_bytes": os.path.getsize(path),
+        "table_bytes": _table_bytes(db_engine, ["analytics_events"]),
+        "index_bytes": _table_bytes(db_engine, _index_names(db_engine)),
+        "group_by_seconds": _best(db_engine, (
+            "SELECT page_url, COUNT(*) AS views FROM analytics_events WHERE page_url IS NOT NULL "
+            "GROUP BY page_url ORDER BY views DESC LIMIT 10"
+        ), repeats),
+        "list_seconds": _best(db_engine, (
+            f"SELECT * FROM analytics_events ORDER BY timestamp DESC LIMIT {LIST_LIMIT}"
+        ), repeats),
+        # Without encoding there is no cache; every row carries its own strings
+        "cache_bytes": 0,
+    }
+    db_engine.dispose()
+    return result
+
+
+def run_encoded(events: list, path: str, repeats: int) -> dict:
+    db_engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+    analytics_dimensions.clear()
+    db = Session(bind=db_engine)
+    try:
+        AnalyticsBulkWriter(chunk_size=5000).write(db, [dict(event) for event in events], commit_each_chunk=True)
+    finally:
+        db.close()
+    with db_engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    result = {
+        "database_bytes": os.path.getsize(path),
+        "table_bytes": _table_bytes(db_engine, ["analytics_events"] + [dimension.__tablename__ for dimension in DIMENSIONS.values()]),
+        "index_bytes": _table_bytes(db_engine, _index_names(db_engine)),
+        "group_by_seconds": _best(db_engine, (
+            "SELECT d.value, top.views FROM ("
+            "SELECT page_url_id, COUNT(*) AS views FROM analytics_events WHERE page_url_id IS NOT NULL "
+            "GROUP BY page_url_id ORDER BY views DESC LIMIT 10"
+            ") AS top JOIN analytics_page_urls AS d ON d.id = top.page_url_id ORDER BY top.views DESC"
+        ), repeats),
+        "list_seconds": _best(db_engine, _list_query(), repeats),
+        "cache_bytes": analytics_dimensions.stats()["memory_bytes"],
+    }
+    db_engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dimension table storage benchmark")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy = run_legacy(events, os.path.join(tmp_dir, "legacy.db"), args.repeats)
+        encoded = run_encoded(events, os.path.join(tmp_dir, "encoded.db"), args.repeats)
+
+    print(f"{args.events} events")
+    print(f"{'metric':<18} {'text columns':>14} {'dimensions':>14} {'change':>8}")
+    for metric in ("database_bytes", "table_bytes", "index_bytes", "group_by_seconds", "list_seconds", "cache_bytes"):
+        before, after = legacy[metric], encoded[metric]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else "-"
+        print(f"{metric:<18} {before:>14.4g} {after:>14.4g} {change:>8}")
+
+
+if __name__ == "__main__":
+    main()
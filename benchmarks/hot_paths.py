@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Per-Event Hot Path Microbenchmarks
+
+Times the small functions every tracked event or product listing pays for,
+using fixed fixtures, and checks them against a committed baseline:
+
+    enrich_event      AnalyticsService._enrich_event_data
+    event_model       AnalyticsEvent(**enriched) construction
+    publish_encode    broker message encoding as done by publish_event
+    msgpack_encode    the same message encoded with the msgpack codec
+    json_decode       consumer-side decoding of a JSON message
+    msgpack_decode    consumer-side decoding of a msgpack message
+    geo_lookup        uncached IP-to-geo lookup in a 100k-range mapped table
+    product_to_dict   product serialization in GET /products
+
+Timings are stored relative to a pure-Python calibration loop, so a baseline
+recorded on one machine remains meaningful on another. The script exits
+non-zero when any benchmark is slower than its baseline by more than
+--max-regression percent.
+
+Usage:
+    python benchmarks/hot_paths.py                     # compare with the baseline
+    python benchmarks/hot_paths.py --update-baseline   # record a new baseline
+    python benchmarks/hot_paths.py --only geo_lookup --update-baseline
+                                                       # re-record one entry, keep the rest
+
+With --only, the new entries are merged into the existing baseline at its
+calibration: ns_per_op is rescaled so every entry keeps
+relative == ns_per_op / calibration_ns.
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ANALYTICS_TRANSPORT", "memory")
+
+from app.api.v1.endpoints.products import product_to_dict
+from app.core.codecs import get_codec
+from app.core.rabbitmq import InMemoryTransport
+from app.models.analytics import AnalyticsEvent
+from app.models.product import Product
+from app.services.analytics_geo import GeoResolver, build_geo_table, ip_to_int
+from app.services.analytics_service import AnalyticsService
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hot_paths_baseline.json")
+
+# As produced by the ingestion decoder
+EVENT = {
+    "event_type": "product_view",
+    "event_name": "view_product",
+    "user_id": "4821",
+    "session_id": "session_17",
+    "page_url": "https://example.com/products/42",
+    "properties": {"product_id": 42, "category": "Electronics", "price": 99.99, "position": 3},
+}
+REQUEST_INFO = {
+    "ip_address": "10.0.12.34",
+    "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36",
+    "referrer": "https://example.com/",
+    "page_url": "https://example.com/products/42",
+}
+PRODUCTS = [
+    Product(
+        id=index,
+        name=f"Product {index}",
+        description="A product used as a benchmark fixture",
+        price=10.0 + index,
+        category="Electronics",
+        image_url=f"https://example.com/images/{index}.jpg",
+        stock_quantity=index * 3,
+        is_active=True,
+        created_at=datetime(2026, 1, 1, 12, 0),
+        updated_at=None,
+    )
+    for index in range(100)
+]
+
+
+def _calibration():
+    total = 0
+    for value in range(1000):
+        total += value * value
+    return total
+
+
+def _bench_enrich():
+    service = AnalyticsService(None)
+    return lambda: service._enrich_event_data(EVENT, REQUEST_INFO)
+
+
+def _bench_event_model():
+    enriched = AnalyticsService(None)._enrich_event_data(EVENT, REQUEST_INFO)
+    return lambda: AnalyticsEvent(**enriched)
+
+
+def _bench_publish_encode():
+    transport = InMemoryTransport(max_messages=1)
+    enriched = AnalyticsService(None)._enrich_event_data(EVENT, REQUEST_INFO)
+    return lambda: transport.publish_event(enriched)
+
+
+def _bench_msgpack_encode():
+    transport = InMemoryTransport(max_messages=1, codec=get_codec("msgpack"))
+    enriched = AnalyticsService(None)._enrich_event_data(EVENT, REQUEST_INFO)
+    return lambda: transport.publish_event(enriched)
+
+
+def _bench_decode(codec_name: str):
+    def setup():
+        codec = get_codec(codec_name)
+        body = codec.encode(AnalyticsService(None)._enrich_event_data(EVENT, REQUEST_INFO))
+        return lambda: codec.decode(body)
+    return setup
+
+
+def _bench_geo_lookup():
+    table_dir = tempfile.TemporaryDirectory()
+    csv_path = os.path.join(table_dir.name, "ranges.csv")
+    with open(csv_path, "w") as handle:
+        for index in range(100000):
+            start = 16777216 + index * 4096
+            handle.write(f"{start},{start + 4095},US,Region {index % 50}\n")
+    resolver = GeoResolver(os.path.join(table_dir.name, "ranges.bin"))
+    build_geo_table(csv_path, resolver.path)
+    resolver.lookup(REQUEST_INFO["ip_address"])
+    # The cache is bypassed; the directory lives as long as the closure
+    return lambda: table_dir and resolver._lookup(ip_to_int(REQUEST_INFO["ip_address"]))
+
+
+def _bench_product_to_dict():
+    # One call serializes a full 100-product page
+    return lambda: [product_to_dict(product) for product in PRODUCTS]
+
+
+BENCHMARKS = {
+    "enrich_event": _bench_enrich,
+    "event_model": _bench_event_model,
+    "publish_encode": _bench_publish_encode,
+    "msgpack_encode": _bench_msgpack_encode,
+    "json_decode": _bench_decode("json"),
+    "msgpack_decode": _bench_decode("msgpack"),
+    "geo_lookup": _bench_geo_lookup,
+    "product_to_dict": _bench_product_to_dict,
+}
+
+
+def time_callable(func, repeats: int, min_seconds: float) -> float:
+    """Best-of-repeats nanoseconds per call"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_seconds / 4:
+            break
+        loops *= 2
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best * 1e9
+
+
+def run(repeats: int, min_seconds: float, only=None) -> dict:
+    calibration_ns = time_callable(_calibration, repeats, min_seconds)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        ns = time_callable(setup(), repeats, min_seconds)
+        results[name] = {"ns_per_op": round(ns, 1), "relative": round(ns / calibration_ns, 4)}
+    return {"calibration_ns": round(calibration_ns, 1), "results": results}
+
+
+def merge_baseline(path: str, report: dict) -> dict:
+    """The baseline at path with the entries in report replaced, at the baseline's calibration"""
+    with open(path) as handle:
+        baseline = json.load(handle)
+    calibration_ns = baseline["calibration_ns"]
+    for name, result in report["results"].items():
+        baseline["results"][name] = {
+            "ns_per_op": round(result["relative"] * calibration_ns, 1),
+            "relative": result["relative"],
+        }
+    return baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-event hot path microbenchmarks")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Record results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="Allowed slowdown in percent")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="Target duration of each repeat")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    args = parser.parse_args()
+
+    report = run(args.repeats, args.min_seconds, args.only)
+
+    if args.update_baseline:
+        recorded = report
+        if args.only and os.path.exists(args.baseline):
+            recorded = merge_baseline(args.baseline, report)
+        with open(args.baseline, "w") as handle:
+            json.dump(recorded, handle, indent=2)
+            handle.write("\n")
+        print(f"Baseline written to {args.baseline}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)["results"]
+
+    regressions = []
+    print(f"{'benchmark':<16} {'ns/op':>12} {'relative':>9} {'baseline':>9} {'change':>8}")
+    for name, result in report["results"].items():
+        expected = baseline.get(name)
+        if expected:
+            change = (result["relative"] - expected["relative"]) / expected["relative"] * 100
+            if change > args.max_regression:
+                regressions.append(name)
+            print(
+                f"{name:<16} {result['ns_per_op']:>12} {result['relative']:>9} "
+                f"{expected['relative']:>9} {change:>+7.1f}%"
+            )
+        else:
+            print(f"{name:<16} {result['ns_per_op']:>12} {result['relative']:>9} {'-':>9} {'new':>8}")
+
+    if regressions:
+        print(f"❌ Regressed by more than {args.max_regression}%: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ No hot path regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Index Profile Insert Benchmark
+
+Measures analytics_events insert throughput and on-disk size for every
+index profile, so query flexibility can be traded against ingest cost.
+
+Usage:
+    python benchmarks/index_profiles.py --events 50000 --batch-size 500
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import Base, create_db_engine
+from app.core.migrations import sync_analytics_indexes
+from sqlalchemy.orm import Session
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES, INDEX_PROFILES
+from app.services.analytics_dimensions import analytics_dimensions
+
+EVENT_TYPES = ["page_view", "product_view", "click", "purchase", "beacon"]
+
+
+def make_events(count: int, seed: int = 42) -> list:
+    """Deterministic synthetic events"""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    return [
+        {
+            "event_type": rng.choice(EVENT_TYPES),
+            "event_name": f"event_{rng.randint(0, 50)}",
+            "user_id": str(rng.randint(1, 5000)),
+            "session_id": f"session_{rng.randint(1, 20000)}",
+            "page_url": f"https://example.com/products/{rng.randint(1, 500)}",
+            "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36",
+            "ip_address": f"10.0.{rng.randint(0, 255)}.{rng.randint(0, 255)}",
+            "properties": {"product_id": rng.randint(1, 500)},
+            "timestamp": start + timedelta(seconds=index),
+        }
+        for index in range(count)
+    ]
+
+
+def run_profile(profile: str, events: list, batch_size: int, tmp_dir: str) -> dict:
+    """Insert all events under one profile and report throughput"""
+    path = os.path.join(tmp_dir, f"bench_{profile}.db")
+    db_engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+    with db_engine.begin() as conn:
+        sync_analytics_indexes(conn, profile)
+
+    # Resolve dimension ids up front so only the event inserts are timed
+    with Session(bind=db_engine) as db:
+        events = analytics_dimensions.encode(db, [dict(event) for event in events])
+        db.commit()
+
+    insert = AnalyticsEvent.__table__.insert()
+    start = time.perf_counter()
+    for offset in range(0, len(events), batch_size):
+        with db_engine.begin() as conn:
+            conn.execute(insert, events[offset:offset + batch_size])
+    elapsed = time.perf_counter() - start
+
+    db_engine.dispose()
+    size = sum(
+        os.path.getsize(candidate)
+        for candidate in (path, f"{path}-wal")
+        if os.path.exists(candidate)
+    )
+    secondary = len(INDEX_PROFILES[profile])
+    return {
+        "profile": profile,
+        "secondary_indexes": secondary,
+        "btree_writes_per_event": secondary + 1,
+        "events_per_second": round(len(events) / elapsed, 1),
+        "elapsed_seconds": round(elapsed, 3),
+        "database_bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark analytics index profiles")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for profile in INDEX_PROFILES:
+            results.append(run_profile(profile, events, args.batch_size, tmp_dir))
+
+    baseline = results[0]["events_per_second"]
+    print(f"{'profile':<10} {'indexes':>8} {'events/s':>12} {'speedup':>8} {'size MiB':>9}")
+    for result in results:
+        print(
+            f"{result['profile']:<10} {result['secondary_indexes']:>8} "
+            f"{result['events_per_second']:>12} {result['events_per_second'] / baseline:>7.2f}x "
+            f"{result['database_bytes'] / 1024 / 1024:>9.2f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
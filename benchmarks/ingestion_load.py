@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Ingestion Load Benchmark
+
+Drives the ingestion endpoints of an in-process app at a fixed concurrency
+and reports throughput and latency percentiles per scenario:
+
+    beacon       POST /api/v1/beacon/beacon
+    simple       POST /api/v1/beacon/simple
+    track        POST /api/v1/analytics/track
+    track_batch  POST /api/v1/analytics/track/batch
+
+Requests go through httpx's ASGI transport, so no server or network is
+involved. By default a throwaway SQLite database and the in-memory broker
+transport are used; pass --database-url for a local Postgres and
+--transport rabbitmq for a local broker.
+
+Usage:
+    python benchmarks/ingestion_load.py --requests 2000 --concurrency 16 --output results.json
+    python benchmarks/ingestion_load.py --compare results.json
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add the project root to the Python path
+sys.path.insert(0, PROJECT_ROOT)
+
+SCENARIOS = ["beacon", "simple", "track", "track_batch"]
+
+
+def make_event(rng: random.Random, index: int) -> dict:
+    return {
+        "event_type": rng.choice(["page_view", "product_view", "click"]),
+        "event_name": f"event_{rng.randint(0, 50)}",
+        "user_id": str(rng.randint(1, 5000)),
+        "session_id": f"session_{rng.randint(1, 20000)}",
+        "page_url": f"https://example.com/products/{rng.randint(1, 500)}",
+        "properties": {"product_id": rng.randint(1, 500), "seq": index},
+    }
+
+
+def build_request(scenario: str, rng: random.Random, index: int, batch_size: int):
+    """Return (path, json body, events carried) for one request"""
+    if scenario == "beacon":
+        return "/api/v1/beacon/beacon", make_event(rng, index), 1
+    if scenario == "simple":
+        return "/api/v1/beacon/simple", {"type": "page_view", "name": "page_unload", "url": "https://example.com/"}, 1
+    if scenario == "track":
+        return "/api/v1/analytics/track", make_event(rng, index), 1
+    events = [make_event(rng, index * batch_size + offset) for offset in range(batch_size)]
+    return "/api/v1/analytics/track/batch", {"events": events}, batch_size
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+async def run_scenario(client, scenario: str, requests: int, concurrency: int, batch_size: int) -> dict:
+    """Issue requests from concurrency workers and collect per-request latencies"""
+    rng = random.Random(42)
+    payloads = [build_request(scenario, rng, index, batch_size) for index in range(requests)]
+    latencies, errors = [], 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < len(payloads):
+            path, body, _ = payloads[next_index]
+            next_index += 1
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    events = sum(payload[2] for payload in payloads)
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "requests": requests,
+        "events": events,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "events_per_second": round(events / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True
+        ).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def compare(previous: dict, current: dict):
+    """Print throughput and p95 changes against an earlier results file"""
+    before = {result["scenario"]: result for result in previous["results"]}
+    print(f"\nCompared with {previous.get('revision', 'unknown')}:")
+    for result in current["results"]:
+        old = before.get(result["scenario"])
+        if not old:
+            continue
+        throughput = (result["events_per_second"] - old["events_per_second"]) / old["events_per_second"] * 100
+        p95 = (result["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        print(f"  {result['scenario']:<12} events/s {throughput:+6.1f}%   p95 {p95:+6.1f}%")
+
+
+async def run(args) -> dict:
+    import httpx
+    from app.core.database import engine, Base
+    from app.core.migrations import run_migrations
+    from app.models import user, product, order, analytics  # noqa: F401 - register tables
+    from main import app
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for scenario in args.scenarios:
+            # Warm up code paths and the connection pool
+            await run_scenario(client, scenario, min(50, args.requests), args.concurrency, args.batch_size)
+            results.append(await run_scenario(client, scenario, args.requests, args.concurrency, args.batch_size))
+    return {
+        "revision": git_revision(),
+        "recorded_at": datetime.utcnow().isoformat(),
+        "database": engine.url.get_backend_name(),
+        "transport": os.environ["ANALYTICS_TRANSPORT"],
+        "batch_size": args.batch_size,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the analytics ingestion endpoints in process")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=50, help="Events per track_batch request")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--database-url", help="Database to load (default: a temporary SQLite file)")
+    parser.add_argument("--transport", choices=["memory", "rabbitmq"], default="memory")
+    parser.add_argument("--write-mode", choices=["sync", "deferred"], default="sync")
+    parser.add_argument("--admission", action="store_true", help="Keep admission control on (measures shedding, not capacity)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Settings are read at import time, so configure before importing the app
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp_dir}/load.db"
+        os.environ["ANALYTICS_TRANSPORT"] = args.transport
+        os.environ["ANALYTICS_WRITE_MODE"] = args.write_mode
+        os.environ["DEBUG"] = "false"
+        os.environ["ADMISSION_ENABLED"] = str(args.admission).lower()
+        logging.disable(logging.INFO)
+
+        report = asyncio.run(run(args))
+
+    print(f"revision {report['revision']}  database {report['database']}  transport {report['transport']}")
+    print(f"{'scenario':<12} {'req/s':>9} {'events/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for result in report["results"]:
+        print(
+            f"{result['scenario']:<12} {result['requests_per_second']:>9} {result['events_per_second']:>10} "
+            f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8} {result['errors']:>7}"
+        )
+
+    if args.compare:
+        with open(args.compare) as handle:
+            compare(json.load(handle), report)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
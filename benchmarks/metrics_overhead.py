@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Metrics Middleware Overhead Benchmark
+
+Measures the per-request cost of MetricsMiddleware on a beacon-shaped route
+(POST, tiny body, 204 response), both around a bare ASGI handler and around a
+FastAPI route, by driving the ASGI callables directly with no network stack.
+
+Usage:
+    python benchmarks/metrics_overhead.py --requests 20000
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from app.core.metrics import MetricsMiddleware
+
+BODY = json.dumps({"event_type": "beacon", "event_name": "page_unload"}).encode()
+
+
+async def bare_beacon(scope, receive, send):
+    """Minimal ASGI handler doing what the beacon route does on the wire"""
+    await receive()
+    await send({"type": "http.response.start", "status": 204, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def fastapi_beacon() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/api/v1/beacon/beacon")
+    async def beacon():
+        return Response(status_code=204)
+
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Send requests straight into an ASGI app and return seconds per request"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/v1/beacon/beacon",
+        "raw_path": b"/api/v1/beacon/beacon",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": BODY, "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def measure(app_factory, requests: int, rounds: int) -> dict:
+    """Best-of-rounds timing with and without the middleware"""
+    plain, instrumented = app_factory(), MetricsMiddleware(app_factory())
+    asyncio.run(drive(plain, requests // 10))
+    asyncio.run(drive(instrumented, requests // 10))
+
+    plain_times, instrumented_times = [], []
+    for _ in range(rounds):
+        plain_times.append(asyncio.run(drive(plain, requests)))
+        instrumented_times.append(asyncio.run(drive(instrumented, requests)))
+
+    base, with_metrics = min(plain_times), min(instrumented_times)
+    return {
+        "baseline_us": round(base * 1e6, 2),
+        "instrumented_us": round(with_metrics * 1e6, 2),
+        "overhead_us": round((with_metrics - base) * 1e6, 2),
+        "overhead_percent": round((with_metrics - base) / base * 100, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metrics middleware overhead")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {
+        "bare_asgi": measure(lambda: bare_beacon, args.requests, args.rounds),
+        "fastapi_route": measure(fastapi_beacon, args.requests // 4, args.rounds),
+    }
+
+    print(f"{'target':<15} {'baseline us':>12} {'with metrics':>13} {'overhead us':>12} {'overhead':>9}")
+    for target, result in results.items():
+        print(
+            f"{target:<15} {result['baseline_us']:>12} {result['instrumented_us']:>13} "
+            f"{result['overhead_us']:>12} {result['overhead_percent']:>8}%"
+        )
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
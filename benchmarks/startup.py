@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Cold Start Benchmark
+
+Imports main:app in fresh interpreters under ``-X importtime`` and reports
+the median import time plus the most expensive modules. With --check it
+enforces benchmarks/startup_budget.json and exits non-zero when:
+
+- the median import time, relative to importing a fixed set of standard
+  library modules on the same host, is more than max_regression_percent
+  above the recorded baseline
+- any module listed in lazy_modules (broker client, auth crypto) is
+  imported at startup instead of on first use
+
+Like the hot path baseline, the budget stores times relative to that
+calibration import, so a baseline recorded on one machine still applies on
+a slower or faster one.
+
+Usage:
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --check
+    python benchmarks/startup.py --update-baseline   # record the current cold start
+"""
+
+import sys
+import os
+import json
+import argparse
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+# Standard library imports timed alongside main to scale for the host's speed
+CALIBRATION_MODULES = [
+    "asyncio", "json", "email.message", "http.client", "urllib.request", "logging.handlers",
+    "sqlite3", "decimal", "inspect", "typing", "dataclasses", "unittest", "multiprocessing", "xml.dom.minidom",
+]
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, depth, self_us, cumulative_us) for every line of -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure_once(target: str) -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def calibrate() -> float:
+    """Milliseconds to import CALIBRATION_MODULES in a fresh interpreter"""
+    modules = measure_once(", ".join(CALIBRATION_MODULES))
+    return sum(
+        cumulative for name, depth, _, cumulative in modules if depth == 0 and name in CALIBRATION_MODULES
+    ) / 1000
+
+
+def run(target: str, runs: int) -> dict:
+    totals, samples, calibrations = [], [], []
+    for _ in range(runs):
+        modules = measure_once(target)
+        samples.append(modules)
+        totals.append(next(cumulative for name, _, _, cumulative in modules if name == target) / 1000)
+        # Interleaved with the target so both see the same host load
+        calibrations.append(calibrate())
+
+    # Report module costs from the median run
+    median_run = samples[totals.index(sorted(totals)[len(totals) // 2])]
+    imported = {name for name, _, _, _ in median_run}
+    return {
+        "target": target,
+        "runs": runs,
+        "median_import_ms": round(statistics.median(totals), 1),
+        "min_import_ms": round(min(totals), 1),
+        "calibration_ms": round(statistics.median(calibrations), 1),
+        "relative": round(statistics.median(total / calibration for total, calibration in zip(totals, calibrations)), 2),
+        "imported_modules": len(imported),
+        "top_self_ms": [
+            {"module": name, "ms": round(self_us / 1000, 1)}
+            for name, _, self_us, _ in sorted(median_run, key=lambda item: item[2], reverse=True)[:15]
+        ],
+        "top_app_cumulative_ms": [
+            {"module": name, "ms": round(cumulative / 1000, 1)}
+            for name, _, _, cumulative in sorted(median_run, key=lambda item: item[3], reverse=True)
+            if name.startswith("app.")
+        ][:15],
+        "_imported": imported,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure main:app cold import time")
+    parser.add_argument("--target", default="main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", default=BUDGET_PATH)
+    parser.add_argument("--check", action="store_true", help="Fail when the budget is exceeded")
+    parser.add_argument("--update-baseline", action="store_true", help="Record this run as the budget's baseline")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args.target, args.runs)
+    imported = report.pop("_imported")
+
+    print(f"import {report['target']}: median {report['median_import_ms']} ms, "
+          f"min {report['min_import_ms']} ms over {report['runs']} runs, {report['imported_modules']} modules")
+    print(f"calibration: {report['calibration_ms']} ms, {report['target']} takes {report['relative']}x as long")
+    print("\nSlowest modules (self time):")
+    for entry in report["top_self_ms"]:
+        print(f"  {entry['ms']:>8} ms  {entry['module']}")
+    print("\nApplication modules (cumulative):")
+    for entry in report["top_app_cumulative_ms"]:
+        print(f"  {entry['ms']:>8} ms  {entry['module']}")
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.update_baseline:
+        with open(args.budget) as handle:
+            budget = json.load(handle)
+        budget = {
+            "baseline_import_ms": report["median_import_ms"],
+            "calibration_ms": report["calibration_ms"],
+            "relative": report["relative"],
+            **{key: value for key, value in budget.items() if key not in ("baseline_import_ms", "calibration_ms", "relative")},
+        }
+        with open(args.budget, "w") as handle:
+            json.dump(budget, handle, indent=2)
+            handle.write("\n")
+        print(f"\nBaseline written to {args.budget}")
+
+    if args.check:
+        with open(args.budget) as handle:
+            budget = json.load(handle)
+
+        failures = []
+        limit = budget["relative"] * (1 + budget["max_regression_percent"] / 100)
+        if report["relative"] > limit:
+            failures.append(
+                f"median import {report['relative']}x calibration > budget {limit:.2f}x "
+                f"(baseline {budget['relative']}x + {budget['max_regression_percent']}%)"
+            )
+        eager = [module for module in budget.get("lazy_modules", []) if module in imported]
+        if eager:
+            failures.append(f"modules that should load lazily were imported at startup: {', '.join(eager)}")
+
+        if failures:
+            for failure in failures:
+                print(f"❌ {failure}")
+            sys.exit(1)
+        print(f"\n✅ Cold start within budget ({limit:.2f}x calibration)")
+
+
+if __name__ == "__main__":
+    main()
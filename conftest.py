@@ -0,0 +1,26 @@
+"""
+Pytest configuration
+
+Points the application at a throwaway SQLite database before any test module
+imports it, so running the suite never writes to (or switches to WAL mode)
+the tracked shopping_api.db. Running a test script directly still uses the
+configured database.
+"""
+
+import os
+import shutil
+import tempfile
+
+_test_db_dir = tempfile.mkdtemp(prefix="shopping_api_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_test_db_dir}/shopping_api.db"
+
+
+def pytest_configure(config):
+    from app.core.database import Base, engine
+    from app.models import user, product, order, analytics
+
+    Base.metadata.create_all(bind=engine)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_test_db_dir, ignore_errors=True)
@@ -5,6 +5,7 @@ from app.services.product_service import ProductService
 from app.schemas.user import UserCreate
 from app.schemas.product import ProductCreate
 from app.core.database import SessionLocal
+from app.core.migrations import run_migrations
 
 
 def init_database():
@@ -12,6 +13,9 @@ def init_database():
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
     
+    print("Applying schema migrations...")
+    run_migrations(engine)
+    
     print("Adding sample data...")
     db = SessionLocal()
     
@@ -1,9 +1,17 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.core.database import get_pool_stats, replica_set, ReplicaRoutingMiddleware
+from app.core.metrics import metrics, render_metrics, MetricsMiddleware
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.admission import AdmissionMiddleware
+from app.core.decompression import DecompressionMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.memory import start_memory_tracking, memory_tracker
 
 
 @asynccontextmanager
@@ -12,18 +20,20 @@ async def lifespan(app: FastAPI):
     print("Starting up FastAPI application...")
     print("Initializing analytics system...")
     
-    # Initialize RabbitMQ connection
+    # Connect to RabbitMQ in the background so boot never waits on the broker
     try:
         from app.core.rabbitmq import rabbitmq_manager
-        if rabbitmq_manager.is_connected():
-            print("✅ RabbitMQ connection established")
-        else:
-            print("⚠️  RabbitMQ connection failed - analytics events will be stored locally only")
+        rabbitmq_manager.start()
+        print("✅ RabbitMQ connection started in the background")
     except Exception as e:
         print(f"⚠️  RabbitMQ initialization error: {e}")
     
+    start_memory_tracking()
+    
     yield
     
+    memory_tracker.stop_periodic()
+    
     # Shutdown
     print("Shutting down FastAPI application...")
     
@@ -45,7 +55,24 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS middleware
+# Route GET requests to read replicas when configured
+app.add_middleware(ReplicaRoutingMiddleware)
+
+# Per-request SQL query counts (headers in debug mode)
+app.add_middleware(QueryStatsMiddleware)
+
+# Decode gzip/deflate request bodies while endpoints stream them
+app.add_middleware(DecompressionMiddleware)
+
+# Shed ingestion load before it starves catalog and checkout
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# On-demand profiling of single requests for admins
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# CORS middleware (added after the middlewares above so their error responses carry CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_HOSTS,
@@ -54,6 +81,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics (added last so it wraps every other middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    metrics.register_callback("db_pool", "Primary database connection pool", get_pool_stats)
+    metrics.register_callback(
+        "db_replicas",
+        "Read replica availability",
+        lambda: {"configured": len(replica_set.engines), "healthy": len(replica_set.healthy())}
+    )
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
@@ -79,10 +116,24 @@ async def health_check():
         "analytics": {
             "enabled": settings.ANALYTICS_ENABLED,
             "rabbitmq": rabbitmq_status
+        },
+        "database": {
+            "pool": get_pool_stats(),
+            "replicas": {
+                "configured": len(replica_set.engines),
+                "healthy": len(replica_set.healthy())
+            }
         }
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Metrics disabled\n", status_code=404)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
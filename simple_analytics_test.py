@@ -106,7 +106,7 @@ def test_rabbitmq_connection():
         # Import and test RabbitMQ manager
         from app.core.rabbitmq import rabbitmq_manager
         
-        if rabbitmq_manager.is_connected():
+        if rabbitmq_manager.wait_until_connected():
             print("✅ RabbitMQ connection successful")
             
             # Test publishing a message
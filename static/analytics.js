@@ -7,10 +7,12 @@
 class AnalyticsBeacon {
     constructor(options = {}) {
         this.baseUrl = options.baseUrl || 'http://localhost:8000/api/v1/beacon';
+        this.batchUrl = options.batchUrl || this.baseUrl.replace(/\/beacon$/, '/analytics/track/batch');
         this.userId = options.userId || null;
         this.sessionId = options.sessionId || this.generateSessionId();
         this.enabled = options.enabled !== false;
         this.debug = options.debug || false;
+        this.maxRetries = options.maxRetries !== undefined ? options.maxRetries : 3;
         
         this.init();
     }
@@ -19,6 +21,16 @@ class AnalyticsBeacon {
         return 'session_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
     }
     
+    generateEventId() {
+        // Assigned once in buildEvent; every resend of the event (the fetch fallback
+        // after sendBeacon, and postWithRetry's retries) carries the same ID so the
+        // server can drop duplicates
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return 'event_' + Date.now() + '_' + Math.random().toString(36).substr(2, 12);
+    }
+    
     init() {
         if (!this.enabled) return;
         
@@ -44,10 +56,9 @@ class AnalyticsBeacon {
         });
     }
     
-    track(eventName, properties = {}) {
-        if (!this.enabled) return;
-        
-        const eventData = {
+    buildEvent(eventName, properties = {}) {
+        return {
+            event_id: this.generateEventId(),
             event_type: 'custom',
             event_name: eventName,
             user_id: this.userId,
@@ -58,11 +69,87 @@ class AnalyticsBeacon {
                 timestamp: new Date().toISOString()
             }
         };
+    }
+    
+    track(eventName, properties = {}) {
+        if (!this.enabled) return;
         
-        this.sendBeacon(eventData);
+        this.sendBeacon(this.buildEvent(eventName, properties));
         this.log('Event tracked:', eventName);
     }
     
+    // events: [{ name, properties }]
+    trackBatch(events) {
+        if (!this.enabled || !events.length) return;
+        
+        const batch = events.map(({ name, properties }) => this.buildEvent(name, properties));
+        this.sendBatch(batch);
+        this.log('Batch tracked:', batch.length);
+    }
+    
+    async compress(body) {
+        // Batches are repetitive JSON and shrink several times under gzip
+        if (typeof CompressionStream === 'undefined') {
+            return null;
+        }
+        const stream = new Blob([body]).stream().pipeThrough(new CompressionStream('gzip'));
+        return await new Response(stream).blob();
+    }
+    
+    async sendBatch(events) {
+        const body = JSON.stringify({ events });
+        const headers = { 'Content-Type': 'application/json' };
+        let payload = body;
+        
+        try {
+            const compressed = await this.compress(body);
+            if (compressed) {
+                payload = compressed;
+                headers['Content-Encoding'] = 'gzip';
+            }
+        } catch (error) {
+            this.log('Compression failed, sending uncompressed:', error);
+        }
+        
+        // Browsers reject keepalive requests whose body exceeds 64 KiB
+        const size = typeof payload === 'string' ? new Blob([payload]).size : payload.size;
+        
+        // sendBeacon cannot set Content-Encoding, so batches use fetch with keepalive when it fits
+        const response = await this.postWithRetry(this.batchUrl, {
+            method: 'POST',
+            headers,
+            body: payload,
+            keepalive: size <= 64 * 1024
+        });
+        
+        if (response && response.ok) {
+            this.log('Batch sent via fetch');
+        }
+    }
+    
+    async postWithRetry(url, request) {
+        // Resends the identical body (same event IDs) on network errors, 429 and 5xx
+        for (let attempt = 0; ; attempt++) {
+            let response = null;
+            try {
+                response = await fetch(url, request);
+                if (response.ok || (response.status !== 429 && response.status < 500)) {
+                    return response;
+                }
+            } catch (error) {
+                this.log('Fetch error:', error);
+            }
+            if (attempt >= this.maxRetries) {
+                return response;
+            }
+            // Admission control answers 429 with Retry-After; otherwise back off exponentially
+            const retryAfter = response && parseFloat(response.headers.get('Retry-After'));
+            const delay = retryAfter > 0 ? retryAfter * 1000 : 500 * Math.pow(2, attempt);
+            this.log(`Retrying in ${delay} ms`);
+            await new Promise((resolve) => setTimeout(resolve, delay));
+        }
+    }
+    
     sendBeacon(data) {
         try {
             if (navigator.sendBeacon) {
@@ -87,20 +174,16 @@ class AnalyticsBeacon {
     }
     
     async sendViaFetch(data) {
-        try {
-            const response = await fetch(this.baseUrl + '/beacon', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(data)
-            });
-            
-            if (response.ok) {
-                this.log('Data sent via fetch');
-            }
-        } catch (error) {
-            this.log('Fetch error:', error);
+        const response = await this.postWithRetry(this.baseUrl + '/beacon', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(data)
+        });
+        
+        if (response && response.ok) {
+            this.log('Data sent via fetch');
         }
     }
     
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Admission Control Test
+
+This script checks the AIMD ingestion limit and that requests over it are
+sampled, moved to the spool tier or shed with the right response.
+"""
+
+import sys
+import os
+import tempfile
+import itertools
+from types import SimpleNamespace
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import Session
+from app.core import admission as admission_module
+from app.core.config import settings
+from app.core.database import Base, create_db_engine, get_db
+from app.core.admission import AIMDLimiter, AdmissionMiddleware, admission_tier, defers_writes
+from app.api.v1.endpoints.analytics import router as analytics_router
+from app.models.analytics import ANALYTICS_TABLES
+from app.services.analytics_service import AnalyticsService
+from app.core.decompression import DecompressionMiddleware
+
+
+def test_aimd_limit():
+    """Test additive increase, bounded multiplicative decrease and tier thresholds"""
+    print("🧪 Testing AIMD limiter...")
+
+    limiter = AIMDLimiter(initial=4, min_limit=1, max_limit=6, target_latency=0.1)
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 6 and limiter.in_flight == 0
+
+    # Slow requests back off once per target latency window
+    limiter.acquire()
+    limiter.acquire()
+    limiter.release(1.0)
+    limiter.release(1.0)
+    assert limiter.limit == 6 * 0.9
+
+    for _ in range(100):
+        limiter._last_decrease = 0.0
+        limiter.acquire()
+        limiter.release(0.0, failed=True)
+    assert limiter.limit == 1
+
+    assert admission_tier(0.5) == "admit"
+    assert admission_tier(1.2) == "sample"
+    assert admission_tier(1.8) == "spool"
+    assert admission_tier(3.0) == "drop"
+
+    print("✅ AIMD limiter works")
+
+
+def test_admission_tiers():
+    """Test pass-through, spool-tier state and shedding per route kind"""
+    print("🧪 Testing admission tiers...")
+
+    app = FastAPI()
+
+    @app.post("/api/v1/analytics/track")
+    async def track(request: Request):
+        return {"deferred": defers_writes(request)}
+
+    @app.post("/api/v1/beacon/beacon")
+    async def beacon(request: Request):
+        return {"deferred": defers_writes(request)}
+
+    @app.get("/api/v1/products/")
+    async def products():
+        return []
+
+    limiter = AIMDLimiter(initial=2, min_limit=1, max_limit=2, target_latency=10)
+    app.add_middleware(AdmissionMiddleware, limiter=limiter)
+    client = TestClient(app)
+
+    original_rate = settings.ADMISSION_SAMPLE_RATE
+    try:
+        assert client.post("/api/v1/analytics/track").json() == {"deferred": False}
+        assert limiter.in_flight == 0
+
+        # Spool tier: accepted requests skip the synchronous write
+        settings.ADMISSION_SAMPLE_RATE = 1.0
+        limiter.in_flight = 3
+        assert client.post("/api/v1/analytics/track").json() == {"deferred": True}
+
+        # Sampled out: 429 for the JSON API, 204 for beacons
+        settings.ADMISSION_SAMPLE_RATE = 0.0
+        response = client.post("/api/v1/analytics/track")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+        assert "access-control-allow-origin" not in response.headers
+        assert client.post("/api/v1/beacon/beacon").status_code == 204
+
+        # Drop tier sheds everything; other routes are never limited
+        limiter.in_flight = 10
+        assert client.post("/api/v1/beacon/beacon").status_code == 204
+        assert client.get("/api/v1/products/").status_code == 200
+    finally:
+        settings.ADMISSION_SAMPLE_RATE = original_rate
+
+    print("✅ Admission tiers work")
+
+
+def test_rejections_carry_cors_headers():
+    """Test that CORSMiddleware wraps admission so browsers can read a 429"""
+    print("🧪 Testing CORS on rejections...")
+
+    from main import app
+
+    # Starlette runs the last added middleware outermost
+    order = [middleware.cls for middleware in app.user_middleware]
+    assert order.index(CORSMiddleware) < order.index(AdmissionMiddleware)
+    assert order.index(CORSMiddleware) < order.index(DecompressionMiddleware)
+
+    shed_app = FastAPI()
+
+    @shed_app.post("/api/v1/analytics/track")
+    async def track():
+        return {}
+
+    limiter = AIMDLimiter(initial=1, min_limit=1, max_limit=1, target_latency=10)
+    limiter.in_flight = 10
+    shed_app.add_middleware(AdmissionMiddleware, limiter=limiter)
+    shed_app.add_middleware(CORSMiddleware, allow_origins=["*"])
+
+    response = TestClient(shed_app).post("/api/v1/analytics/track", headers={"Origin": "https://shop.example.com"})
+    assert response.status_code == 429
+    assert response.headers["access-control-allow-origin"] == "*"
+
+    print("✅ Rejections carry CORS headers")
+
+
+def test_retried_api_events_keep_full_weight():
+    """Test that API events accepted after a 429 and retry are not re-weighted"""
+    print("🧪 Testing sampled-tier API retries...")
+
+    original_enabled, original_rate = settings.ANALYTICS_ENABLED, settings.ADMISSION_SAMPLE_RATE
+    original_random = admission_module.random
+    settings.ANALYTICS_ENABLED, settings.ADMISSION_SAMPLE_RATE = False, 0.5
+    # Every first attempt is sampled out, every retry accepted
+    admission_module.random = SimpleNamespace(random=itertools.cycle([0.9, 0.1]).__next__)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/admission.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+
+        def override_db():
+            db = Session(bind=db_engine)
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        app.include_router(analytics_router, prefix=f"{settings.API_V1_STR}/analytics")
+        app.dependency_overrides[get_db] = override_db
+        limiter = AIMDLimiter(initial=2, min_limit=2, max_limit=2, target_latency=10)
+        limiter.in_flight = 2
+        app.add_middleware(AdmissionMiddleware, limiter=limiter)
+        client = TestClient(app)
+
+        try:
+            for index in range(3):
+                event = {"event_type": "click", "event_name": f"buy_{index}"}
+                assert client.post("/api/v1/analytics/track", json=event).status_code == 429
+                assert client.post("/api/v1/analytics/track", json=event).status_code == 200
+
+            db = Session(bind=db_engine)
+            try:
+                summary = AnalyticsService(db).get_analytics_summary(days=1)
+                assert summary.total_events == 3
+                assert summary.event_types == {"click": 3}
+            finally:
+                db.close()
+        finally:
+            db_engine.dispose()
+            admission_module.random = original_random
+            settings.ANALYTICS_ENABLED, settings.ADMISSION_SAMPLE_RATE = original_enabled, original_rate
+
+    print("✅ Retried API events keep their weight")
+
+
+if __name__ == "__main__":
+    test_aimd_limit()
+    test_admission_tiers()
+    test_rejections_carry_cors_headers()
+    test_retried_api_events_keep_full_weight()
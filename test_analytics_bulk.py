@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Analytics Bulk Writer Test
+
+This script checks the bulk event writer: the executemany fallback used on
+SQLite, the CSV encoding streamed to COPY on Postgres and the synchronous
+fallback when deferred events cannot be handed to the consumer.
+"""
+
+import sys
+import os
+import csv
+import tempfile
+from types import SimpleNamespace
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import Base, create_db_engine
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES
+from app.core.config import settings
+from app.services import analytics_service as analytics_service_module
+from app.services.analytics_bulk import AnalyticsBulkWriter, BULK_COLUMNS
+from app.services.analytics_service import AnalyticsService
+
+
+def test_sqlite_fallback():
+    """Test chunked executemany writes on SQLite"""
+    print("🧪 Testing bulk writer on SQLite...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/bulk.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+
+        writer = AnalyticsBulkWriter(chunk_size=3)
+        rows = (
+            {"event_type": "click", "event_name": f"event_{index}", "properties": {"index": index}}
+            for index in range(10)
+        )
+        db = Session(bind=db_engine)
+        assert writer.write(db, rows, commit_each_chunk=True) == 10
+
+        stored = db.query(AnalyticsEvent).order_by(AnalyticsEvent.id).all()
+        assert len(stored) == 10
+        assert stored[4].properties == {"index": 4}
+        assert stored[4].timestamp is not None
+        db.close()
+        db_engine.dispose()
+
+    print("✅ SQLite bulk writes work")
+
+
+def test_copy_csv_encoding():
+    """Test that NULLs, empty strings, quotes and JSON survive the CSV buffer"""
+    print("🧪 Testing COPY CSV encoding...")
+
+    writer = AnalyticsBulkWriter()
+    row = writer._normalize({
+        "event_type": 'say "hi"',
+        "event_name": "click",
+        "session_id": "",
+        "properties": {"a": [1, 2]},
+        "timestamp": datetime(2026, 1, 1, 12, 30),
+    })
+    line = writer._csv_buffer([row]).getvalue()
+    fields = next(csv.reader([line.strip()]))
+
+    values = dict(zip(BULK_COLUMNS, fields))
+    assert values["event_type"] == 'say "hi"'
+    assert values["session_id"] == ""
+    assert values["user_id"] == "\\N"
+    assert values["properties"] == '{"a": [1, 2]}'
+    assert values["timestamp"] == "2026-01-01T12:30:00"
+
+    print("✅ COPY CSV encoding is correct")
+
+
+def test_failed_deferral_still_published():
+    """Test that events saved after a failed deferred hand-off are still published"""
+    print("🧪 Testing deferred write fallback...")
+
+    published = []
+
+    def publish_event(event_data):
+        # The broker takes plain events but the deferred hand-off fails
+        if event_data.get("deferred_write"):
+            return False
+        published.append(event_data["event_name"])
+        return True
+
+    def publish_batch(events):
+        published.extend(event_data["event_name"] for event_data in events)
+        return len(events)
+
+    original_manager = analytics_service_module.rabbitmq_manager
+    original_enabled, original_mode = settings.ANALYTICS_ENABLED, settings.ANALYTICS_WRITE_MODE
+    analytics_service_module.rabbitmq_manager = SimpleNamespace(publish_event=publish_event, publish_batch=publish_batch)
+    settings.ANALYTICS_ENABLED, settings.ANALYTICS_WRITE_MODE = True, "deferred"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/deferred.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            assert service.track_event({"event_type": "click", "event_name": "single"})
+            assert service.track_batch([{"event_type": "click", "event_name": f"batch_{index}"} for index in range(2)]) == 2
+            assert db.query(AnalyticsEvent).count() == 3
+            assert published == ["single", "batch_0", "batch_1"]
+        finally:
+            db.close()
+            db_engine.dispose()
+            analytics_service_module.rabbitmq_manager = original_manager
+            settings.ANALYTICS_ENABLED, settings.ANALYTICS_WRITE_MODE = original_enabled, original_mode
+
+    print("✅ Failed deferrals are saved and published")
+
+
+if __name__ == "__main__":
+    test_sqlite_fallback()
+    test_copy_csv_encoding()
+    test_failed_deferral_still_published()
@@ -85,7 +85,7 @@ def test_rabbitmq_manager():
     try:
         from app.core.rabbitmq import rabbitmq_manager
         
-        if rabbitmq_manager.is_connected():
+        if rabbitmq_manager.wait_until_connected():
             print("✅ RabbitMQ connection successful")
             
             # Test publishing
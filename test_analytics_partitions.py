@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Analytics Partitions Test
+
+This script checks per-period SQLite partitions: write routing, date-range
+pruning and retention by dropping whole partitions.
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import Base, create_db_engine
+from app.models import analytics
+from app.services.analytics_partitions import PartitionManager
+
+
+def _event(name: str, timestamp: datetime) -> dict:
+    return {
+        "event_type": "page_view",
+        "event_name": name,
+        "page_url": "https://example.com/",
+        "timestamp": timestamp,
+    }
+
+
+def test_partition_routing_and_retention():
+    """Test that events land in daily partitions and old days are dropped"""
+    print("🧪 Testing analytics partitions...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/partitions.db")
+        Base.metadata.create_all(bind=db_engine)
+        partitions = PartitionManager("day")
+
+        db = Session(bind=db_engine)
+        partitions.insert_events(db, [
+            _event("old", datetime(2026, 1, 1, 12)),
+            _event("recent", datetime(2026, 1, 3, 8)),
+            _event("recent", datetime(2026, 1, 3, 9)),
+        ])
+        db.commit()
+
+        tables = inspect(db_engine).get_table_names()
+        assert "analytics_events_p20260101" in tables
+        assert "analytics_events_p20260103" in tables
+
+        # Only the partitions overlapping the window are scanned
+        assert partitions.prune(db_engine, datetime(2026, 1, 2), datetime(2026, 1, 4)) == [
+            "analytics_events_p20260103"
+        ]
+        events = partitions.events_source(db, datetime(2026, 1, 2), datetime(2026, 1, 4))
+        rows = db.query(events).all()
+        assert [row.event_name for row in rows] == ["recent", "recent"]
+        # Ids stay unique across partitions
+        all_events = partitions.events_source(db)
+        assert len({row.id for row in db.query(all_events).all()}) == 3
+
+        dropped = partitions.drop_before(db.connection(), datetime(2026, 1, 2))
+        db.commit()
+        assert dropped == ["analytics_events_p20260101"]
+        assert db.query(partitions.events_source(db)).count() == 2
+
+        db.close()
+        db_engine.dispose()
+
+    print("✅ Partition routing and retention work")
+
+
+def test_partitions_changed_by_another_process():
+    """Test that reads see partitions created and dropped by another manager"""
+    print("🧪 Testing partition discovery across processes...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/shared.db")
+        Base.metadata.create_all(bind=db_engine)
+        reader, writer = PartitionManager("day"), PartitionManager("day")
+
+        db = Session(bind=db_engine)
+        writer.insert_events(db, [_event("old", datetime(2026, 1, 1, 12))])
+        db.commit()
+        assert db.query(reader.events_source(db)).count() == 1
+
+        # Another worker adds a day and maintenance drops the old one
+        writer.insert_events(db, [_event("new", datetime(2026, 1, 5, 12))])
+        writer.drop_before(db.connection(), datetime(2026, 1, 2))
+        db.commit()
+        assert [row.event_name for row in db.query(reader.events_source(db)).all()] == ["new"]
+
+        db.close()
+        db_engine.dispose()
+
+    print("✅ Partition changes from other processes are picked up")
+
+
+def test_next_period_and_concurrent_creation():
+    """Test month stepping from the end of a month and racing partition creation"""
+    print("🧪 Testing partition creation...")
+
+    months = PartitionManager("month")
+    assert months.next_period_start(datetime(2026, 1, 31, 23)) == datetime(2026, 2, 1)
+    assert months.next_period_start(datetime(2026, 12, 30)) == datetime(2027, 1, 1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/race.db")
+        Base.metadata.create_all(bind=db_engine)
+        first, second = PartitionManager("day"), PartitionManager("day")
+        with db_engine.begin() as conn:
+            first._discover(conn)
+            second._discover(conn)
+            # Both saw no partition; the second create must not fail
+            assert first.ensure_partition(conn, datetime(2026, 1, 1)) == second.ensure_partition(conn, datetime(2026, 1, 1))
+        db_engine.dispose()
+
+    print("✅ Partitions are created once per period")
+
+
+def test_rollback_and_stale_partitions():
+    """Test that a rolled-back or externally dropped partition is created again on the next write"""
+    print("🧪 Testing partition rollback...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/rollback.db")
+        Base.metadata.create_all(bind=db_engine)
+        partitions, maintenance = PartitionManager("month"), PartitionManager("month")
+
+        # The first write into a new period is rolled back, table and all
+        db = Session(bind=db_engine)
+        partitions.insert_events(db, [_event("lost", datetime(2026, 10, 5))])
+        db.rollback()
+        assert "analytics_events_p202610" not in inspect(db_engine).get_table_names()
+        assert partitions.partitions(db_engine) == {}
+
+        partitions.insert_events(db, [_event("kept", datetime(2026, 10, 6))])
+        db.commit()
+        assert [row.event_name for row in db.query(partitions.events_source(db)).all()] == ["kept"]
+
+        # Another process drops the cached partition; the next write re-reads and recreates it
+        partitions._discover(db_engine, refresh=True)
+        with db_engine.begin() as conn:
+            maintenance.drop_before(conn, datetime(2026, 11, 1))
+        partitions.insert_events(db, [_event("again", datetime(2026, 10, 7))])
+        db.commit()
+        assert [row.event_name for row in db.query(partitions.events_source(db)).all()] == ["again"]
+
+        db.close()
+        db_engine.dispose()
+
+    print("✅ Rolled-back and dropped partitions are recreated")
+
+
+if __name__ == "__main__":
+    test_partition_routing_and_retention()
+    test_partitions_changed_by_another_process()
+    test_next_period_and_concurrent_creation()
+    test_rollback_and_stale_partitions()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Broker Connection Test
+
+This script checks the reconnect circuit breaker and that publishing fails
+fast, without blocking, while the broker is unreachable.
+"""
+
+import sys
+import os
+import time
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.rabbitmq import CircuitBreaker, RabbitMQManager
+from app.core.spool import EventSpool
+
+
+def test_circuit_breaker_backoff():
+    """Test exponential backoff while open and reset on success"""
+    print("🧪 Testing circuit breaker...")
+
+    breaker = CircuitBreaker(min_delay=1.0, max_delay=4.0)
+    assert breaker.state == "closed" and breaker.allow()
+
+    delays = [breaker.record_failure() for _ in range(5)]
+    assert breaker.state == "open" and not breaker.allow()
+    assert 0.8 <= delays[0] <= 1.0
+    assert 1.6 <= delays[1] <= 2.0
+    assert all(delay <= 4.0 for delay in delays)
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+    print("✅ Circuit breaker works")
+
+
+def test_publish_fails_fast_when_broker_down():
+    """Test that construction never connects and publishes do not block"""
+    print("🧪 Testing fail-fast publishing...")
+
+    original_port = settings.RABBITMQ_PORT
+    settings.RABBITMQ_PORT = 1  # nothing listens here
+    manager = RabbitMQManager()
+    try:
+        assert manager.connection is None
+
+        start = time.perf_counter()
+        assert manager.publish_event({"event_name": "test"}) is False
+        assert time.perf_counter() - start < 0.1
+
+        assert manager.wait_until_connected(timeout=10) is False
+        assert manager.breaker.failures >= 1
+        assert manager.stats()["connected"] == 0
+
+        start = time.perf_counter()
+        assert manager.publish_batch([{"event_name": "a"}, {"event_name": "b"}]) == 0
+        assert time.perf_counter() - start < 0.1
+    finally:
+        manager.close()
+        settings.RABBITMQ_PORT = original_port
+
+    print("✅ Publishing fails fast while the broker is down")
+
+
+def test_publish_spools_when_broker_down():
+    """Test that events are spooled, not lost, while the broker is unreachable"""
+    print("🧪 Testing spooled publishing...")
+
+    original_port = settings.RABBITMQ_PORT
+    settings.RABBITMQ_PORT = 1
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manager = RabbitMQManager(EventSpool(temp_dir, fsync_interval=0.01))
+        try:
+            start = time.perf_counter()
+            assert manager.publish_event({"event_name": "test"}) is True
+            assert manager.publish_batch([{"event_name": "a"}, {"event_name": "b"}]) == 2
+            assert time.perf_counter() - start < 0.1
+            assert manager.spool.has_backlog()
+        finally:
+            manager.close()
+            settings.RABBITMQ_PORT = original_port
+
+        assert manager.spool.stats()["appended_total"] == 3
+        assert manager.spool.backlog_bytes() > 0
+
+    print("✅ Events are spooled while the broker is down")
+
+
+def test_locked_spool_falls_back():
+    """Test that publishing returns False, without raising, when another process holds the spool"""
+    print("🧪 Testing locked spool...")
+
+    original_port = settings.RABBITMQ_PORT
+    settings.RABBITMQ_PORT = 1
+    with tempfile.TemporaryDirectory() as temp_dir:
+        owner = EventSpool(temp_dir, fsync_interval=0.01)
+        owner.append("q", "owned")
+        manager = RabbitMQManager(EventSpool(temp_dir, fsync_interval=0.01))
+        try:
+            # track_event writes the event synchronously when this is False
+            assert manager.publish_event({"event_name": "test"}) is False
+        finally:
+            manager.close()
+            owner.close()
+            settings.RABBITMQ_PORT = original_port
+
+    print("✅ A locked spool falls back to the caller")
+
+
+if __name__ == "__main__":
+    test_circuit_breaker_backoff()
+    test_publish_fails_fast_when_broker_down()
+    test_publish_spools_when_broker_down()
+    test_locked_spool_falls_back()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Message Codec Test
+
+This script checks the JSON and msgpack broker codecs and that the consumer
+decodes messages by content_type, so mixed-version producers keep working.
+"""
+
+import sys
+import os
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.codecs import get_codec, codec_for_content_type, JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE
+from app.core.rabbitmq import InMemoryTransport
+from app.services.analytics_consumer import AnalyticsConsumer
+
+EVENT = {
+    "event_id": "4f1c",
+    "event_type": "product_view",
+    "event_name": "view_product",
+    "user_id": "42",
+    "session_id": None,
+    "properties": {"product_id": 7, "price": 19.99, "tags": ["a", "b"]},
+    "timestamp": datetime(2026, 3, 1, 12, 30, 15, 123456),
+}
+
+
+def test_codec_round_trip():
+    """Test that msgpack keeps timestamps as datetimes and is smaller than JSON"""
+    print("🧪 Testing message codecs...")
+
+    json_codec, msgpack_codec = get_codec("json"), get_codec("msgpack")
+    assert codec_for_content_type(None) is json_codec
+    assert codec_for_content_type(JSON_CONTENT_TYPE) is json_codec
+    assert codec_for_content_type(MSGPACK_CONTENT_TYPE) is msgpack_codec
+
+    assert json_codec.decode(json_codec.encode(EVENT))["timestamp"] == "2026-03-01 12:30:15.123456"
+    assert msgpack_codec.decode(msgpack_codec.encode(EVENT)) == EVENT
+    assert len(msgpack_codec.encode(EVENT)) < len(json_codec.encode(EVENT))
+
+    transport = InMemoryTransport(codec=msgpack_codec)
+    transport.publish_event(EVENT)
+    assert msgpack_codec.decode(transport.messages[0][1])["event_name"] == "view_product"
+
+    print("✅ Message codecs work")
+
+
+def test_consumer_decodes_by_content_type():
+    """Test that one consumer handles JSON, msgpack and legacy messages without a content_type"""
+    print("🧪 Testing mixed-version consumption...")
+
+    consumer = AnalyticsConsumer()
+    processed, acked = [], []
+    consumer._process_generic_event = processed.append
+    consumer._process_product_view_event = processed.append
+    channel = SimpleNamespace(basic_ack=lambda delivery_tag: acked.append(delivery_tag), basic_nack=None)
+
+    messages = [
+        (MSGPACK_CONTENT_TYPE, get_codec("msgpack").encode({**EVENT, "event_id": "m1"})),
+        (JSON_CONTENT_TYPE, get_codec("json").encode({**EVENT, "event_id": "j1"})),
+        (None, json.dumps({**EVENT, "event_id": "legacy"}, default=str).encode()),
+    ]
+    for tag, (content_type, body) in enumerate(messages):
+        consumer.process_analytics_event(
+            channel, SimpleNamespace(delivery_tag=tag), SimpleNamespace(content_type=content_type), body
+        )
+
+    assert acked == [0, 1, 2]
+    assert [event["event_id"] for event in processed] == ["m1", "j1", "legacy"]
+    assert processed[0]["timestamp"] == EVENT["timestamp"]
+
+    print("✅ Mixed-version messages are consumed")
+
+
+if __name__ == "__main__":
+    test_codec_round_trip()
+    test_consumer_decodes_by_content_type()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Database Engine Test
+
+This script checks the engine profile (SQLite pragmas and pool gauges),
+read-replica routing using two local SQLite files, the analytics index
+profile migration and per-request query instrumentation.
+"""
+
+import sys
+import os
+import tempfile
+from sqlalchemy import text, inspect, literal_column, select, Column, Integer, String
+from sqlalchemy.orm import declarative_base, Session
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import (
+    Base, create_db_engine, get_pool_stats, ReplicaSet, RoutingSession, read_only, on_primary
+)
+from app.core.migrations import sync_analytics_indexes
+from app.core.query_stats import QueryStatsMiddleware, current_query_stats
+from app.core.config import settings
+from app.models.analytics import AnalyticsEvent, INDEX_PROFILES
+
+RoutingBase = declarative_base()
+
+
+class Note(RoutingBase):
+    __tablename__ = "notes"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)
+
+
+def _make_node(path: str, source: str):
+    node = create_db_engine(f"sqlite:///{path}")
+    RoutingBase.metadata.create_all(bind=node)
+    with node.begin() as conn:
+        conn.execute(Note.__table__.insert(), [{"source": source}])
+    return node
+
+
+@read_only
+def _read_source(db) -> str:
+    return db.query(Note.source).first()[0]
+
+
+def _on_primary_source(db) -> str:
+    with on_primary():
+        return db.query(Note.source).first()[0]
+
+
+def test_sqlite_pragmas():
+    """Test that new SQLite connections get the write-optimized pragmas"""
+    print("🧪 Testing SQLite pragmas...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/pragmas.db")
+        with db_engine.connect() as conn:
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+            synchronous = conn.execute(text("PRAGMA synchronous")).scalar()
+            busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+
+        assert journal_mode.lower() == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout > 0
+        db_engine.dispose()
+
+    print("✅ SQLite pragmas applied")
+
+
+def test_pool_stats():
+    """Test pool checkout and in-use gauges"""
+    print("🧪 Testing pool gauges...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/pool.db")
+        conn = db_engine.connect()
+        stats = get_pool_stats(db_engine)
+        assert stats["in_use"] == 1
+        assert stats["checkouts"] == 1
+
+        conn.close()
+        stats = get_pool_stats(db_engine)
+        assert stats["in_use"] == 0
+        assert stats["checkout_wait_max_ms"] >= 0
+        db_engine.dispose()
+
+    # In-memory databases fall back to the default pool
+    memory_engine = create_db_engine("sqlite://")
+    assert "pool" in get_pool_stats(memory_engine)
+
+    print("✅ Pool gauges reported")
+
+
+def test_replica_routing():
+    """Test round-robin reads, pinning after writes and replica ejection"""
+    print("🧪 Testing read-replica routing...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        primary = _make_node(f"{tmp_dir}/primary.db", "primary")
+        replica = _make_node(f"{tmp_dir}/replica.db", "replica")
+        replicas = ReplicaSet([replica], eject_seconds=60)
+
+        db = RoutingSession(bind=primary, replicas=replicas)
+        assert _read_source(db) == "replica"
+        # Outside a read-only scope reads stay on the primary
+        assert db.query(Note.source).first()[0] == "primary"
+
+        # After a write the session is pinned to the primary
+        db.add(Note(source="written"))
+        db.commit()
+        assert db.pinned_to_primary
+        assert _read_source(db) == "primary"
+        db.close()
+
+        # A replica that cannot connect is ejected and the failed read is retried on the primary
+        broken = create_db_engine(f"sqlite:///{tmp_dir}/missing/replica.db")
+        replicas = ReplicaSet([broken], eject_seconds=60)
+        db = RoutingSession(bind=primary, replicas=replicas)
+        assert _read_source(db) == "primary"
+        assert replicas.healthy() == []
+        assert _read_source(db) == "primary"
+        db.close()
+
+        # Errors that do not eject the replica still reach the caller
+        replicas = ReplicaSet([replica], eject_seconds=60)
+        db = RoutingSession(bind=primary, replicas=replicas)
+        try:
+            read_only(lambda: db.execute(select(literal_column("missing")).select_from(Note)).all())()
+            assert False, "query error swallowed"
+        except Exception:
+            db.rollback()
+        assert replicas.healthy() == [replica] and not db.pinned_to_primary
+        assert _read_source(db) == "replica"
+
+        # Auth lookups skip the replicas even inside a read-only scope
+        assert read_only(lambda: _on_primary_source(db))() == "primary"
+        db.close()
+
+        for node in (primary, replica, broken):
+            node.dispose()
+
+    print("✅ Replica routing works")
+
+
+def test_index_profile_migration():
+    """Test switching analytics_events between index profiles"""
+    print("🧪 Testing index profile migration...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/indexes.db")
+        Base.metadata.create_all(bind=db_engine, tables=[AnalyticsEvent.__table__])
+
+        for profile in ("ingest", "full", "minimal"):
+            with db_engine.begin() as conn:
+                sync_analytics_indexes(conn, profile)
+            names = {index["name"] for index in inspect(db_engine).get_indexes("analytics_events")}
+            assert names == set(INDEX_PROFILES[profile]), profile
+
+        # Applying the same profile twice is a no-op
+        with db_engine.begin() as conn:
+            changes = sync_analytics_indexes(conn, "minimal")
+        assert changes["analytics_events"] == {"created": [], "dropped": []}
+        db_engine.dispose()
+
+    print("✅ Index profiles applied")
+
+
+def test_query_stats():
+    """Test per-request query counts, debug headers, N+1 detection and failed statements"""
+    print("🧪 Testing query instrumentation...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        node = _make_node(f"{tmp_dir}/queries.db", "primary")
+        app = FastAPI()
+        seen = {}
+
+        @app.get("/notes")
+        def list_notes():
+            db = Session(bind=node)
+            # One lookup per id, the shape of a lazy relationship loop
+            for note_id in range(settings.DB_N_PLUS_ONE_THRESHOLD):
+                db.query(Note).filter(Note.id == note_id).first()
+            db.close()
+            seen["stats"] = current_query_stats()
+            return {"ok": True}
+
+        app.add_middleware(QueryStatsMiddleware)
+        response = TestClient(app).get("/notes")
+
+        stats = seen["stats"]
+        assert stats.count == settings.DB_N_PLUS_ONE_THRESHOLD
+        assert len(stats.n_plus_one) == 1
+        if settings.DEBUG:
+            assert response.headers["x-db-query-count"] == str(stats.count)
+            assert float(response.headers["x-db-query-time"]) >= 0
+        # Outside a request nothing is attributed
+        assert current_query_stats() is None
+
+        # A failed statement does not leave its start time on the connection
+        with node.connect() as conn:
+            try:
+                conn.execute(text("SELECT * FROM missing_table"))
+            except Exception:
+                pass
+            assert not conn.info.get("query_start_time")
+        node.dispose()
+
+    print("✅ Query instrumentation works")
+
+
+if __name__ == "__main__":
+    test_sqlite_pragmas()
+    test_pool_stats()
+    test_replica_routing()
+    test_index_profile_migration()
+    test_query_stats()
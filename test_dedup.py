@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Event Deduplication Test
+
+This script checks the windowed Bloom filter deduplicator and that retried
+events with the same client event_id are stored only once.
+"""
+
+import sys
+import os
+import uuid
+import tempfile
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.core.dedup import EventDeduplicator, event_deduplicator
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES
+from app.schemas.analytics import AnalyticsEventCreate
+from app.services.analytics_service import AnalyticsService
+
+
+def test_deduplicator_window():
+    """Test duplicate detection, the false-positive bound and window rotation"""
+    print("🧪 Testing deduplicator...")
+
+    dedup = EventDeduplicator(window_seconds=3600, capacity=10000, false_positive_rate=0.01)
+    ids = [str(uuid.uuid4()) for _ in range(5000)]
+    for event_id in ids:
+        dedup.add(event_id)
+    assert all(dedup.seen(event_id) for event_id in ids)
+
+    false_positives = sum(dedup.seen(str(uuid.uuid4())) for _ in range(5000))
+    assert false_positives / 5000 < 0.02
+    assert 0 < dedup.false_positive_rate() < 0.01
+
+    stats = dedup.stats()
+    assert stats["checked_total"] == 10000
+    assert stats["duplicates_total"] == 5000 + false_positives
+    assert stats["window_ids"] == 5000
+
+    # IDs survive one rotation and are forgotten after the second
+    dedup.window_seconds = 0
+    dedup.seen("rotate")
+    assert dedup._previous.contains(ids[0])
+    dedup.seen("rotate")
+    assert not dedup.seen(ids[0])
+
+    print("✅ Deduplicator works")
+
+
+def test_track_drops_duplicates():
+    """Test that track_event and track_batch store each event_id once"""
+    print("🧪 Testing duplicate event ingestion...")
+
+    original_enabled = settings.ANALYTICS_ENABLED
+    settings.ANALYTICS_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/dedup.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            event = AnalyticsEventCreate(event_id=str(uuid.uuid4()), event_type="click", event_name="buy")
+            assert service.track_event(event)
+            assert service.track_event(event)
+
+            retried = AnalyticsEventCreate(event_id=str(uuid.uuid4()), event_type="click", event_name="retry")
+            batch = [retried, retried, event, AnalyticsEventCreate(event_type="click", event_name="no_id")]
+            assert service.track_batch(batch) == 4
+
+            stored = db.query(AnalyticsEvent.event_name, AnalyticsEvent.event_id).all()
+            assert sorted(name for name, _ in stored) == ["buy", "no_id", "retry"]
+            assert event_deduplicator.stats()["duplicates_total"] >= 2
+        finally:
+            db.close()
+            db_engine.dispose()
+            settings.ANALYTICS_ENABLED = original_enabled
+
+    print("✅ Duplicate events are stored once")
+
+
+if __name__ == "__main__":
+    test_deduplicator_window()
+    test_track_drops_duplicates()
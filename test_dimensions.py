@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Event Dimension Tables Test
+
+This script checks that event_name, page_url, referrer and user_agent are
+stored once in their dimension tables, that reads still see the strings, that
+rolled-back ids never reach the cache and that the migration encodes an
+existing text-column table.
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.core.migrations import run_migrations
+from app.models.analytics import AnalyticsEvent, PageUrlDimension, ANALYTICS_TABLES
+from app.schemas.analytics import AnalyticsEventCreate, AnalyticsQuery
+from app.services.analytics_dimensions import DimensionEncoder
+from app.services.analytics_service import AnalyticsService
+
+
+def test_encode_and_cache():
+    """Test batch get-or-create, cache hits and rollback safety"""
+    print("🧪 Testing dimension encoding...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/dimensions.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        encoder = DimensionEncoder(cache_size=2)
+        db = Session(bind=db_engine)
+        try:
+            rows = encoder.encode(db, [
+                {"event_name": "home", "page_url": "/a"},
+                {"event_name": "home", "page_url": "/b", "referrer": None},
+            ])
+            assert rows[0]["event_name_id"] == rows[1]["event_name_id"]
+            assert rows[0]["page_url_id"] != rows[1]["page_url_id"]
+            assert "event_name" not in rows[0] and "referrer_id" not in rows[1]
+
+            # Nothing is shared until the transaction commits
+            db.rollback()
+            assert encoder.stats()["entries"] == 0
+            assert db.query(PageUrlDimension).count() == 0
+
+            ids = encoder.encode(db, [{"event_name": "home", "page_url": "/a"}])[0]
+            encoder.commit(db)
+            db.commit()
+            assert encoder.encode(db, [{"event_name": "home", "page_url": "/a"}])[0] == ids
+            stats = encoder.stats()
+            assert stats["hits_total"] == 2 and stats["misses_total"] == 5
+            assert stats["entries"] == 2 and stats["memory_bytes"] > 0
+
+            # Get-or-create is idempotent on the digest
+            assert encoder.get_or_create(db.connection(), "page_url", ["/a", "/c"])["/a"] == ids["page_url_id"]
+            assert db.query(PageUrlDimension).count() == 2
+        finally:
+            db.close()
+            db_engine.dispose()
+
+    print("✅ Dimension encoding works")
+
+
+def test_tracked_events_read_back():
+    """Test that tracked events decode transparently and top pages group on ids"""
+    print("🧪 Testing dimension reads...")
+
+    original_enabled = settings.ANALYTICS_ENABLED
+    settings.ANALYTICS_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/dimension_reads.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            events = [
+                AnalyticsEventCreate(event_type="page_view", event_name="home", page_url="/home"),
+                AnalyticsEventCreate(event_type="page_view", event_name="home", page_url="/home"),
+                AnalyticsEventCreate(event_type="page_view", event_name="product", page_url="/p/1", referrer="/home"),
+            ]
+            assert service.track_batch(events) == 3
+            assert service.track_event(AnalyticsEventCreate(event_type="click", event_name="buy"))
+
+            stored = db.query(
+                AnalyticsEvent.event_name, AnalyticsEvent.page_url, AnalyticsEvent.referrer
+            ).select_from(AnalyticsEvent).order_by(AnalyticsEvent.id).all()
+            assert stored == [("home", "/home", None), ("home", "/home", None), ("product", "/p/1", "/home"), ("buy", None, None)]
+            assert db.query(PageUrlDimension).count() == 2
+            assert db.query(AnalyticsEvent).filter(AnalyticsEvent.event_name == "home").count() == 2
+
+            summary = service.get_analytics_summary()
+            assert summary.top_pages == {"/home": 2, "/p/1": 1}
+
+            # The list endpoints join the dimensions in one statement, without a subquery per row
+            db.expunge_all()
+            statements = []
+            event.listen(db_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+            listed = service.get_events(AnalyticsQuery(event_type="page_view"))
+            assert sorted((row.event_name, row.page_url, row.referrer) for row in listed) == [
+                ("home", "/home", None), ("home", "/home", None), ("product", "/p/1", "/home")
+            ]
+            assert len(statements) == 1 and "(SELECT" not in statements[0]
+        finally:
+            db.close()
+            db_engine.dispose()
+            settings.ANALYTICS_ENABLED = original_enabled
+
+    print("✅ Dimension values read back transparently")
+
+
+def test_migrate_text_columns():
+    """Test that the migration moves existing text columns into dimensions"""
+    print("🧪 Testing dimension migration...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/legacy.db")
+        with db_engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE analytics_events (id INTEGER PRIMARY KEY, event_type VARCHAR NOT NULL, "
+                "event_name VARCHAR NOT NULL, user_id VARCHAR, session_id VARCHAR, page_url VARCHAR, "
+                "referrer VARCHAR, user_agent TEXT, ip_address VARCHAR, properties JSON, "
+                "timestamp DATETIME, created_at DATETIME)"
+            ))
+            conn.execute(text("CREATE INDEX ix_analytics_events_event_name ON analytics_events (event_name)"))
+            conn.execute(
+                text("INSERT INTO analytics_events (event_type, event_name, page_url, user_agent, timestamp) "
+                     "VALUES ('page_view', :name, :url, :agent, :timestamp)"),
+                [
+                    {"name": "home", "url": "/home", "agent": "curl/8.0", "timestamp": datetime(2026, 1, 1)},
+                    {"name": "home", "url": None, "agent": "curl/8.0", "timestamp": datetime(2026, 1, 2)},
+                ]
+            )
+
+        run_migrations(db_engine)
+        # A second run finds nothing left to encode
+        run_migrations(db_engine)
+
+        columns = {column["name"] for column in inspect(db_engine).get_columns("analytics_events")}
+        assert {"event_name_id", "page_url_id", "referrer_id", "user_agent_id"} <= columns
+        assert not {"event_name", "page_url", "referrer", "user_agent"} & columns
+
+        db = Session(bind=db_engine)
+        try:
+            stored = db.query(
+                AnalyticsEvent.event_name, AnalyticsEvent.page_url, AnalyticsEvent.user_agent
+            ).select_from(AnalyticsEvent).order_by(AnalyticsEvent.id).all()
+            assert stored == [("home", "/home", "curl/8.0"), ("home", None, "curl/8.0")]
+            assert db.execute(text("SELECT COUNT(*) FROM analytics_user_agents")).scalar() == 1
+        finally:
+            db.close()
+            db_engine.dispose()
+
+    print("✅ Text columns migrate into dimension tables")
+
+
+if __name__ == "__main__":
+    test_encode_and_cache()
+    test_tracked_events_read_back()
+    test_migrate_text_columns()
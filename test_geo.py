@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Geo Enrichment Test
+
+This script checks compiling an IP range CSV into the memory-mapped table,
+range lookups at the boundaries, the per-process cache and that tracked
+events store country and region.
+"""
+
+import sys
+import os
+import tempfile
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES
+from app.schemas.analytics import AnalyticsEventCreate
+from app.services import analytics_service as analytics_service_module
+from app.services.analytics_geo import GeoResolver, build_geo_table
+from app.services.analytics_service import AnalyticsService
+
+RANGES = """# start,end,country,region
+10.0.0.0,10.0.0.255,us,California
+1.0.0.0,1.0.0.255,AU,Queensland
+167772416,167772671,US,Texas
+10.0.2.0,10.0.2.255,DE,
+"""
+
+
+def build_table(tmp_dir: str) -> str:
+    csv_path = os.path.join(tmp_dir, "ranges.csv")
+    with open(csv_path, "w") as handle:
+        handle.write(RANGES)
+    table_path = os.path.join(tmp_dir, "ranges.bin")
+    assert build_geo_table(csv_path, table_path) == 4
+    return table_path
+
+
+def test_geo_lookup():
+    """Test boundary lookups, gaps, unsupported addresses and the cache"""
+    print("🧪 Testing geo lookups...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        resolver = GeoResolver(build_table(tmp_dir), cache_size=16)
+        try:
+            assert resolver.lookup("10.0.0.0") == {"country": "US", "region": "California"}
+            assert resolver.lookup("10.0.0.255") == {"country": "US", "region": "California"}
+            assert resolver.lookup("10.0.1.7") == {"country": "US", "region": "Texas"}
+            assert resolver.lookup("::ffff:10.0.2.9") == {"country": "DE", "region": None}
+            assert resolver.lookup("1.0.0.1")["country"] == "AU"
+
+            # Gaps, addresses below the first range, IPv6 and junk resolve to nothing
+            for address in ("10.0.3.0", "0.0.0.1", "2001:db8::1", "testclient", None):
+                assert resolver.lookup(address) == {"country": None, "region": None}, address
+
+            resolver.lookup("10.0.0.0")
+            stats = resolver.stats()
+            assert stats["ranges"] == 4
+            assert stats["hits_total"] == 1 and stats["misses_total"] == 7
+        finally:
+            resolver.close()
+
+        missing = GeoResolver(os.path.join(tmp_dir, "missing.bin"))
+        assert missing.lookup("10.0.0.1") == {"country": None, "region": None}
+        assert missing.stats()["ranges"] == 0
+
+    print("✅ Geo lookups work")
+
+
+def test_track_stores_geo_fields():
+    """Test that tracked events carry country and region"""
+    print("🧪 Testing geo enrichment...")
+
+    original_enabled = settings.ANALYTICS_ENABLED
+    original_resolver = analytics_service_module.geo_resolver
+    settings.ANALYTICS_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        analytics_service_module.geo_resolver = GeoResolver(build_table(tmp_dir))
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/geo.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            event = AnalyticsEventCreate(event_type="page_view", event_name="home")
+            assert service.track_event(event, {"ip_address": "1.0.0.9"})
+            assert service.track_event(event, {"ip_address": "192.168.1.1"})
+
+            stored = db.query(AnalyticsEvent.country, AnalyticsEvent.region).order_by(AnalyticsEvent.id).all()
+            assert stored == [("AU", "Queensland"), (None, None)]
+        finally:
+            db.close()
+            db_engine.dispose()
+            analytics_service_module.geo_resolver.close()
+            analytics_service_module.geo_resolver = original_resolver
+            settings.ANALYTICS_ENABLED = original_enabled
+
+    print("✅ Country and region are stored")
+
+
+if __name__ == "__main__":
+    test_geo_lookup()
+    test_track_stores_geo_fields()
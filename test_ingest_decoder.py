@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Ingestion Decoder Test
+
+This script checks that batch and beacon bodies are validated straight from
+bytes into event dicts, and that the service stores decoded dicts exactly like
+request models.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES
+from app.schemas.analytics import AnalyticsEventCreate
+from app.services.analytics_ingest import decode_batch, decode_beacon, decode_beacon_form
+from app.services.analytics_service import AnalyticsService
+
+
+def test_decode_bodies():
+    """Test batch validation, beacon defaults and rejected bodies"""
+    print("🧪 Testing ingestion decoder...")
+
+    events = decode_batch(json.dumps({"events": [
+        {"event_type": "click", "event_name": "buy", "properties": {"sku": "A1"}, "unknown": 1},
+        {"event_type": "page_view", "event_name": "home", "session_id": None},
+    ]}).encode())
+    assert events == [
+        {"event_type": "click", "event_name": "buy", "properties": {"sku": "A1"}},
+        {"event_type": "page_view", "event_name": "home", "session_id": None},
+    ]
+
+    for body in (b'{"events": [{"event_type": "click"}]}', b'{"events": [', b'{"events": [{"event_type": "a", "event_name": "b", "event_id": "' + b"x" * 129 + b'"}]}'):
+        try:
+            decode_batch(body)
+            assert False, body
+        except ValidationError:
+            pass
+
+    beacon = decode_beacon(b'{"event_id": "e1", "properties": {"time_on_page": 12}}')
+    assert beacon == {
+        "event_id": "e1",
+        "event_type": "beacon",
+        "event_name": "page_unload",
+        "properties": {"beacon": True, "page_unload": True, "time_on_page": 12},
+    }
+    assert decode_beacon_form({"event_name": "exit", "session_id": "s1"})["session_id"] == "s1"
+
+    print("✅ Ingestion decoder works")
+
+
+def test_track_decoded_events():
+    """Test that decoded dicts and models enrich and store identically"""
+    print("🧪 Testing decoded event tracking...")
+
+    original_enabled = settings.ANALYTICS_ENABLED
+    settings.ANALYTICS_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/ingest.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            decoded = decode_batch(b'{"events": [{"event_type": "click", "event_name": "buy", "session_id": "s1"}]}')[0]
+            model = AnalyticsEventCreate(event_type="click", event_name="buy", session_id="s1")
+
+            strip = lambda event: {key: value for key, value in event.items() if key != "timestamp"}
+            assert strip(service._enrich_event_data(decoded)) == strip(service._enrich_event_data(model.model_dump()))
+
+            assert service.track_batch([decoded, model]) == 2
+            assert service.track_event(decode_beacon(b'{"session_id": "s2"}'))
+
+            stored = db.query(AnalyticsEvent.event_name, AnalyticsEvent.session_id).order_by(AnalyticsEvent.id).all()
+            assert stored == [("buy", "s1"), ("buy", "s1"), ("page_unload", "s2")]
+        finally:
+            db.close()
+            db_engine.dispose()
+            settings.ANALYTICS_ENABLED = original_enabled
+
+    print("✅ Decoded events are tracked")
+
+
+if __name__ == "__main__":
+    test_decode_bodies()
+    test_track_decoded_events()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Memory Tracking Test
+
+This script checks that tracemalloc snapshots are diffed against the
+baseline, that per-type object growth is reported and that requested
+reports run on the snapshot thread.
+"""
+
+import sys
+import os
+import time
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.memory import MemoryTracker
+
+
+class LeakyRecord:
+    def __init__(self, index: int):
+        self.payload = "x" * 256 + str(index)
+
+
+def test_memory_growth_report():
+    """Test that allocations after the baseline show up in the report"""
+    print("🧪 Testing memory growth report...")
+
+    tracker = MemoryTracker(frames=5, keep=2)
+    tracker.start()
+    try:
+        leaked = [LeakyRecord(index) for index in range(5000)]
+        report = tracker.report(top=10)
+
+        assert report["traced_bytes"] > 0
+        assert report["top_sites"][0]["size_diff_kb"] > 0
+        assert any(os.path.basename(__file__) in site["location"] for site in report["top_sites"])
+        growth = {entry["type"]: entry["count_diff"] for entry in report["type_growth"]}
+        assert growth.get("LeakyRecord", 0) >= 5000
+
+        # Snapshots are kept in a bounded ring
+        tracker.report()
+        tracker.report()
+        assert len(tracker.snapshot_times()) == 2
+        del leaked
+    finally:
+        tracker.stop()
+
+    assert not tracker.tracing
+    print("✅ Memory growth report works")
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_requested_reports():
+    """Test that request_report() leaves tracking and snapshots to the background thread"""
+    print("🧪 Testing requested memory reports...")
+
+    tracker = MemoryTracker(frames=5, keep=2)
+    tracker.start_periodic(0)
+    try:
+        # Only requests wake the thread: the first starts tracking, the next snapshots
+        assert not tracker.tracing
+        tracker.request_report()
+        assert _wait_for(lambda: tracker.tracing)
+        tracker.request_report()
+        assert _wait_for(lambda: len(tracker.snapshot_times()) == 1)
+    finally:
+        tracker.stop()
+
+    assert tracker._thread is None and not tracker.tracing
+    print("✅ Requested memory reports work")
+
+
+if __name__ == "__main__":
+    test_memory_growth_report()
+    test_requested_reports()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Metrics Test
+
+This script checks the metrics registry's Prometheus text output and the
+request metrics middleware's route-template labelling.
+"""
+
+import sys
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.metrics import (
+    MetricsRegistry, MetricsMiddleware, http_request_duration, http_response_size
+)
+
+
+def test_prometheus_rendering():
+    """Test counters, histograms and callbacks in the text format"""
+    print("🧪 Testing Prometheus rendering...")
+
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs processed", ("result",))
+    counter.inc(result="ok")
+    counter.inc(2, result="ok")
+    histogram = registry.histogram("job_seconds", "Job latency", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    registry.register_callback("queue", "Queue stats", lambda: {"depth": 7, "name": "ignored"})
+
+    text = registry.render()
+    assert '# TYPE jobs_total counter' in text
+    assert 'jobs_total{result="ok"} 3' in text
+    assert 'job_seconds_bucket{le="0.1"} 1' in text
+    assert 'job_seconds_bucket{le="1"} 2' in text
+    assert 'job_seconds_bucket{le="+Inf"} 3' in text
+    assert 'job_seconds_count 3' in text
+    assert 'queue_depth 7' in text
+    assert 'queue_name' not in text
+
+    print("✅ Prometheus rendering works")
+
+
+def test_middleware_route_templates():
+    """Test that requests are labelled by route template, not raw path"""
+    print("🧪 Testing metrics middleware...")
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"item_id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+
+    before = http_request_duration.count(method="GET", route="/items/{item_id}", status=200)
+    for item_id in range(3):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    assert client.get("/missing").status_code == 404
+
+    assert http_request_duration.count(method="GET", route="/items/{item_id}", status=200) == before + 3
+    assert http_request_duration.count(method="GET", route="unmatched", status=404) >= 1
+    assert http_response_size.count(method="GET", route="/items/{item_id}") >= 3
+
+    print("✅ Metrics middleware works")
+
+
+if __name__ == "__main__":
+    test_prometheus_rendering()
+    test_middleware_route_templates()
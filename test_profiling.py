@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Request Profiling Test
+
+This script checks the stack sampler's collapsed output and that the
+profiling middleware only profiles requests flagged by an admin user, one
+at a time.
+"""
+
+import sys
+import os
+import time
+import asyncio
+import tempfile
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app.core.database as database
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.core.profiling import ProfilingMiddleware, StackSampler, read_profile
+from app.models.user import User
+from app.services.auth_service import AuthService
+
+
+def _busy_wait(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_stack_sampler():
+    """Test that sampling produces flamegraph-ready collapsed stacks"""
+    print("🧪 Testing stack sampler...")
+
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    _busy_wait(0.1)
+    sampler.stop()
+
+    assert sampler.sample_count > 0
+    lines = sampler.collapsed().splitlines()
+    assert any("_busy_wait" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+    print("✅ Stack sampler works")
+
+
+def test_admin_request_profiling():
+    """Test that only admin-flagged requests are profiled"""
+    print("🧪 Testing request profiling middleware...")
+
+    original_session, original_dir = database.SessionLocal, settings.PROFILING_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/profiling.db")
+        Base.metadata.create_all(bind=db_engine, tables=[User.__table__])
+        database.SessionLocal = sessionmaker(bind=db_engine)
+        settings.PROFILING_DIR = os.path.join(tmp_dir, "profiles")
+
+        try:
+            db = database.SessionLocal()
+            db.add_all([
+                User(email="admin@example.com", username="admin", hashed_password="x", is_admin=True),
+                User(email="user@example.com", username="user", hashed_password="x", is_admin=False),
+            ])
+            db.commit()
+            auth_service = AuthService(db)
+            admin_token = auth_service.create_access_token({"sub": "admin@example.com"})
+            user_token = auth_service.create_access_token({"sub": "user@example.com"})
+            db.close()
+
+            app = FastAPI()
+
+            @app.get("/slow")
+            async def slow():
+                _busy_wait(0.02)
+                return {"ok": True}
+
+            app.add_middleware(ProfilingMiddleware)
+            client = TestClient(app)
+
+            # No flag, or a non-admin flag: no profile
+            assert "x-profile-id" not in client.get("/slow").headers
+            response = client.get("/slow", headers={"X-Profile": "1", "Authorization": f"Bearer {user_token}"})
+            assert "x-profile-id" not in response.headers
+
+            response = client.get("/slow", headers={"X-Profile": "cprofile", "Authorization": f"Bearer {admin_token}"})
+            assert response.json() == {"ok": True}
+            report = read_profile(response.headers["x-profile-id"])
+            assert "_busy_wait" in report
+
+            response = client.get("/slow?profile=sample", headers={"Authorization": f"Bearer {admin_token}"})
+            assert response.headers["x-profile-id"].endswith(".collapsed")
+
+            # One profile at a time; unflagged requests are never held up
+            middleware = ProfilingMiddleware(app.router)
+            asyncio.run(middleware._lock.acquire())
+            busy_client = TestClient(middleware)
+            response = busy_client.get("/slow", headers={"X-Profile": "1", "Authorization": f"Bearer {admin_token}"})
+            assert response.status_code == 409
+            assert busy_client.get("/slow").json() == {"ok": True}
+            middleware._lock.release()
+            db_engine.dispose()
+        finally:
+            database.SessionLocal, settings.PROFILING_DIR = original_session, original_dir
+
+    print("✅ Request profiling works")
+
+
+if __name__ == "__main__":
+    test_stack_sampler()
+    test_admin_request_profiling()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Event Sampling Test
+
+This script checks per-event-type sampling and drop rules and that stored
+sample rates re-weight the analytics summary.
+"""
+
+import sys
+import os
+import tempfile
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES
+from app.services import analytics_service as analytics_service_module
+from app.services.analytics_sampling import SamplingRules
+from app.services.analytics_service import AnalyticsService
+
+
+def event(event_type: str, event_name: str, session_id: str = None) -> dict:
+    return {"event_type": event_type, "event_name": event_name, "session_id": session_id}
+
+
+def test_sampling_rules():
+    """Test rule precedence, drop lists and session-consistent decisions"""
+    print("🧪 Testing sampling rules...")
+
+    rules = SamplingRules(
+        rules=[
+            {"event_type": "page_view", "rate": 0.25},
+            {"event_type": "page_view", "event_name": "checkout_page", "rate": 1},
+        ],
+        drop=["beacon:page_unload", "debug"]
+    )
+
+    assert rules.rate_for("page_view", "home") == 0.25
+    assert rules.rate_for("page_view", "checkout_page") == 1.0
+    assert rules.rate_for("beacon", "page_unload") == 0.0
+    assert rules.rate_for("beacon", "page_load") == 1.0
+    assert rules.rate_for("debug", "anything") == 0.0
+
+    assert rules.sample_rate(event("beacon", "page_unload", "s1")) is None
+    assert rules.sample_rate(event("purchase", "order", "s1")) == 1.0
+
+    # Decisions are deterministic per session and close to the configured rate
+    sessions = [f"session-{index}" for index in range(4000)]
+    kept = [session for session in sessions if rules.sample_rate(event("page_view", "home", session))]
+    assert 0.2 < len(kept) / len(sessions) < 0.3
+    assert all(rules.sample_rate(event("page_view", "other", session)) == 0.25 for session in kept)
+
+    try:
+        SamplingRules(rules=[{"event_type": "click", "rate": 2}])
+        assert False, "rates above 1 must be rejected"
+    except ValueError:
+        pass
+
+    print("✅ Sampling rules work")
+
+
+def test_sampled_events_are_reweighted():
+    """Test that only sampled events are stored and the summary scales them back up"""
+    print("🧪 Testing re-weighted summary...")
+
+    original_enabled = settings.ANALYTICS_ENABLED
+    original_rules = analytics_service_module.analytics_sampling
+    settings.ANALYTICS_ENABLED = False
+    analytics_service_module.analytics_sampling = SamplingRules(
+        rules=[{"event_type": "page_view", "rate": 0.5}], drop=["beacon"]
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/sampling.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            batch = [event("page_view", "home", f"session-{index}") for index in range(400)]
+            batch += [event("purchase", "order", "session-0"), event("beacon", "page_unload", "session-0")]
+            assert service.track_batch(batch) == len(batch)
+
+            stored = db.query(AnalyticsEvent.event_type, AnalyticsEvent.sample_rate).all()
+            page_views = [rate for event_type, rate in stored if event_type == "page_view"]
+            assert 150 < len(page_views) < 250
+            assert set(page_views) == {0.5}
+            assert ("purchase", 1.0) in stored
+            assert all(event_type != "beacon" for event_type, _ in stored)
+
+            summary = service.get_analytics_summary(days=1)
+            assert summary.event_types["page_view"] == len(page_views) * 2
+            assert summary.event_types["purchase"] == 1
+            assert summary.total_events == len(page_views) * 2 + 1
+        finally:
+            db.close()
+            db_engine.dispose()
+            settings.ANALYTICS_ENABLED = original_enabled
+            analytics_service_module.analytics_sampling = original_rules
+
+    print("✅ Sampled events are re-weighted")
+
+
+if __name__ == "__main__":
+    test_sampling_rules()
+    test_sampled_events_are_reweighted()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Sessionization Test
+
+This script checks that the consumer stitches events into sessions by user,
+client session, user or IP and user agent with an inactivity timeout, that open
+state stays bounded, and that closed sessions are stored as summaries.
+"""
+
+import sys
+import os
+import json
+import tempfile
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session, sessionmaker
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.models.analytics import AnalyticsEvent, AnalyticsSession, ANALYTICS_TABLES
+from app.services import analytics_consumer as analytics_consumer_module
+from app.services import analytics_service as analytics_service_module
+from app.services.analytics_consumer import AnalyticsConsumer
+from app.services.analytics_service import AnalyticsService
+from app.services.analytics_sessions import Sessionizer
+
+START = datetime(2026, 3, 1, 12)
+CLIENT = {"ip_address": "10.0.0.1", "user_agent": "Mozilla/5.0 (X11; Linux x86_64)"}
+
+
+def event(event_type: str, minutes: int, **fields) -> dict:
+    return {"event_type": event_type, "event_name": event_type, "timestamp": START + timedelta(minutes=minutes), **fields}
+
+
+def test_stitch_sessions():
+    """Test stitching without session IDs, the inactivity timeout, expiry and the active-session bound"""
+    print("🧪 Testing sessionization...")
+
+    sessionizer = Sessionizer(timeout_seconds=1800, max_active=2)
+
+    # Anonymous events from one client share a session until 30 idle minutes pass
+    first = [event("page_view", minute, **CLIENT) for minute in (0, 10, 25)]
+    for event_data in first:
+        sessionizer.observe(event_data)
+    assert len({event_data["session_id"] for event_data in first}) == 1
+    later = event("page_view", 60, **CLIENT)
+    sessionizer.observe(later)
+    assert later["session_id"] != first[0]["session_id"]
+
+    assert sessionizer.observe(event("click", 30, session_id="client-1")) == "client-1"
+
+    # Logging in keeps the client's session, which now belongs to the user
+    assert sessionizer.observe(event("page_view", 62, user_id="42", **CLIENT)) == later["session_id"]
+    assert sessionizer.observe(event("purchase", 64, user_id="42")) == later["session_id"]
+
+    # A third open session closes the least recently active one
+    sessionizer.observe(event("page_view", 65, user_id="7"))
+    assert sessionizer.stats()["evicted_total"] == 1
+
+    # Events with nothing to key on pass through untouched
+    assert sessionizer.observe(event("click", 0)) is None
+
+    # Idle time is measured against the newest event seen, not the wall clock
+    assert sessionizer.expire() == 0
+    sessionizer.observe(event("click", 95, user_id="7"))
+    assert sessionizer.expire() == 1
+    assert sessionizer.close_all() == 1
+    summaries = {summary["session_id"]: summary for summary in sessionizer.drain()}
+    assert len(summaries) == 4 and sessionizer.stats()["active"] == 0
+
+    anonymous = summaries[first[0]["session_id"]]
+    assert anonymous["duration_seconds"] == 25 * 60
+    assert (anonymous["page_count"], anonymous["event_count"], anonymous["converted"]) == (3, 3, False)
+    user = summaries[later["session_id"]]
+    assert (user["user_id"], user["page_count"], user["event_count"], user["converted"]) == ("42", 2, 3, True)
+    assert user["ended_at"] == START + timedelta(minutes=64)
+
+    print("✅ Events are stitched into sessions")
+
+
+def test_client_session_ids():
+    """Test that client session IDs win over users so logins and tabs keep their sessions"""
+    print("🧪 Testing client session IDs...")
+
+    sessionizer = Sessionizer(timeout_seconds=1800)
+
+    # A login mid-session adds the user to the same session
+    sessionizer.observe(event("page_view", 0, session_id="tab-1", **CLIENT))
+    sessionizer.observe(event("page_view", 1, session_id="tab-1", user_id="42", **CLIENT))
+    # Two tabs of the same user alternate without splitting each other
+    for minute, tab in enumerate(["tab-2", "tab-1", "tab-2", "tab-1"], start=2):
+        assert sessionizer.observe(event("click", minute, session_id=tab, user_id="42", **CLIENT)) == tab
+    # Events without a session ID join the user's latest session
+    assert sessionizer.observe(event("purchase", 7, user_id="42")) == "tab-1"
+
+    assert sessionizer.close_all() == 2
+    summaries = {summary["session_id"]: summary for summary in sessionizer.drain()}
+    assert sorted(summaries) == ["tab-1", "tab-2"]
+    assert (summaries["tab-1"]["user_id"], summaries["tab-1"]["event_count"], summaries["tab-1"]["converted"]) == ("42", 5, True)
+    assert (summaries["tab-2"]["event_count"], summaries["tab-2"]["converted"]) == (2, False)
+    assert not sessionizer.identities
+
+    print("✅ Client session IDs are kept")
+
+
+def test_consumer_stores_session_summaries():
+    """Test that consumed events get session IDs and closed sessions are stored and reported"""
+    print("🧪 Testing session summaries...")
+
+    original_session_local = analytics_consumer_module.SessionLocal
+    original_sessionizer = analytics_consumer_module.analytics_sessionizer
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/sessions.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        analytics_consumer_module.SessionLocal = sessionmaker(bind=db_engine)
+        analytics_consumer_module.analytics_sessionizer = Sessionizer(timeout_seconds=1800)
+        try:
+            consumer = AnalyticsConsumer()
+            processed = []
+            consumer._process_page_view_event = processed.append
+            consumer._process_purchase_event = processed.append
+            channel = SimpleNamespace(basic_ack=lambda delivery_tag: None, basic_nack=None)
+
+            start = datetime.utcnow() - timedelta(hours=1)
+            messages = [
+                {"event_type": "page_view", "event_name": "home", "user_id": "7", "timestamp": start},
+                {"event_type": "page_view", "event_name": "cart", "user_id": "7", "timestamp": start + timedelta(minutes=4)},
+                {"event_type": "purchase", "event_name": "buy", "user_id": "7", "timestamp": start + timedelta(minutes=5)},
+                {"event_type": "page_view", "event_name": "home", "timestamp": start, **CLIENT},
+                # Moves the watermark past the timeout of both sessions above
+                {"event_type": "page_view", "event_name": "home", "user_id": "8", "timestamp": start + timedelta(hours=1)},
+            ]
+            for tag, message in enumerate(messages):
+                consumer.process_analytics_event(
+                    channel, SimpleNamespace(delivery_tag=tag), SimpleNamespace(content_type=None),
+                    json.dumps(message, default=str).encode()
+                )
+            assert all(event_data["session_id"] for event_data in processed)
+            assert len({event_data["session_id"] for event_data in processed[:3]}) == 1
+
+            # The flush timer closes the two idle sessions and writes them in one batch
+            consumer._on_flush_timer()
+            db = Session(bind=db_engine)
+            try:
+                assert db.query(AnalyticsSession).count() == 2
+                summary = AnalyticsService(db).get_session_summary(days=1)
+                assert summary.total_sessions == 2
+                assert summary.avg_duration_seconds == 150.0
+                assert summary.avg_pages_per_session == 1.5
+                assert summary.bounce_rate == 0.5
+                assert summary.conversion_rate == 0.5
+            finally:
+                db.close()
+        finally:
+            analytics_consumer_module.SessionLocal = original_session_local
+            analytics_consumer_module.analytics_sessionizer = original_sessionizer
+            db_engine.dispose()
+
+    print("✅ Session summaries are stored")
+
+
+def test_flush_timer_follows_wall_clock():
+    """Test that the flush timer closes idle sessions once traffic stops, within the allowed lateness"""
+    print("🧪 Testing session expiry without traffic...")
+
+    sessionizer = Sessionizer(timeout_seconds=1800, allowed_lateness_seconds=300)
+    now = datetime.utcnow()
+    sessionizer.observe({"event_type": "page_view", "user_id": "7", "timestamp": now - timedelta(minutes=40)})
+    sessionizer.observe({"event_type": "page_view", "user_id": "8", "timestamp": now - timedelta(minutes=20)})
+
+    # No newer event moves the watermark, but the wall clock does
+    assert sessionizer.expire() == 0
+    assert sessionizer.expire_idle() == 1
+    assert [summary["user_id"] for summary in sessionizer.drain()] == ["7"]
+
+    # A replay running behind the wall clock still expires by its own timeline
+    sessionizer.observe({"event_type": "page_view", "user_id": "9", "timestamp": now + timedelta(hours=1)})
+    assert sessionizer.expire_idle() == 1 and sessionizer.stats()["active"] == 1
+
+    print("✅ Idle sessions close when traffic stops")
+
+
+def test_sync_writes_get_session_ids():
+    """Test that rows the API wrote without a session_id get the consumer's stitched one"""
+    print("🧪 Testing session_id backfill...")
+
+    original_session_local = analytics_consumer_module.SessionLocal
+    original_sessionizer = analytics_consumer_module.analytics_sessionizer
+    original_manager = analytics_service_module.rabbitmq_manager
+    original_enabled, original_mode = settings.ANALYTICS_ENABLED, settings.ANALYTICS_WRITE_MODE
+    published = []
+    analytics_service_module.rabbitmq_manager = SimpleNamespace(
+        publish_event=lambda event_data: published.append(json.dumps(event_data, default=str)) or True
+    )
+    settings.ANALYTICS_ENABLED, settings.ANALYTICS_WRITE_MODE = True, "sync"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/backfill.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        analytics_consumer_module.SessionLocal = sessionmaker(bind=db_engine)
+        analytics_consumer_module.analytics_sessionizer = Sessionizer(timeout_seconds=1800)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            for name in ("home", "cart"):
+                assert service.track_event({"event_type": "page_view", "event_name": name}, {**CLIENT, "page_url": "/"})
+            assert service.track_event({"event_type": "click", "event_name": "tab", "session_id": "client-1"}, CLIENT)
+            assert db.query(AnalyticsEvent).filter(AnalyticsEvent.session_id.is_(None)).count() == 2
+
+            consumer = AnalyticsConsumer()
+            channel = SimpleNamespace(basic_ack=lambda delivery_tag: None, basic_nack=None)
+            for tag, body in enumerate(published):
+                consumer.process_analytics_event(
+                    channel, SimpleNamespace(delivery_tag=tag), SimpleNamespace(content_type=None), body.encode()
+                )
+            consumer.flush_sessions()
+
+            db.expire_all()
+            stored = dict(db.query(AnalyticsEvent.event_name, AnalyticsEvent.session_id).select_from(AnalyticsEvent).all())
+            assert stored["home"] and stored["home"] == stored["cart"]
+            assert stored["tab"] == "client-1"
+        finally:
+            db.close()
+            db_engine.dispose()
+            analytics_consumer_module.SessionLocal = original_session_local
+            analytics_consumer_module.analytics_sessionizer = original_sessionizer
+            analytics_service_module.rabbitmq_manager = original_manager
+            settings.ANALYTICS_ENABLED, settings.ANALYTICS_WRITE_MODE = original_enabled, original_mode
+
+    print("✅ Synchronously written events get their session_id")
+
+
+if __name__ == "__main__":
+    test_stitch_sessions()
+    test_client_session_ids()
+    test_consumer_stores_session_summaries()
+    test_flush_timer_follows_wall_clock()
+    test_sync_writes_get_session_ids()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Event Spool Test
+
+This script checks that spooled events are replayed in order, that corrupt
+records are skipped, that the drain position survives a restart and that
+disk usage stays bounded.
+"""
+
+import sys
+import os
+import time
+import zlib
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.spool import EventSpool, RECORD_HEADER, SpoolLockedError, worker_directory
+
+
+def wait_for_disk(spool: EventSpool, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while spool._unwritten and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert spool._unwritten == 0
+
+
+def collect(spool: EventSpool) -> list:
+    received = []
+    while True:
+        published, failed = spool.drain_once(lambda key, body, content_type: received.append((key, body)) or True)
+        assert not failed
+        if not published:
+            return received
+
+
+def test_spool_replays_in_order():
+    """Test that records survive segment rolls and drain in append order"""
+    print("🧪 Testing spool replay order...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spool = EventSpool(temp_dir, segment_bytes=1024, fsync_interval=0.01, drain_batch=7)
+        try:
+            for index in range(100):
+                assert spool.append("analytics_events", f'{{"n": {index}}}')
+            wait_for_disk(spool)
+            assert len(spool._segments()) > 1
+            assert spool.has_backlog()
+
+            # A failing publish stops the drain without losing the record
+            assert spool.drain_once(lambda key, body, content_type: False) == (0, True)
+
+            received = collect(spool)
+            assert [body for _, body in received] == [f'{{"n": {index}}}'.encode() for index in range(100)]
+            assert all(key == "analytics_events" for key, _ in received)
+            assert not spool.has_backlog()
+            assert spool.stats()["drained_total"] == 100
+            # Only the active segment is left on disk
+            assert len(spool._segments()) == 1
+        finally:
+            spool.close()
+
+    print("✅ Spool replays events in order")
+
+
+def test_spool_recovery_and_corruption():
+    """Test checkpoint recovery across restarts and skipping of corrupt records"""
+    print("🧪 Testing spool recovery...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spool = EventSpool(temp_dir, fsync_interval=0.01, drain_batch=3)
+        for index in range(10):
+            spool.append("q", f"event-{index}")
+        wait_for_disk(spool)
+        received = []
+        assert spool.drain_once(lambda key, body, content_type: received.append(body) or True) == (3, False)
+        spool.close()
+
+        # A restart resumes after the checkpoint
+        spool = EventSpool(temp_dir, fsync_interval=0.01)
+        try:
+            received = [body for _, body in collect(spool)]
+            assert received == [f"event-{index}".encode() for index in range(3, 10)]
+
+            for index in range(5):
+                spool.append("q", f"more-{index}")
+            wait_for_disk(spool)
+        finally:
+            spool.close()
+
+        # Flip a byte in the last record of the sealed segment
+        spool = EventSpool(temp_dir, fsync_interval=0.01)
+        segment = spool._segment_path(max(spool._segments()))
+        with open(segment, "r+b") as handle:
+            handle.seek(-1, os.SEEK_END)
+            last = handle.read(1)
+            handle.seek(-1, os.SEEK_END)
+            handle.write(bytes([last[0] ^ 0xFF]))
+        try:
+            received = [body for _, body in collect(spool)]
+            assert received == [f"more-{index}".encode() for index in range(4)]
+            assert spool.stats()["corrupt_total"] == 1
+        finally:
+            spool.close()
+
+    print("✅ Spool recovers its position and skips corrupt records")
+
+
+def test_spool_legacy_and_undecodable_records():
+    """Test that pre-codec records replay as JSON and undecodable ones are skipped"""
+    print("🧪 Testing legacy spool records...")
+
+    def record(payload: bytes) -> bytes:
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Segment written before records carried a content type
+        with open(os.path.join(temp_dir, "segment-000000000001.log"), "wb") as handle:
+            handle.write(record(b'q\n{"n": 1}'))
+            handle.write(record(b"no routing key"))
+            handle.write(record(b"q\n\xff\xfe\n{}"))
+            handle.write(record(b'q\napplication/x-msgpack\n\x81\xa1n\x02'))
+
+        spool = EventSpool(temp_dir, fsync_interval=0.01)
+        try:
+            received = []
+            while spool.drain_once(lambda key, body, content_type: received.append((key, content_type, body)) or True)[0]:
+                pass
+            assert received == [
+                ("q", "application/json", b'{"n": 1}'),
+                ("q", "application/x-msgpack", b"\x81\xa1n\x02"),
+            ]
+            assert spool.stats()["corrupt_total"] == 2
+        finally:
+            spool.close()
+
+    print("✅ Legacy records replay and undecodable ones are skipped")
+
+
+def test_spool_directory_per_process():
+    """Test that a directory has one owner and exited workers' spools are adopted"""
+    print("🧪 Testing spool directory ownership...")
+
+    with tempfile.TemporaryDirectory() as root:
+        # An exited worker left two events behind, and an older version spooled one in root
+        orphan = EventSpool(os.path.join(root, "worker-999999999"), fsync_interval=0.01)
+        orphan.append("q", "orphan-0")
+        orphan.append("q", "orphan-1")
+        wait_for_disk(orphan)
+        orphan.close()
+        legacy = EventSpool(root, fsync_interval=0.01)
+        legacy.append("q", "legacy-0")
+        wait_for_disk(legacy)
+        legacy.close()
+
+        spool = EventSpool(worker_directory(root), fsync_interval=0.01, adopt_orphans=True)
+        try:
+            spool.append("q", "own-0")
+            wait_for_disk(spool)
+
+            # A second process cannot share the directory
+            try:
+                EventSpool(worker_directory(root)).append("q", "x")
+                assert False, "directory shared"
+            except SpoolLockedError:
+                pass
+
+            received = []
+            assert spool.drain_orphans(lambda key, body, content_type: received.append(body) or True) == 3
+            assert sorted(received) == [b"legacy-0", b"orphan-0", b"orphan-1"]
+            assert sorted(os.listdir(root)) == [".lock", os.path.basename(worker_directory(root))]
+            assert spool.stats()["adopted_total"] == 3
+            # Its own records are left to the regular drain
+            assert [body for _, body in collect(spool)] == [b"own-0"]
+        finally:
+            spool.close()
+
+    print("✅ Spool directories are per process and orphans are adopted")
+
+
+def test_spool_directory_after_fork():
+    """Test that a per-process spool created before a fork spools under the child's pid"""
+    print("🧪 Testing spool directory after fork...")
+
+    if not hasattr(os, "fork"):
+        print("⚠️ os.fork unavailable, skipping")
+        return
+
+    with tempfile.TemporaryDirectory() as root:
+        # Built at import time in the parent, as under gunicorn --preload
+        spool = EventSpool(root, fsync_interval=0.01, per_process=True)
+        children = []
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    spool.append("q", "child")
+                    wait_for_disk(spool)
+                    spool.close()
+                    os._exit(0 if spool.directory == worker_directory(root) else 1)
+                except BaseException:
+                    os._exit(1)
+            children.append(pid)
+        for pid in children:
+            assert os.waitpid(pid, 0)[1] == 0
+
+        assert sorted(os.listdir(root)) == sorted(f"worker-{pid}" for pid in children)
+        # The parent was never opened and gets its own directory too
+        spool.append("q", "parent")
+        wait_for_disk(spool)
+        spool.close()
+        assert spool.directory == worker_directory(root)
+
+    print("✅ Forked workers spool under their own pid")
+
+
+def test_spool_disk_bound():
+    """Test that appends are refused once the spool reaches max_bytes"""
+    print("🧪 Testing spool disk bound...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spool = EventSpool(temp_dir, segment_bytes=4096, max_bytes=8192, fsync_interval=0.01)
+        try:
+            accepted = 0
+            for _ in range(200):
+                if spool.append("q", "x" * 200):
+                    accepted += 1
+                wait_for_disk(spool)
+
+            assert accepted < 200
+            assert spool.disk_bytes < 8192 + 4096
+            assert spool.stats()["dropped_disk_full_total"] == 200 - accepted
+
+            # Draining frees space again
+            collect(spool)
+            assert spool.append("q", "after drain")
+        finally:
+            spool.close()
+
+    print("✅ Spool disk usage is bounded")
+
+
+if __name__ == "__main__":
+    test_spool_replays_in_order()
+    test_spool_recovery_and_corruption()
+    test_spool_legacy_and_undecodable_records()
+    test_spool_directory_per_process()
+    test_spool_directory_after_fork()
+    test_spool_disk_bound()
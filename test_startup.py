@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Startup Test
+
+This script checks that importing the app leaves the broker client and the
+auth crypto libraries unloaded until they are first used.
+"""
+
+import sys
+import os
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+LAZY_MODULES = ["pika", "jose", "passlib"]
+
+
+def test_heavy_modules_load_lazily():
+    """Test that import main does not pull in lazily loaded subsystems"""
+    print("🧪 Testing lazy imports at startup...")
+
+    script = (
+        "import sys, main; "
+        f"print(','.join(module for module in {LAZY_MODULES!r} if module in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    eager = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else ""
+    assert eager == "", f"imported at startup: {eager}"
+
+    print("✅ Heavy modules load lazily")
+
+
+if __name__ == "__main__":
+    test_heavy_modules_load_lazily()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+User-Agent Enrichment Test
+
+This script checks user-agent classification, the parse cache hit rate and
+that tracked events store the parsed device, OS, browser and bot columns.
+"""
+
+import sys
+import os
+import tempfile
+from sqlalchemy.orm import Session
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, create_db_engine
+from app.models.analytics import AnalyticsEvent, ANALYTICS_TABLES
+from app.schemas.analytics import AnalyticsEventCreate
+from app.services.analytics_service import AnalyticsService
+from app.services.analytics_useragent import UserAgentParser, parse_user_agent
+
+USER_AGENTS = {
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36":
+        ("desktop", "Windows", "Chrome", False),
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0":
+        ("desktop", "Windows", "Edge", False),
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1":
+        ("mobile", "iOS", "Safari", False),
+    "Mozilla/5.0 (iPad; CPU OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/119.0 Mobile/15E148 Safari/604.1":
+        ("tablet", "iOS", "Chrome", False),
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36":
+        ("mobile", "Android", "Chrome", False),
+    "Mozilla/5.0 (Linux; Android 13; SM-X710) AppleWebKit/537.36 (KHTML, like Gecko) SamsungBrowser/23.0 Chrome/115.0 Safari/537.36":
+        ("tablet", "Android", "Samsung Internet", False),
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14.1; rv:120.0) Gecko/20100101 Firefox/120.0":
+        ("desktop", "macOS", "Firefox", False),
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)":
+        ("bot", "Other", "Other", True),
+    "python-requests/2.31.0":
+        ("bot", "Other", "Other", True),
+}
+
+
+def test_parse_user_agents():
+    """Test device, OS, browser and bot classification and the cache"""
+    print("🧪 Testing user-agent parsing...")
+
+    for user_agent, expected in USER_AGENTS.items():
+        parsed = parse_user_agent(user_agent)
+        assert (parsed["device_class"], parsed["os_family"], parsed["browser_family"], parsed["is_bot"]) == expected, user_agent
+
+    parser = UserAgentParser(cache_size=4)
+    assert parser.parse(None)["device_class"] is None
+    for _ in range(10):
+        for user_agent in list(USER_AGENTS)[:3]:
+            parser.parse(user_agent)
+    stats = parser.stats()
+    assert stats["misses_total"] == 3 and stats["hits_total"] == 27
+    assert stats["hit_rate"] == 0.9
+
+    # The cache stays bounded
+    for user_agent in USER_AGENTS:
+        parser.parse(user_agent)
+    assert parser.stats()["entries"] == 4
+
+    print("✅ User-agent parsing works")
+
+
+def test_track_stores_user_agent_fields():
+    """Test that tracked events carry the parsed columns"""
+    print("🧪 Testing user-agent enrichment...")
+
+    original_enabled = settings.ANALYTICS_ENABLED
+    settings.ANALYTICS_ENABLED = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_engine = create_db_engine(f"sqlite:///{tmp_dir}/useragent.db")
+        Base.metadata.create_all(bind=db_engine, tables=ANALYTICS_TABLES)
+        db = Session(bind=db_engine)
+        try:
+            service = AnalyticsService(db)
+            user_agent = list(USER_AGENTS)[4]
+            event = AnalyticsEventCreate(event_type="page_view", event_name="home")
+            assert service.track_event(event, {"user_agent": user_agent})
+            assert service.track_event(event)
+
+            stored = db.query(
+                AnalyticsEvent.device_class, AnalyticsEvent.os_family, AnalyticsEvent.browser_family, AnalyticsEvent.is_bot
+            ).order_by(AnalyticsEvent.id).all()
+            assert stored == [USER_AGENTS[user_agent], (None, None, None, None)]
+        finally:
+            db.close()
+            db_engine.dispose()
+            settings.ANALYTICS_ENABLED = original_enabled
+
+    print("✅ Parsed user-agent fields are stored")
+
+
+if __name__ == "__main__":
+    test_parse_user_agents()
+    test_track_stores_user_agent_fields()
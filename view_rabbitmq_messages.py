@@ -5,9 +5,9 @@ RabbitMQ 消息查看器
 """
 
 import pika
-import json
 import sys
 from datetime import datetime
+from app.core.codecs import codec_for_content_type
 
 def view_messages():
     """查看 RabbitMQ 队列中的消息"""
@@ -42,7 +42,7 @@ def view_messages():
             method, properties, body = channel.basic_get(queue=queue_name, auto_ack=False)
             if method:
                 try:
-                    message_data = json.loads(body.decode('utf-8'))
+                    message_data = codec_for_content_type(properties.content_type).decode(body)
                     print(f"\n📨 消息 {i+1}:")
                     print(f"   🎯 事件类型: {message_data.get('event_type')}")
                     print(f"   📝 事件名称: {message_data.get('event_name')}")
@@ -61,7 +61,7 @@ def view_messages():
                     
                 except Exception as e:
                     print(f"   ❌ 解析消息失败: {e}")
-                    print(f"   📄 原始数据: {body.decode('utf-8')}")
+                    print(f"   📄 原始数据: {body.decode('utf-8', errors='replace')}")
         
         connection.close()
         
@@ -73,7 +73,7 @@ def consume_messages():
     """实时消费消息（会删除消息）"""
     def callback(ch, method, properties, body):
         try:
-            message_data = json.loads(body.decode('utf-8'))
+            message_data = codec_for_content_type(properties.content_type).decode(body)
             print(f"\n🔄 收到新消息 - {datetime.now().strftime('%H:%M:%S')}")
             print(f"   🎯 事件: {message_data.get('event_type')} - {message_data.get('event_name')}")
             print(f"   👤 用户: {message_data.get('user_id')}")